@@ -0,0 +1,389 @@
+"""
+Rate limiting and admission control for the Gemini-backed endpoints.
+
+Every AI request passes two gates before it may call Gemini:
+
+1. A token bucket per client, keyed by JWT username, or by client address
+   for anonymous requests. An empty bucket is answered at once with 429 and
+   Retry-After.
+2. A cap on Gemini calls in flight across all workers (LLM_MAX_CONCURRENCY).
+   When the cap is reached the request queues for up to its lane's wait,
+   then gets 503 with Retry-After.
+
+Requests are sorted into lanes by role. Municipality and admin users
+('priority') go ahead of other signed-in users ('standard'), who go ahead
+of anonymous chat ('anonymous'). A queued request only takes a free slot
+when no earlier request of its lane or any request of a higher lane is
+waiting, and lower lanes may fill only part of the cap, so priority
+traffic always finds headroom. Background enrichment of the rule-based
+suggestions (enrichment.py) has the lowest lane: it takes a slot only when
+one is free within its share, and never queues.
+
+Buckets, slots and the queue live in a SQLite file (ADMISSION_DB), shared
+by every worker on the host. Each decision is one short IMMEDIATE
+transaction. Slots and queue entries are leased, so a worker that dies
+mid-call gives its capacity back when the lease runs out. The enrichment
+replies are kept in the same file, so every worker serves a reply once any
+worker has fetched it.
+"""
+
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import asynccontextmanager, contextmanager
+from flask import request
+from auth import verify_token
+from metrics import record_admission
+
+ADMISSION_DB = os.getenv('ADMISSION_DB') or os.path.join(tempfile.gettempdir(), 'ecofest-admission.sqlite3')
+
+# AI_RATE_LIMITS=0 turns the token buckets off (benchmarks); the slot cap still applies
+RATE_LIMITS = os.getenv('AI_RATE_LIMITS', '1') != '0'
+
+# Gemini calls allowed in flight across all workers
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+
+# A slot outlives any Gemini call; it is only reached when a worker died holding one
+SLOT_LEASE = 120
+
+# Retry-After for requests turned away because every slot stayed busy
+BUSY_RETRY_AFTER = 5
+
+# Queued requests re-check for a free slot with exponential backoff between these bounds
+POLL_MIN = 0.01
+POLL_MAX = 0.05
+
+# Buckets idle this long are full again and can be dropped
+BUCKET_IDLE = 3600
+
+# Enrichment replies kept, soonest to expire dropped first
+MAX_REPLIES = 10000
+
+# Proxies in front of the app that append to X-Forwarded-For; 0 trusts only the socket address
+FORWARDED_HOPS = int(os.getenv('FORWARDED_HOPS', '0'))
+
+# rank orders the queue (lower first); rate is tokens per second; share is the
+# fraction of LLM_MAX_CONCURRENCY the lane may fill; max_wait is seconds queued
+Lane = namedtuple('Lane', 'name rank rate burst share max_wait')
+
+LANES = {
+    'priority': Lane('priority', 0, rate=30 / 60, burst=20, share=1.0, max_wait=30),
+    'standard': Lane('standard', 1, rate=10 / 60, burst=10, share=0.75, max_wait=10),
+    'anonymous': Lane('anonymous', 2, rate=4 / 60, burst=4, share=0.5, max_wait=3),
+    # Background enrichment of rule-based answers (enrichment.py): never queues, yields to user requests
+    'background': Lane('background', 3, rate=0, burst=0, share=0.25, max_wait=0),
+}
+
+PRIORITY_ROLES = {'municipality', 'admin'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS slots (ticket TEXT PRIMARY KEY, lane INTEGER NOT NULL, expires REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS waiters (
+    ticket TEXT PRIMARY KEY, lane INTEGER NOT NULL, enqueued REAL NOT NULL, expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS replies (key TEXT PRIMARY KEY, state TEXT NOT NULL, reply TEXT, expires REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS replies_expires ON replies (expires);
+"""
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is rate limited (429) or finds no free Gemini slot in time (503)."""
+
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+
+    def body(self):
+        return {'error': str(self), 'retry_after': self.retry_after}
+
+
+class AdmissionStore:
+    """Token buckets and the Gemini slot semaphore, in a SQLite file shared across processes."""
+
+    def __init__(self, path=ADMISSION_DB, max_concurrency=LLM_MAX_CONCURRENCY):
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._calls = 0
+
+    def _transaction(self):
+        # One connection per process, opened after fork; transactions never yield, so a lock suffices
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                               check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=OFF')
+            self._connection.executescript(SCHEMA)
+            self._pid = os.getpid()
+        self._connection.execute('BEGIN IMMEDIATE')
+        return self._connection
+
+    def _run(self, body):
+        with self._lock:
+            connection = self._transaction()
+            try:
+                result = body(connection, time.time())
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            return result
+
+    def take_token(self, key, lane):
+        """
+        Take one token from ``key``'s bucket.
+
+        Returns:
+            float: 0 if a token was taken, else seconds until one is available
+        """
+        def body(connection, now):
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                connection.execute('DELETE FROM buckets WHERE updated < ?', (now - BUCKET_IDLE,))
+            row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = lane.burst if row is None else min(lane.burst, row[0] + (now - row[1]) * lane.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / lane.rate
+            connection.execute('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)', (key, tokens, now))
+            return wait
+        return self._run(body)
+
+    def try_acquire(self, ticket, lane):
+        """Take a Gemini slot for ``ticket`` if its lane's turn and share allow, else queue it. Returns True if taken."""
+        def body(connection, now):
+            connection.execute('DELETE FROM slots WHERE expires < ?', (now,))
+            connection.execute('DELETE FROM waiters WHERE expires < ?', (now,))
+            row = connection.execute('SELECT enqueued FROM waiters WHERE ticket = ?', (ticket,)).fetchone()
+            enqueued = now if row is None else row[0]
+            in_use = connection.execute('SELECT COUNT(*) FROM slots').fetchone()[0]
+            ahead = connection.execute(
+                'SELECT COUNT(*) FROM waiters WHERE ticket != ? AND (lane < ? OR (lane = ? AND enqueued < ?))',
+                (ticket, lane.rank, lane.rank, enqueued)
+            ).fetchone()[0]
+            if not ahead and in_use < max(1, int(self.max_concurrency * lane.share)):
+                connection.execute('DELETE FROM waiters WHERE ticket = ?', (ticket,))
+                connection.execute('INSERT INTO slots VALUES (?, ?, ?)', (ticket, lane.rank, now + SLOT_LEASE))
+                return True
+            if row is None:
+                connection.execute('INSERT INTO waiters VALUES (?, ?, ?, ?)',
+                                   (ticket, lane.rank, enqueued, now + lane.max_wait + 5))
+            return False
+        return self._run(body)
+
+    def leave_queue(self, ticket):
+        self._run(lambda connection, now: connection.execute('DELETE FROM waiters WHERE ticket = ?', (ticket,)))
+
+    def release(self, ticket):
+        self._run(lambda connection, now: connection.execute('DELETE FROM slots WHERE ticket = ?', (ticket,)))
+
+    def in_use(self):
+        """Gemini slots currently held, across all workers."""
+        return self._run(lambda connection, now: connection.execute(
+            'SELECT COUNT(*) FROM slots WHERE expires >= ?', (now,)).fetchone()[0])
+
+    def claim_reply(self, key, pending, lease):
+        """
+        Look up an enrichment reply, claiming ``key`` as ``pending`` for ``lease`` seconds if it is missing or expired.
+
+        Returns:
+            tuple: (state, reply); state None means the caller claimed the key
+        """
+        def body(connection, now):
+            row = connection.execute('SELECT state, reply, expires FROM replies WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[2] > now:
+                return row[0], None if row[1] is None else json.loads(row[1])
+            connection.execute('INSERT OR REPLACE INTO replies VALUES (?, ?, NULL, ?)', (key, pending, now + lease))
+            return None, None
+        return self._run(body)
+
+    def store_reply(self, key, state, reply, ttl):
+        def body(connection, now):
+            self._calls += 1
+            if self._calls % 100 == 0:
+                connection.execute('DELETE FROM replies WHERE expires < ?', (now,))
+                connection.execute(
+                    'DELETE FROM replies WHERE key IN (SELECT key FROM replies ORDER BY expires LIMIT '
+                    'max(0, (SELECT COUNT(*) FROM replies) - ?))', (MAX_REPLIES,)
+                )
+            connection.execute('INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?)',
+                               (key, state, None if reply is None else json.dumps(reply), now + ttl))
+        self._run(body)
+
+    def forget_reply(self, key):
+        self._run(lambda connection, now: connection.execute('DELETE FROM replies WHERE key = ?', (key,)))
+
+
+STORE = AdmissionStore()
+
+
+def client_address(remote_addr, forwarded_for=None):
+    """The client's address, read from X-Forwarded-For past FORWARDED_HOPS trusted proxies."""
+    if FORWARDED_HOPS and forwarded_for:
+        hops = [part.strip() for part in forwarded_for.split(',')]
+        if len(hops) >= FORWARDED_HOPS:
+            return hops[-FORWARDED_HOPS]
+    return remote_addr or 'unknown'
+
+
+def classify(authorization, remote_addr, forwarded_for=None):
+    """
+    Pick the bucket key and lane of a request.
+
+    Args:
+        authorization: The Authorization header, if any
+        remote_addr: The socket peer address
+        forwarded_for: The X-Forwarded-For header, if any
+
+    Returns:
+        tuple: (bucket key, Lane)
+    """
+    parts = (authorization or '').split(' ')
+    payload = verify_token(parts[1]) if len(parts) == 2 else None
+    if payload:
+        role = str(payload.get('role', '')).lower()
+        lane = LANES['priority'] if role in PRIORITY_ROLES else LANES['standard']
+        return f"user:{payload.get('username')}", lane
+    return f"ip:{client_address(remote_addr, forwarded_for)}", LANES['anonymous']
+
+
+def _take_token(key, lane):
+    if not RATE_LIMITS:
+        return
+    wait = STORE.take_token(key, lane)
+    if wait:
+        record_admission(lane.name, 'rate_limited')
+        raise AdmissionRejected(429, 'Rate limit exceeded, retry later', wait)
+
+
+def _give_up(ticket, lane, start):
+    STORE.leave_queue(ticket)
+    record_admission(lane.name, 'busy', time.monotonic() - start)
+    raise AdmissionRejected(503, 'AI service busy, retry later', BUSY_RETRY_AFTER)
+
+
+def admit(key, lane):
+    """
+    Take a token and a Gemini slot, queueing (blocking) while the cap is reached.
+
+    Returns:
+        str: Ticket to pass to ``release`` when the request is done
+
+    Raises:
+        AdmissionRejected: If rate limited or no slot frees up within the lane's wait
+    """
+    _take_token(key, lane)
+    ticket, start, delay = uuid.uuid4().hex, time.monotonic(), POLL_MIN
+    while not STORE.try_acquire(ticket, lane):
+        if time.monotonic() - start + delay > lane.max_wait:
+            _give_up(ticket, lane, start)
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX)
+    record_admission(lane.name, 'admitted', time.monotonic() - start)
+    return ticket
+
+
+async def admit_async(key, lane):
+    """Async ``admit``: queues without blocking the event loop, with the SQLite calls in a thread."""
+    await asyncio.to_thread(_take_token, key, lane)
+    ticket, start, delay = uuid.uuid4().hex, time.monotonic(), POLL_MIN
+    while not await asyncio.to_thread(STORE.try_acquire, ticket, lane):
+        if time.monotonic() - start + delay > lane.max_wait:
+            await asyncio.to_thread(_give_up, ticket, lane, start)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, POLL_MAX)
+    record_admission(lane.name, 'admitted', time.monotonic() - start)
+    return ticket
+
+
+def try_take_token(key, lane):
+    """
+    Take a token from ``key``'s bucket if it has one, without queueing or raising.
+
+    Returns:
+        bool: True if a token was taken (always, with AI_RATE_LIMITS=0)
+    """
+    if not RATE_LIMITS:
+        return True
+    if STORE.take_token(key, lane):
+        record_admission(lane.name, 'rate_limited')
+        return False
+    return True
+
+
+def try_admit(lane):
+    """
+    Take a Gemini slot if one is free right now, without a token or queueing.
+
+    Returns:
+        str: Ticket to pass to ``release``, or None if ``lane`` has no free slot
+    """
+    ticket = uuid.uuid4().hex
+    if STORE.try_acquire(ticket, lane):
+        record_admission(lane.name, 'admitted', 0.0)
+        return ticket
+    STORE.leave_queue(ticket)
+    record_admission(lane.name, 'busy')
+    return None
+
+
+def release(ticket):
+    """Give back the Gemini slot taken by ``admit``."""
+    STORE.release(ticket)
+
+
+async def release_async(ticket):
+    """Async ``release``, with the SQLite write in a thread."""
+    await asyncio.to_thread(STORE.release, ticket)
+
+
+def request_client():
+    """(key, lane) of the Flask request's client, as ``classify`` returns."""
+    return classify(request.headers.get('Authorization'), request.remote_addr,
+                    request.headers.get('X-Forwarded-For'))
+
+
+@contextmanager
+def admission(key=None, lane=None):
+    """
+    Hold a Gemini slot for the block, admitting the client through the rate limiter first.
+
+    Views enter it after validating the request, around the Gemini call only,
+    so invalid requests spend no token and never queue for a slot.
+
+    Args:
+        key, lane: The client, as ``classify`` returns; the Flask request's client by default
+
+    Raises:
+        AdmissionRejected: If rate limited or no slot frees up within the lane's wait
+    """
+    if key is None:
+        key, lane = request_client()
+    ticket = admit(key, lane)
+    try:
+        yield ticket
+    finally:
+        release(ticket)
+
+
+@asynccontextmanager
+async def admission_async(key, lane):
+    """Async ``admission`` for asgi.py views."""
+    ticket = await admit_async(key, lane)
+    try:
+        yield ticket
+    finally:
+        await release_async(ticket)
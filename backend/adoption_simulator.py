@@ -0,0 +1,248 @@
+"""What-if simulation of shops adopting eco-alternative products."""
+
+import time
+import numpy as np
+import pandas as pd
+from data_loader import DATASETS
+from waste_calculator import get_eco_alternatives
+from hotspot_analyzer import get_hotspot_frame
+
+# Share of an area's predicted festival extra waste attributed to festival
+# product sales; the rest (food, packaging, crowds) is unaffected by adoption
+RETAIL_WASTE_SHARE = 0.6
+
+# Shops returned in the response, largest savings first
+DEFAULT_SHOP_LIMIT = 20
+
+RATE_SCOPES = ('categories', 'areas', 'shops')
+
+
+class AdoptionModel:
+    """
+    Per-row substitution savings for the sales data, prepared once per dataset version.
+
+    A row switching to its eco alternative keeps its quantity and its waste per
+    unit of waste score, so its waste scales by alternative score / own score.
+    ``saving`` holds that full-adoption reduction per row; a scenario is then
+    ``saving * rate`` with rates resolved per row from integer codes.
+    """
+
+    def __init__(self, sales_df, products_df, alternatives=None):
+        alternatives = get_eco_alternatives(products_df) if alternatives is None else alternatives
+        alt_scores = products_df.set_index('Item_Name')['Waste_Score']
+        alt_score_of = {
+            item: float(alt_scores[alt]) for item, alt in alternatives.items() if alt in alt_scores.index
+        }
+
+        self.waste = sales_df['Estimated_Waste_kg'].to_numpy(dtype=float)
+        own_score = sales_df['Item_Waste_Score'].to_numpy(dtype=float)
+        alt_score = sales_df['Item_Name'].map(alt_score_of).to_numpy(dtype=float)
+        ratio = np.divide(alt_score, own_score, out=np.ones_like(own_score),
+                          where=~np.isnan(alt_score) & (own_score > 0))
+        self.saving = self.waste * np.clip(1 - ratio, 0, 1)
+
+        self.codes = {}
+        self.labels = {}
+        for scope, column in (('categories', 'Category'), ('areas', 'Area'), ('shops', 'Shop_ID'),
+                              ('festivals', 'Festival')):
+            self.codes[scope], self.labels[scope] = pd.factorize(sales_df[column])
+        self.lookup = {scope: {label: i for i, label in enumerate(labels.tolist())}
+                       for scope, labels in self.labels.items()}
+
+        shop_first = pd.Series(np.arange(len(sales_df))).groupby(self.codes['shops']).first().to_numpy()
+        self.shop_names = sales_df['Shop_Name'].to_numpy()[shop_first].tolist()
+        self.shop_areas = sales_df['Area'].to_numpy()[shop_first].tolist()
+
+        # Rows of each festival as one contiguous slice of a sorted permutation
+        order = np.argsort(self.codes['festivals'], kind='stable')
+        bounds = np.searchsorted(self.codes['festivals'][order], np.arange(len(self.labels['festivals']) + 1))
+        self.festival_rows = {
+            festival: order[bounds[i]:bounds[i + 1]]
+            for i, festival in enumerate(self.labels['festivals'].tolist())
+        }
+
+    def row_rates(self, rows, rate=0.0, categories=None, areas=None, shops=None):
+        """
+        Adoption rate of each row: shop over area over category over global rate.
+
+        Returns:
+            ndarray: Rates in [0, 1] aligned with ``rows``
+        """
+        rates = np.full(len(rows), float(rate))
+        # Least specific first so more specific scopes overwrite
+        for scope, overrides in (('categories', categories), ('areas', areas), ('shops', shops)):
+            if not overrides:
+                continue
+            table = np.full(len(self.labels[scope]), np.nan)
+            for label, value in overrides.items():
+                code = self.lookup[scope].get(label)
+                if code is not None:
+                    table[code] = value
+            scoped = table[self.codes[scope][rows]]
+            rates = np.where(np.isnan(scoped), rates, scoped)
+        return np.clip(rates, 0, 1)
+
+    def simulate(self, festival, rate=0.0, categories=None, areas=None, shops=None):
+        """
+        Projected waste per shop and area for one festival's sales.
+
+        Returns:
+            dict: Arrays of baseline and projected kg per shop code and area code,
+            or None if the festival has no sales
+        """
+        rows = self.festival_rows.get(festival)
+        if rows is None:
+            return None
+
+        saved = self.saving[rows] * self.row_rates(rows, rate, categories, areas, shops)
+        waste = self.waste[rows]
+        shop_codes = self.codes['shops'][rows]
+        area_codes = self.codes['areas'][rows]
+        n_shops, n_areas = len(self.labels['shops']), len(self.labels['areas'])
+        return {
+            'shop_baseline': np.bincount(shop_codes, weights=waste, minlength=n_shops),
+            'shop_saved': np.bincount(shop_codes, weights=saved, minlength=n_shops),
+            'area_baseline': np.bincount(area_codes, weights=waste, minlength=n_areas),
+            'area_saved': np.bincount(area_codes, weights=saved, minlength=n_areas),
+            'substitutable_kg': float(self.saving[rows].sum()),
+        }
+
+
+def get_adoption_model():
+    """Adoption model over the shared datasets, built once per dataset version."""
+    return DATASETS.cached('adoption_model', lambda: AdoptionModel(DATASETS.sales, DATASETS.products))
+
+
+def normalize_rates(spec):
+    """
+    Validate an adoption scenario.
+
+    Args:
+        spec: Dict with optional ``rate`` and ``categories``/``areas``/``shops``
+            mappings of name to rate, all between 0 and 1
+
+    Returns:
+        dict: Keyword arguments for AdoptionModel.simulate
+
+    Raises:
+        ValueError: If a rate is missing, not a number or outside [0, 1]
+    """
+    def check(name, value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+            raise ValueError(f'{name} must be a number between 0 and 1')
+        return float(value)
+
+    rates = {'rate': check('rate', spec.get('rate', 0.0))}
+    for scope in RATE_SCOPES:
+        overrides = spec.get(scope) or {}
+        if not isinstance(overrides, dict):
+            raise ValueError(f'{scope} must map names to rates')
+        rates[scope] = {str(k): check(f'{scope}[{k}]', v) for k, v in overrides.items()}
+    return rates
+
+
+def _priority_counts(frame):
+    return {level: int(n) for level, n in frame['priority'].value_counts().items()}
+
+
+def simulate_adoption(festival, spec, shop_limit=DEFAULT_SHOP_LIMIT, retail_share=RETAIL_WASTE_SHARE):
+    """
+    Project the citywide effect of eco-alternative adoption for a festival.
+
+    Shop waste is recomputed from substituted sales rows. Each area's predicted
+    extra waste then falls by ``retail_share`` times the fraction of its retail
+    waste saved, and hotspot priorities and resources are recomputed from it.
+
+    Args:
+        festival: Festival name
+        spec: Adoption scenario (see normalize_rates)
+        shop_limit: Shops listed in the response
+        retail_share: Share of extra waste that comes from product sales
+
+    Returns:
+        dict: Retail totals, per-shop and per-area projections and resource
+        changes, or None if the festival has no data
+    """
+    start = time.perf_counter()
+    rates = normalize_rates(spec)
+    area_df = DATASETS.areas
+    festival_areas = area_df[area_df['Festival'] == festival]
+    if festival_areas.empty:
+        return None
+
+    model = get_adoption_model()
+    result = model.simulate(festival, **rates)
+    if result is None:
+        return None
+
+    # Fraction of each area's retail waste saved, applied to its extra waste
+    area_saved = dict(zip(model.labels['areas'].tolist(), np.divide(
+        result['area_saved'], result['area_baseline'],
+        out=np.zeros_like(result['area_saved']), where=result['area_baseline'] > 0
+    ).tolist()))
+    reduction = retail_share * festival_areas['Area'].map(area_saved).fillna(0.0).to_numpy()
+    extra = festival_areas['Predicted_Festival_Extra_Waste_kg'].to_numpy(dtype=float)
+    projected_areas = festival_areas.assign(
+        Predicted_Festival_Extra_Waste_kg=extra * (1 - reduction),
+        Predicted_Total_Daily_Waste_kg=festival_areas['Baseline_Daily_Waste_kg'] + extra * (1 - reduction)
+    )
+
+    before = get_hotspot_frame(festival, festival_areas)
+    after = get_hotspot_frame(festival, projected_areas)
+    previous = dict(zip(zip(before['area'], before['pincode']), before['priority']))
+
+    sold = result['shop_baseline'] > 0
+    shop_codes = np.nonzero(sold)[0]
+    shop_codes = shop_codes[np.argsort(-result['shop_saved'][shop_codes], kind='stable')][:shop_limit]
+
+    baseline_kg = float(result['shop_baseline'].sum())
+    saved_kg = float(result['shop_saved'].sum())
+    return {
+        'festival': festival,
+        'rates': rates,
+        'retail': {
+            'baseline_waste_kg': round(baseline_kg, 2),
+            'projected_waste_kg': round(baseline_kg - saved_kg, 2),
+            'saved_kg': round(saved_kg, 2),
+            'saved_percent': round(saved_kg / baseline_kg * 100, 1) if baseline_kg else 0.0,
+            'max_saving_kg': round(result['substitutable_kg'], 2),
+        },
+        'city': {
+            'extra_waste_kg': round(float(before['extra_waste_kg'].sum()), 2),
+            'projected_extra_waste_kg': round(float(after['extra_waste_kg'].sum()), 2),
+            'extra_trucks': int(before['extra_trucks'].sum()),
+            'projected_extra_trucks': int(after['extra_trucks'].sum()),
+            'extra_workers': int(before['extra_workers'].sum()),
+            'projected_extra_workers': int(after['extra_workers'].sum()),
+            'priorities': _priority_counts(before),
+            'projected_priorities': _priority_counts(after),
+        },
+        'areas': [
+            {
+                'area': area,
+                'pincode': pincode,
+                'extra_waste_kg': extra_kg,
+                'priority': priority,
+                'previous_priority': previous[(area, pincode)],
+                'extra_trucks': trucks,
+                'extra_workers': workers,
+            }
+            for area, pincode, extra_kg, priority, trucks, workers in zip(
+                after['area'].tolist(), after['pincode'].tolist(), after['extra_waste_kg'].tolist(),
+                after['priority'].tolist(), after['extra_trucks'].tolist(), after['extra_workers'].tolist()
+            )
+        ],
+        'shops_simulated': int(sold.sum()),
+        'shops': [
+            {
+                'shop_id': model.labels['shops'][i],
+                'shop_name': model.shop_names[i],
+                'area': model.shop_areas[i],
+                'baseline_waste_kg': round(float(result['shop_baseline'][i]), 2),
+                'projected_waste_kg': round(float(result['shop_baseline'][i] - result['shop_saved'][i]), 2),
+                'saved_kg': round(float(result['shop_saved'][i]), 2),
+            }
+            for i in shop_codes.tolist()
+        ],
+        'seconds': round(time.perf_counter() - start, 4),
+    }
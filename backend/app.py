@@ -1,11 +1,9 @@
 """Flask API server for Festival Waste Prediction system."""
 
 from flask import Flask, jsonify, request
-from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import math
 import os
-import json
-import numpy as np
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,49 +11,59 @@ load_dotenv()
 
 # Import modules
 from data_loader import (
-    load_sales_data, load_area_festivals, load_products,
-    get_all_shops, get_all_festivals, get_all_areas
+    DATASETS, get_all_festivals, get_all_areas
 )
 from waste_calculator import (
-    calculate_shop_waste, get_shop_comparison, get_eco_alternatives
+    calculate_shop_waste, get_shop_comparison, get_eco_alternatives,
+    get_product_breakdown, get_shop_comparison_frame
 )
+from shop_directory import get_shop_directory, SHOP_FIELDS, DEFAULT_PAGE_SIZE
 from hotspot_analyzer import (
-    identify_hotspots, get_festival_summary, get_area_details
+    get_festival_hotspots, get_area_details, get_hotspot_frame, festival_exists
 )
-from gemini_suggester import (
-    generate_eco_suggestions, generate_marketing_message,
-    generate_municipality_insights, ai_chat, generate_prediction_summary
+from resource_simulator import simulate_resources
+from fleet_allocator import allocate_fleet
+from route_planner import get_festival_routes, plan_festival_routes, ROUTED_PRIORITIES, TRUCK_CAPACITY_KG
+from rollup_cube import get_rollup_cube
+from adoption_simulator import simulate_adoption, get_adoption_model, DEFAULT_SHOP_LIMIT
+from live_updates import BROADCASTER
+from batch import run_batch, gzip_bytes, BatchError, MIN_GZIP_BYTES
+from shop_similarity import find_similar_shops, get_similarity_index, base_product
+from query_engine import run_query, query_schema, QueryError, QueryTimeout
+from geo_index import get_hotspot_layer, get_hotspot_geojson, MAX_VIEWPORT_FEATURES
+from forecaster import train as train_forecasts
+from offload import run_native
+from data_loader import load_forecasts
+from exports import stream_export, content_disposition, EXPORT_FORMATS
+from report_renderer import (
+    render_action_plan, render_action_plan_archive, REPORT_FORMATS, REPORT_YEAR
 )
+from gemini_suggester import generate_municipality_insights, ai_chat, generate_prediction_summary
+from enrichment import eco_suggestions, marketing_messages
+from chat_retrieval import retrieve_facts, get_chat_index
+from serialization import FastJSONProvider, records
+from metrics import init_app as init_metrics, render_metrics
+from profiler import init_app as init_profiler, SLOW_REQUESTS, load_profile
+from admission import AdmissionRejected, admission, request_client
 from auth import (
     authenticate_user, generate_token, verify_token,
     token_required, admin_required, register_user
 )
 
 
-# Custom JSON provider for numpy types
-class NumpyJSONProvider(DefaultJSONProvider):
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        if isinstance(obj, np.floating):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super().default(obj)
-
-
 # Initialize Flask app
 app = Flask(__name__)
-app.json_provider_class = NumpyJSONProvider
-app.json = NumpyJSONProvider(app)
+app.json_provider_class = FastJSONProvider
+app.json = FastJSONProvider(app)
 CORS(app)  # Enable CORS for frontend
+init_metrics(app)  # Per-route latency, status and in-flight metrics
+init_profiler(app)  # Stage timings, slow-request log and admin profiling (X-Profile: 1)
 
-# Cache data on startup
+# Warm the shared dataset registry on startup so no request pays for a CSV parse
 print("Loading datasets...")
-SALES_DF = load_sales_data()
-AREA_DF = load_area_festivals()
-PRODUCTS_DF = load_products()
-print(f"Loaded {len(SALES_DF)} sales records, {len(AREA_DF)} area-festival records")
+for name in ('sales', 'areas', 'products'):
+    DATASETS.get(name)
+print(f"Loaded {len(DATASETS.sales)} sales records, {len(DATASETS.areas)} area-festival records")
 
 
 # ==================== BASIC ENDPOINTS ====================
@@ -75,39 +83,69 @@ def health_check():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
-        'sales_records': len(SALES_DF),
-        'areas': len(AREA_DF['Area'].unique()),
-        'festivals': list(SALES_DF['Festival'].unique())
+        'sales_records': len(DATASETS.sales),
+        'areas': len(DATASETS.areas['Area'].unique()),
+        'festivals': list(DATASETS.sales['Festival'].unique()),
+        'dataset_version': DATASETS.version,
+        'dataset_loads': DATASETS.load_counts,
+        'worker': os.getpid()
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint, aggregated across gunicorn workers."""
+    from flask import Response
+    
+    body, content_type = render_metrics()
+    if body is None:
+        return jsonify({'error': 'prometheus_client not installed'}), 503
+    return Response(body, content_type=content_type)
+
+
 @app.route('/api/shops', methods=['GET'])
 def list_shops():
-    """Get all shops with optional filtering."""
+    """Get a page of shops with optional area/pincode filter and name prefix search."""
     area = request.args.get('area')
+    pincode = request.args.get('pincode', type=int)
+    search = request.args.get('search', '').strip()
+    page = request.args.get('page', 1, type=int)
+    page_size = request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        invalid = [f for f in fields if f not in SHOP_FIELDS]
+        if invalid:
+            return jsonify({'error': f"Unknown fields: {', '.join(invalid)}"}), 400
+    
+    result = get_shop_directory().query(
+        area=area,
+        pincode=pincode,
+        search=search,
+        fields=fields,
+        page=page,
+        page_size=page_size
+    )
     
-    shops = get_all_shops(SALES_DF)
-    
-    if area:
-        shops = [s for s in shops if s['Area'] == area]
-    
-    return jsonify({
-        'count': len(shops),
-        'shops': shops
-    })
+    return jsonify(result)
 
 
 @app.route('/api/festivals', methods=['GET'])
 def list_festivals():
     """Get all festivals."""
-    festivals = get_all_festivals(SALES_DF)
+    festivals = get_all_festivals(DATASETS.sales)
     return jsonify({'festivals': festivals})
 
 
+def _area_list():
+    return DATASETS.cached('area_list', lambda: get_all_areas(DATASETS.areas))
+
+
 @app.route('/api/areas', methods=['GET'])
 def list_areas():
     """Get all areas."""
-    areas = get_all_areas(AREA_DF)
+    areas = _area_list()
     return jsonify({
         'count': len(areas),
         'areas': areas
@@ -121,7 +159,7 @@ def get_shop_analysis(shop_id):
     """Get detailed waste analysis for a shop."""
     festival = request.args.get('festival')
     
-    result = calculate_shop_waste(shop_id, festival, SALES_DF)
+    result = calculate_shop_waste(shop_id, festival, DATASETS.sales)
     
     if result is None:
         return jsonify({'error': 'Shop not found'}), 404
@@ -131,16 +169,16 @@ def get_shop_analysis(shop_id):
 
 @app.route('/api/shops/<shop_id>/suggestions', methods=['GET'])
 def get_shop_suggestions(shop_id):
-    """Get AI-powered eco suggestions for a shop."""
+    """Get eco suggestions for a shop: rule-based at once, Gemini-enriched once ready."""
     festival = request.args.get('festival', 'Diwali')
     
     # Get shop waste data
-    shop_data = calculate_shop_waste(shop_id, festival, SALES_DF)
+    shop_data = calculate_shop_waste(shop_id, festival, DATASETS.sales)
     
     if shop_data is None:
         return jsonify({'error': 'Shop not found'}), 404
     
-    # Get AI suggestions
+    # Get suggestions
     high_waste = shop_data.get('high_waste_products', [])
     
     if not high_waste:
@@ -149,52 +187,58 @@ def get_shop_suggestions(shop_id):
             'suggestions': None
         })
     
-    suggestions = generate_eco_suggestions(
+    suggestions = eco_suggestions(
         high_waste,
         shop_data['shop_name'],
-        festival
+        festival,
+        client=request_client()
     )
     
-    # Add static alternatives
+    return jsonify({
+        'shop': shop_data['shop_name'],
+        'festival': festival,
+        'high_waste_products': high_waste,
+        'ai_suggestions': suggestions,
+        'static_alternatives': static_alternatives(high_waste)
+    })
+
+
+def static_alternatives(high_waste):
+    """Known eco swaps for a shop's high-waste products, alongside the AI suggestions."""
     alternatives_map = get_eco_alternatives()
-    static_alternatives = []
+    alternatives = []
     for product in high_waste:
         item_name = product.get('Item_Name', '')
         if item_name in alternatives_map:
-            static_alternatives.append({
+            alternatives.append({
                 'instead_of': item_name,
                 'use': alternatives_map[item_name]
             })
-    
-    return jsonify({
-        'shop': shop_data['shop_name'],
-        'festival': festival,
-        'high_waste_products': high_waste,
-        'ai_suggestions': suggestions,
-        'static_alternatives': static_alternatives
-    })
+    return alternatives
+
+
+def marketing_products():
+    """Eco alternatives to promote in marketing messages, in a fixed order."""
+    return list(dict.fromkeys(base_product(name) for name in get_eco_alternatives().values()))[:5]
 
 
 @app.route('/api/shops/<shop_id>/marketing', methods=['GET'])
 def get_shop_marketing(shop_id):
-    """Generate marketing messages for a shop."""
+    """Generate marketing messages for a shop: templated at once, Gemini-enriched once ready."""
     festival = request.args.get('festival', 'Diwali')
     
     # Get shop data
-    shop_data = calculate_shop_waste(shop_id, festival, SALES_DF)
+    shop_data = calculate_shop_waste(shop_id, festival, DATASETS.sales)
     
     if shop_data is None:
         return jsonify({'error': 'Shop not found'}), 404
     
-    # Get eco alternatives to promote
-    alternatives_map = get_eco_alternatives()
-    eco_products = list(set(alternatives_map.values()))[:5]
-    
-    # Generate marketing messages
-    messages = generate_marketing_message(
+    # Generate marketing messages promoting eco alternatives
+    messages = marketing_messages(
         shop_data['shop_name'],
         festival,
-        eco_products
+        marketing_products(),
+        client=request_client()
     )
     
     return jsonify({
@@ -204,13 +248,27 @@ def get_shop_marketing(shop_id):
     })
 
 
+@app.route('/api/shops/<shop_id>/similar', methods=['GET'])
+def get_similar_shops(shop_id):
+    """Get greener shops with a similar product mix and the eco swaps they made."""
+    festival = request.args.get('festival')
+    k = min(max(request.args.get('k', 5, type=int), 1), 20)
+    
+    result = find_similar_shops(shop_id, festival, k)
+    
+    if result is None:
+        return jsonify({'error': 'Shop not found'}), 404
+    
+    return jsonify(result)
+
+
 @app.route('/api/compare-shops', methods=['GET'])
 def compare_shops():
     """Compare waste across shops."""
     area = request.args.get('area')
     festival = request.args.get('festival')
     
-    comparison = get_shop_comparison(area, festival, SALES_DF)
+    comparison = get_shop_comparison(area, festival, DATASETS.sales)
     
     return jsonify({
         'area': area or 'All Areas',
@@ -224,7 +282,7 @@ def compare_shops():
 @app.route('/api/hotspots/<festival>', methods=['GET'])
 def get_hotspots(festival):
     """Get waste hotspots for a festival."""
-    hotspots = identify_hotspots(festival, AREA_DF)
+    hotspots = get_festival_hotspots(festival)
     
     if not hotspots:
         return jsonify({'error': 'Festival not found'}), 404
@@ -238,7 +296,7 @@ def get_hotspots(festival):
 @app.route('/api/hotspots/<festival>/summary', methods=['GET'])
 def get_hotspots_summary(festival):
     """Get summary statistics for festival hotspots."""
-    summary = get_festival_summary(festival, AREA_DF)
+    summary = get_rollup_cube().festival_summary(festival)
     
     if summary is None:
         return jsonify({'error': 'Festival not found'}), 404
@@ -249,12 +307,13 @@ def get_hotspots_summary(festival):
 @app.route('/api/hotspots/<festival>/insights', methods=['GET'])
 def get_hotspots_insights(festival):
     """Get AI-powered insights for municipality."""
-    hotspots = identify_hotspots(festival, AREA_DF)
+    hotspots = get_festival_hotspots(festival)
     
     if not hotspots:
         return jsonify({'error': 'Festival not found'}), 404
     
-    insights = generate_municipality_insights(hotspots, festival)
+    with admission():
+        insights = generate_municipality_insights(hotspots, festival)
     
     return jsonify({
         'festival': festival,
@@ -263,10 +322,209 @@ def get_hotspots_insights(festival):
     })
 
 
+MAX_SIMULATION_SAMPLES = 200000
+
+
+@app.route('/api/hotspots/<festival>/simulation', methods=['GET'])
+def get_hotspots_simulation(festival):
+    """Monte Carlo P50/P90/P99 resource needs and overflow risk per area."""
+    samples = request.args.get('samples', 10000, type=int)
+    if not 1 <= samples <= MAX_SIMULATION_SAMPLES:
+        return jsonify({'error': f'samples must be between 1 and {MAX_SIMULATION_SAMPLES}'}), 400
+    
+    # NumPy holds the thread for the whole run; under gevent that would be the hub
+    result = run_native(
+        simulate_resources,
+        festival,
+        DATASETS.areas,
+        n_samples=samples,
+        seed=request.args.get('seed', type=int),
+        fleet_trucks=request.args.get('fleet_trucks', type=int),
+        fleet_workers=request.args.get('fleet_workers', type=int)
+    )
+    
+    if result is None:
+        return jsonify({'error': 'Festival not found'}), 404
+    
+    return jsonify(result)
+
+
+def _fleet_args():
+    """Read trucks/workers/days fleet parameters, or None if trucks and workers aren't given."""
+    trucks = request.args.get('trucks', type=int)
+    workers = request.args.get('workers', type=int)
+    if trucks is None or workers is None:
+        return None
+    return {
+        'trucks': max(0, trucks),
+        'workers': max(0, workers),
+        'days': min(14, max(1, request.args.get('days', 3, type=int)))
+    }
+
+
+@app.route('/api/hotspots/<festival>/allocation', methods=['GET'])
+def get_hotspots_allocation(festival):
+    """Distribute a finite truck/worker pool across hotspots by priority."""
+    fleet = _fleet_args()
+    if fleet is None:
+        return jsonify({'error': 'trucks and workers are required'}), 400
+    
+    plan = allocate_fleet(festival, **fleet)
+    
+    if plan is None:
+        return jsonify({'error': 'Festival not found'}), 404
+    
+    return jsonify(plan)
+
+
+@app.route('/api/hotspots/<festival>/routes', methods=['GET'])
+def get_hotspot_routes(festival):
+    """Plan collection routes from depots (?priorities=CRITICAL,HIGH&capacity_kg=20000)."""
+    priorities = tuple(
+        p.strip().upper() for p in request.args.get('priorities', ','.join(ROUTED_PRIORITIES)).split(',') if p.strip()
+    )
+    if not priorities or not set(priorities) <= {'CRITICAL', 'HIGH', 'MEDIUM', 'LOW'}:
+        return jsonify({'error': 'priorities must be from CRITICAL, HIGH, MEDIUM, LOW'}), 400
+    
+    capacity = request.args.get('capacity_kg', TRUCK_CAPACITY_KG, type=int)
+    if not 500 <= capacity <= 50000:
+        return jsonify({'error': 'capacity_kg must be between 500 and 50000'}), 400
+    
+    # Default truck size is cached per festival; other sizes are planned on demand
+    if capacity == TRUCK_CAPACITY_KG:
+        plan = get_festival_routes(festival, priorities)
+    else:
+        plan = plan_festival_routes(festival, priorities, capacity)
+    
+    if plan is None:
+        return jsonify({'error': 'Festival not found'}), 404
+    
+    return jsonify(plan)
+
+
+@app.route('/api/hotspots/<festival>/geojson', methods=['GET'])
+def get_hotspots_geojson(festival):
+    """
+    Hotspots as GeoJSON points.
+
+    Without parameters the full (size-bounded) layer is served from cache,
+    gzip-compressed when the client accepts it. ``?bbox=min_lon,min_lat,max_lon,max_lat``
+    returns only hotspots inside the viewport.
+    """
+    from flask import Response
+    
+    bbox = request.args.get('bbox')
+    if bbox:
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(','))
+        except ValueError:
+            return jsonify({'error': 'bbox must be min_lon,min_lat,max_lon,max_lat'}), 400
+        if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+            return jsonify({'error': 'bbox values must be finite numbers'}), 400
+        if min_lon > max_lon or min_lat > max_lat:
+            return jsonify({'error': 'bbox minimums must not exceed maximums'}), 400
+        
+        layer = get_hotspot_layer(festival)
+        if layer is None:
+            return jsonify({'error': 'Festival not found'}), 404
+        
+        limit = min(MAX_VIEWPORT_FEATURES, max(1, request.args.get('limit', MAX_VIEWPORT_FEATURES, type=int)))
+        return jsonify(layer.viewport(min_lon, min_lat, max_lon, max_lat, limit))
+    
+    geojson = get_hotspot_geojson(festival)
+    if geojson is None:
+        return jsonify({'error': 'Festival not found'}), 404
+    
+    etag = f'"{festival}-{DATASETS.version}"'
+    if request.if_none_match.contains(etag.strip('"')):
+        return Response(status=304, headers={'ETag': etag})
+    
+    body, compressed = geojson
+    response = Response(body, mimetype='application/geo+json')
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['ETag'] = etag
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@app.route('/api/hotspots/<festival>/nearest', methods=['GET'])
+def get_nearest_hotspots(festival):
+    """Find the k hotspots nearest to a point (?lat=&lon=&k=&radius_km=)."""
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None:
+        return jsonify({'error': 'lat and lon are required'}), 400
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        return jsonify({'error': 'lat and lon must be finite numbers'}), 400
+    
+    radius_km = request.args.get('radius_km', type=float)
+    if radius_km is not None and not (math.isfinite(radius_km) and radius_km > 0):
+        return jsonify({'error': 'radius_km must be a positive number'}), 400
+    
+    layer = get_hotspot_layer(festival)
+    if layer is None:
+        return jsonify({'error': 'Festival not found'}), 404
+    
+    k = min(100, max(1, request.args.get('k', 5, type=int)))
+    
+    return jsonify({
+        'festival': festival,
+        'point': [lat, lon],
+        'hotspots': layer.nearest(lat, lon, k, radius_km)
+    })
+
+
+@app.route('/api/hotspots/<festival>/adoption', methods=['POST'])
+def get_hotspots_adoption(festival):
+    """
+    Project waste, priorities and resources if shops adopt eco-alternatives.
+    
+    Body: {rate, categories: {name: rate}, areas: {name: rate}, shops: {id: rate}};
+    the most specific rate applies to each sale.
+    """
+    spec = request.get_json(silent=True) or {}
+    if not isinstance(spec, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    shop_limit = min(max(request.args.get('shops', DEFAULT_SHOP_LIMIT, type=int), 0), 200)
+    
+    try:
+        result = simulate_adoption(festival, spec, shop_limit=shop_limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if result is None:
+        return jsonify({'error': 'Festival not found'}), 404
+    
+    return jsonify(result)
+
+
+@app.route('/api/rollup/<festival>', methods=['GET'])
+def get_rollup(festival):
+    """
+    Drill-down/roll-up over precomputed totals (?zone=, ?area=, ?area=&pincode=).
+    
+    Returns the cell with its parent and children; the city when no level is given.
+    """
+    zone = request.args.get('zone')
+    area = request.args.get('area')
+    pincode = request.args.get('pincode', type=int)
+    if pincode is not None and area is None:
+        return jsonify({'error': 'pincode requires area'}), 400
+    
+    result = get_rollup_cube().query(festival, zone=zone, area=area, pincode=pincode)
+    
+    if result is None:
+        return jsonify({'error': 'Not found'}), 404
+    
+    return jsonify(result)
+
+
 @app.route('/api/areas/<area>', methods=['GET'])
 def get_area_info(area):
     """Get detailed information for an area."""
-    result = get_area_details(area, area_df=AREA_DF)
+    result = get_area_details(area, area_df=DATASETS.areas)
     
     if result is None:
         return jsonify({'error': 'Area not found'}), 404
@@ -274,6 +532,34 @@ def get_area_info(area):
     return jsonify(result)
 
 
+# ==================== FORECASTS ====================
+
+@app.route('/api/forecasts/<festival>', methods=['GET'])
+def get_forecasts(festival):
+    """Get trained per-area forecasts for a festival."""
+    forecasts = load_forecasts()
+    
+    if forecasts is None:
+        return jsonify({'error': 'No forecasts trained yet'}), 404
+    
+    festival_forecasts = forecasts[forecasts['Festival'] == festival]
+    
+    return jsonify({
+        'festival': festival,
+        'count': len(festival_forecasts),
+        'forecasts': records(festival_forecasts)
+    })
+
+
+@app.route('/api/forecasts/train', methods=['POST'])
+@token_required
+@admin_required
+def retrain_forecasts():
+    """Refit all area forecasts from the timeseries and apply them to hotspots."""
+    result = train_forecasts(persist_supabase=request.args.get('supabase') == '1')
+    return jsonify(result)
+
+
 # ==================== DASHBOARD STATS ====================
 
 @app.route('/api/dashboard/stats', methods=['GET'])
@@ -282,13 +568,18 @@ def get_dashboard_stats():
     festival = request.args.get('festival', 'Diwali')
     
     # Get summary for festival
-    summary = get_festival_summary(festival, AREA_DF)
+    summary = get_rollup_cube().festival_summary(festival)
     
-    # Get top shops by waste
-    top_shops = get_shop_comparison(festival=festival, sales_df=SALES_DF)[:5]
+    # Get top shops by waste; only festivals with sales are cached so arbitrary names can't grow the cache
+    top_shops = []
+    if festival in DATASETS.cached('sales_festivals', lambda: set(DATASETS.sales['Festival'].unique())):
+        top_shops = DATASETS.cached(
+            ('top_waste_shops', festival),
+            lambda: get_shop_comparison(festival=festival, sales_df=DATASETS.sales)[:5]
+        )
     
     # Get hotspots
-    hotspots = identify_hotspots(festival, AREA_DF)
+    hotspots = get_festival_hotspots(festival)
     critical_hotspots = [h for h in hotspots if h['priority'] == 'CRITICAL']
     
     return jsonify({
@@ -296,128 +587,248 @@ def get_dashboard_stats():
         'summary': summary,
         'top_waste_shops': top_shops,
         'critical_hotspots': critical_hotspots,
-        'total_shops': len(get_all_shops(SALES_DF)),
-        'total_areas': len(get_all_areas(AREA_DF))
+        'total_shops': len(get_shop_directory()),
+        'total_areas': len(_area_list())
     })
 
 
+# ==================== LIVE UPDATES ====================
+
+@app.route('/api/live/<festival>', methods=['GET'])
+def live_updates(festival):
+    """
+    Server-Sent Events stream of a festival's summary and hotspot changes.
+    
+    Sends a snapshot, then a delta per dataset version. Reconnecting clients
+    send Last-Event-ID (or ?since=) to receive only what they missed.
+    """
+    from flask import Response, stream_with_context
+    
+    if not festival_exists(festival):
+        return jsonify({'error': 'Festival not found'}), 404
+    
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    last_version = int(since) if since and since.isdigit() else None
+    
+    return Response(
+        stream_with_context(BROADCASTER.stream(festival, last_version)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/batch', methods=['POST'])
+def batch_requests():
+    """
+    Answer several GET requests in one round trip, against one dataset version.
+    
+    Body: {requests: [{id, path}]}, e.g. path "/api/hotspots/Diwali/summary".
+    """
+    from flask import Response
+    
+    try:
+        body = run_batch(app, request.get_json(silent=True), request.headers)
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = Response(body, mimetype='application/json')
+    if len(body) >= MIN_GZIP_BYTES and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.set_data(gzip_bytes(body))
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+# ==================== ANALYTICAL QUERIES ====================
+
+@app.route('/api/query', methods=['POST'])
+def analytical_query():
+    """
+    Run a constrained analytical query over sales, areas or timeseries.
+    
+    Body: {dataset, filters: [{column, op, value}], group_by: [...],
+           aggregates: [{fn, column, as}], order_by: [{column, desc}], limit}
+    """
+    spec = request.get_json(silent=True)
+    
+    try:
+        result = run_query(spec)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except QueryTimeout:
+        return jsonify({'error': 'Query exceeded the time limit'}), 504
+    
+    return jsonify(result)
+
+
+@app.route('/api/query/schema', methods=['GET'])
+def analytical_query_schema():
+    """List the datasets, columns and operations the query API accepts."""
+    return jsonify(query_schema())
+
+
 # ==================== EXPORT ENDPOINTS ====================
 
+def _export_options():
+    """Read ?format= and ?gzip= export options, or return None for an unknown format."""
+    fmt = request.args.get('format', 'csv').lower()
+    gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    if fmt not in EXPORT_FORMATS:
+        return None, gzip
+    return fmt, gzip
+
+
+def _unsupported_format():
+    return jsonify({'error': f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+
+HOTSPOT_EXPORT_COLUMNS = [
+    'rank', 'area', 'pincode', 'population',
+    'baseline_waste_kg', 'extra_waste_kg', 'total_waste_kg',
+    'waste_increase_percent', 'priority', 'extra_trucks', 'extra_workers', 'days_needed'
+]
+
+HOTSPOT_CSV_HEADER = [
+    'Rank', 'Area', 'Pincode', 'Population', 
+    'Baseline Waste (kg)', 'Extra Waste (kg)', 'Total Waste (kg)',
+    'Increase %', 'Priority', 'Extra Trucks', 'Extra Workers', 'Days Needed'
+]
+
+
+@app.route('/api/export/hotspots/<festival>', methods=['GET'])
 @app.route('/api/export/hotspots/<festival>/csv', methods=['GET'])
-def export_hotspots_csv(festival):
-    """Export hotspots data as CSV."""
-    from flask import Response
-    import io
-    import csv
+def export_hotspots(festival):
+    """Stream hotspots data as CSV or NDJSON (?format=csv|ndjson, ?gzip=1)."""
+    fmt, gzip = _export_options()
+    if fmt is None:
+        return _unsupported_format()
     
-    hotspots = identify_hotspots(festival, AREA_DF)
+    hotspots = get_hotspot_frame(festival, DATASETS.areas)
     
-    if not hotspots:
+    if hotspots.empty:
         return jsonify({'error': 'Festival not found'}), 404
     
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Rank', 'Area', 'Pincode', 'Population', 
-        'Baseline Waste (kg)', 'Extra Waste (kg)', 'Total Waste (kg)',
-        'Increase %', 'Priority', 'Extra Trucks', 'Extra Workers', 'Days Needed'
-    ])
-    
-    # Write data
-    for idx, h in enumerate(hotspots, 1):
-        writer.writerow([
-            idx,
-            h['area'],
-            h['pincode'],
-            h['population'],
-            h['baseline_waste_kg'],
-            h['extra_waste_kg'],
-            h['total_waste_kg'],
-            f"{h['waste_increase_percent']}%",
-            h['priority'],
-            h['recommended_resources']['extra_trucks'],
-            h['recommended_resources']['extra_workers'],
-            h['recommended_resources']['days_needed']
-        ])
-    
-    output.seek(0)
+    hotspots.insert(0, 'rank', range(1, len(hotspots) + 1))
     
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment; filename=hotspots_{festival}_2025.csv'}
+    if fmt == 'csv':
+        return stream_export(
+            hotspots, HOTSPOT_EXPORT_COLUMNS, fmt, f'hotspots_{festival}_2025',
+            header=HOTSPOT_CSV_HEADER,
+            formatters={7: lambda v: f"{v}%"},
+            gzip=gzip
+        )
+    return stream_export(hotspots, HOTSPOT_EXPORT_COLUMNS, fmt, f'hotspots_{festival}_2025', gzip=gzip)
+
+
+@app.route('/api/export/shops/<shop_id>/products', methods=['GET'])
+def export_shop_products(shop_id):
+    """Stream a shop's per-product waste breakdown as CSV or NDJSON."""
+    fmt, gzip = _export_options()
+    if fmt is None:
+        return _unsupported_format()
+    
+    festival = request.args.get('festival')
+    breakdown = get_product_breakdown(shop_id, festival, DATASETS.sales)
+    
+    if breakdown is None:
+        return jsonify({'error': 'Shop not found'}), 404
+    
+    return stream_export(
+        breakdown, list(breakdown.columns), fmt,
+        f"shop_{shop_id}_products_{festival or 'all'}",
+        gzip=gzip
+    )
+
+
+@app.route('/api/export/shops/comparison', methods=['GET'])
+def export_shop_comparison():
+    """Stream the full shop waste comparison (every shop, not just the top 20)."""
+    fmt, gzip = _export_options()
+    if fmt is None:
+        return _unsupported_format()
+    
+    area = request.args.get('area')
+    festival = request.args.get('festival')
+    comparison = get_shop_comparison_frame(area, festival, DATASETS.sales)
+    
+    return stream_export(
+        comparison, list(comparison.columns), fmt,
+        f"shop_comparison_{area or 'all'}_{festival or 'all'}",
+        gzip=gzip
     )
 
 
 @app.route('/api/export/action-plan/<festival>', methods=['GET'])
 def export_action_plan(festival):
-    """Generate and export municipal action plan."""
+    """Export the municipal action plan (?format=text|markdown|pdf, optional ?trucks=&workers=&days=, ?routes=1)."""
     from flask import Response
     
-    hotspots = identify_hotspots(festival, AREA_DF)
-    summary = get_festival_summary(festival, AREA_DF)
+    fmt = request.args.get('format', 'text').lower()
+    if fmt not in REPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format, use one of: {', '.join(REPORT_FORMATS)}"}), 400
     
-    if not hotspots:
-        return jsonify({'error': 'Festival not found'}), 404
+    content = render_action_plan(
+        festival, fmt, fleet=_fleet_args(), routes=request.args.get('routes') == '1'
+    )
     
-    # Generate action plan text
-    lines = []
-    lines.append("=" * 60)
-    lines.append(f"MUNICIPAL WASTE MANAGEMENT ACTION PLAN")
-    lines.append(f"Festival: {festival} 2025")
-    lines.append("=" * 60)
-    lines.append("")
-    
-    lines.append("EXECUTIVE SUMMARY")
-    lines.append("-" * 40)
-    lines.append(f"Total Areas Affected: {summary['total_areas']}")
-    lines.append(f"Total Extra Waste Expected: {summary['total_extra_waste_kg']:,.0f} kg")
-    lines.append(f"Average Waste Increase: {summary['average_increase_percent']:.1f}%")
-    lines.append(f"Critical Priority Areas: {summary['critical_areas']}")
-    lines.append(f"High Priority Areas: {summary['high_priority_areas']}")
-    lines.append(f"Total Extra Trucks Required: {summary['total_extra_trucks_needed']}")
-    lines.append(f"Total Extra Workers Required: {summary['total_extra_workers_needed']}")
-    lines.append("")
-    
-    lines.append("CRITICAL ZONES - IMMEDIATE ACTION REQUIRED")
-    lines.append("-" * 40)
-    critical = [h for h in hotspots if h['priority'] == 'CRITICAL']
-    for h in critical:
-        lines.append(f"\n{h['area']} (Pincode: {h['pincode']})")
-        lines.append(f"  Population: {h['population']:,}")
-        lines.append(f"  Extra Waste: {h['extra_waste_kg']:,.0f} kg ({h['waste_increase_percent']:.1f}% increase)")
-        lines.append(f"  Resources: {h['recommended_resources']['extra_trucks']} trucks, {h['recommended_resources']['extra_workers']} workers")
-        lines.append(f"  Duration: {h['recommended_resources']['days_needed']} days")
-    
-    lines.append("")
-    lines.append("HIGH PRIORITY ZONES")
-    lines.append("-" * 40)
-    high = [h for h in hotspots if h['priority'] == 'HIGH']
-    for h in high[:10]:
-        lines.append(f"{h['area']}: {h['extra_waste_kg']:,.0f} kg extra, {h['recommended_resources']['extra_trucks']} trucks needed")
-    
-    lines.append("")
-    lines.append("RECOMMENDED ACTIONS")
-    lines.append("-" * 40)
-    lines.append("1. Pre-position waste collection vehicles in critical areas 2 days before festival")
-    lines.append("2. Set up temporary waste collection points near major markets")
-    lines.append("3. Deploy additional workforce in morning and evening shifts")
-    lines.append("4. Coordinate with local shops for source segregation")
-    lines.append("5. Arrange for special vehicles for festival-specific waste (flowers, decorations)")
-    lines.append("")
-    lines.append("=" * 60)
-    lines.append("Generated by Festival Waste Prediction System")
-    lines.append("=" * 60)
-    
-    content = "\n".join(lines)
+    if content is None:
+        return jsonify({'error': 'Festival not found'}), 404
     
+    mimetype, extension = REPORT_FORMATS[fmt]
     return Response(
         content,
+        mimetype=mimetype,
+        headers={'Content-Disposition': content_disposition(f'action_plan_{festival}_{REPORT_YEAR}.{extension}')}
+    )
+
+
+@app.route('/api/export/action-plans', methods=['GET'])
+def export_all_action_plans():
+    """Export every festival's action plan as a zip archive (?format=text|markdown|pdf)."""
+    from flask import Response
+    
+    fmt = request.args.get('format', 'text').lower()
+    if fmt not in REPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format, use one of: {', '.join(REPORT_FORMATS)}"}), 400
+    
+    return Response(
+        render_action_plan_archive(fmt),
+        mimetype='application/zip',
+        headers={'Content-Disposition': content_disposition(f'action_plans_{REPORT_YEAR}_{fmt}.zip')}
+    )
+
+
+# ==================== DIAGNOSTICS ====================
+
+@app.route('/api/admin/slow-requests', methods=['GET'])
+@token_required
+@admin_required
+def slow_requests():
+    """This worker's recent slow requests with per-stage timings, slowest first (?limit=)."""
+    limit = request.args.get('limit', type=int)
+    
+    return jsonify({
+        'worker': os.getpid(),
+        'threshold_ms': SLOW_REQUESTS.threshold_ms,
+        'requests': SLOW_REQUESTS.slowest(limit)
+    })
+
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@token_required
+@admin_required
+def get_profile(profile_id):
+    """Download a stored request profile in folded stack format (for flamegraph.pl or speedscope)."""
+    from flask import Response
+    
+    folded = load_profile(profile_id)
+    if folded is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    
+    return Response(
+        folded,
         mimetype='text/plain',
-        headers={'Content-Disposition': f'attachment; filename=action_plan_{festival}_2025.txt'}
+        headers={'Content-Disposition': content_disposition(f'{profile_id}.folded')}
     )
 
 
@@ -565,17 +976,30 @@ def get_current_user():
 
 # ==================== AI ENDPOINTS ====================
 
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(e):
+    """Answer a request turned away by admission control with 429/503 and Retry-After."""
+    response = jsonify(e.body())
+    response.status_code = e.status
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
 @app.route('/api/ai/chat', methods=['POST'])
 def ai_chat_endpoint():
     """AI chat assistant endpoint."""
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     message = data.get('message', '')
     context = data.get('context', {})
     
     if not message:
         return jsonify({'error': 'Message is required'}), 400
     
-    result = ai_chat(message, context)
+    # Ground the reply in the few dataset facts that match the question
+    facts = retrieve_facts(message, context)
+    with admission():
+        result = ai_chat(message, context, facts)
+    result['sources'] = facts
     return jsonify(result)
 
 
@@ -583,13 +1007,14 @@ def ai_chat_endpoint():
 def ai_prediction_summary(festival):
     """Get AI-generated prediction summary for a festival."""
     # Get festival statistics
-    summary = get_festival_summary(AREA_DF, SALES_DF, festival)
+    summary = get_rollup_cube().festival_summary(festival)
     
     if not summary:
         return jsonify({'error': 'Festival not found'}), 404
     
     # Generate AI summary
-    result = generate_prediction_summary(festival, summary)
+    with admission():
+        result = generate_prediction_summary(festival, summary)
     return jsonify({
         'festival': festival,
         'stats': summary,
@@ -600,6 +1025,24 @@ def ai_prediction_summary(festival):
 
 # ==================== MAIN ====================
 
+def warm_indexes():
+    """
+    Build the derived structures requests share before any request arrives.
+    
+    gunicorn.conf.py calls this in the master when the app is preloaded, so
+    forked workers inherit them instead of each building its own.
+    """
+    get_shop_directory()
+    get_rollup_cube()
+    _area_list()
+    for festival in DATASETS.areas['Festival'].unique().tolist():
+        get_festival_hotspots(festival)
+        get_hotspot_layer(festival)
+    get_adoption_model()
+    get_similarity_index()
+    get_chat_index()
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     print(f"\nFestival Waste Prediction API running on http://localhost:{port}")
@@ -0,0 +1,327 @@
+"""
+Async serving mode: the API as an ASGI app, for I/O-bound load.
+
+The routes that wait on Gemini or Supabase are async views here, using the
+SDKs' asyncio clients, so one worker keeps many prompts and logins in flight
+instead of holding a worker (or a thread) for every round trip. /api/live
+streams are async too, so open dashboards don't hold WSGI threads. The pandas
+work they need runs in a bounded thread pool (CPU_POOL_SIZE threads), never
+on the event loop. Every other route is the Flask app from app.py, mounted
+unchanged and run in a thread pool by a2wsgi, so both modes serve the same
+API from the same modules.
+
+    uvicorn asgi:app --workers 4
+    WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn asgi:app   # keeps gunicorn.conf.py preloading
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from admission import AdmissionRejected, admission_async, classify
+from app import app as flask_app, static_alternatives, marketing_products
+from auth import authenticate_user_async, register_user_async, generate_token
+from chat_retrieval import retrieve_facts
+from data_loader import DATASETS
+from enrichment import eco_suggestions_async, marketing_messages_async
+from gemini_suggester import generate_municipality_insights_async, ai_chat_async, generate_prediction_summary_async
+from hotspot_analyzer import get_festival_hotspots, festival_exists
+from live_updates import BROADCASTER
+from metrics import record_request, track_in_flight
+from rollup_cube import get_rollup_cube
+from serialization import dumps_bytes
+from waste_calculator import calculate_shop_waste
+
+# Pandas work for the async routes; threads beyond the core count only contend for the GIL
+CPU_POOL_SIZE = int(os.getenv('CPU_POOL_SIZE', str(os.cpu_count() or 4)))
+# Threads running the mounted Flask routes
+WSGI_THREADS = int(os.getenv('WSGI_THREADS', '32'))
+
+CPU_POOL = ThreadPoolExecutor(max_workers=CPU_POOL_SIZE, thread_name_prefix='cpu')
+
+
+async def run_cpu(func, *args):
+    """Run a blocking function in CPU_POOL and await its result."""
+    return await asyncio.get_running_loop().run_in_executor(CPU_POOL, partial(func, *args))
+
+
+def json_response(obj, status=200):
+    return Response(dumps_bytes(obj), status_code=status, media_type='application/json')
+
+
+async def json_body(request):
+    """The request's JSON object, or None if the body is missing or not a JSON object."""
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def endpoint(name):
+    """Record metrics for an async view under ``name``, the endpoint of the Flask view it replaces."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request):
+            start = time.perf_counter()
+            with track_in_flight(name):
+                response = await view(request)
+            record_request(request.method, name, response.status_code, time.perf_counter() - start)
+            return response
+        return wrapped
+    return decorator
+
+
+def client(request):
+    """(key, lane) of the request's client, as ``classify`` returns."""
+    return classify(request.headers.get('authorization'), request.client.host if request.client else None,
+                    request.headers.get('x-forwarded-for'))
+
+
+def admitted(view):
+    """Answer AdmissionRejected from an async AI view's admission_async block with 429/503, as app.py does."""
+    @wraps(view)
+    async def wrapped(request):
+        try:
+            return await view(request)
+        except AdmissionRejected as e:
+            response = json_response(e.body(), e.status)
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+    return wrapped
+
+
+def _festival_summary(festival):
+    return get_rollup_cube().festival_summary(festival)
+
+
+# ==================== SHOP ANALYSIS ====================
+
+@endpoint('get_shop_suggestions')
+async def get_shop_suggestions(request):
+    """Get eco suggestions for a shop: rule-based at once, Gemini-enriched once ready."""
+    shop_id = request.path_params['shop_id']
+    festival = request.query_params.get('festival', 'Diwali')
+
+    shop_data = await run_cpu(calculate_shop_waste, shop_id, festival, DATASETS.sales)
+
+    if shop_data is None:
+        return json_response({'error': 'Shop not found'}, 404)
+
+    high_waste = shop_data.get('high_waste_products', [])
+
+    if not high_waste:
+        return json_response({
+            'message': 'No high-waste products found for this shop',
+            'suggestions': None
+        })
+
+    suggestions = await eco_suggestions_async(high_waste, shop_data['shop_name'], festival, client=client(request))
+
+    return json_response({
+        'shop': shop_data['shop_name'],
+        'festival': festival,
+        'high_waste_products': high_waste,
+        'ai_suggestions': suggestions,
+        'static_alternatives': await run_cpu(static_alternatives, high_waste)
+    })
+
+
+@endpoint('get_shop_marketing')
+async def get_shop_marketing(request):
+    """Generate marketing messages for a shop: templated at once, Gemini-enriched once ready."""
+    shop_id = request.path_params['shop_id']
+    festival = request.query_params.get('festival', 'Diwali')
+
+    shop_data = await run_cpu(calculate_shop_waste, shop_id, festival, DATASETS.sales)
+
+    if shop_data is None:
+        return json_response({'error': 'Shop not found'}, 404)
+
+    messages = await marketing_messages_async(
+        shop_data['shop_name'], festival, await run_cpu(marketing_products), client=client(request)
+    )
+
+    return json_response({
+        'shop': shop_data['shop_name'],
+        'festival': festival,
+        'marketing': messages
+    })
+
+
+# ==================== HOTSPOT ANALYSIS ====================
+
+@endpoint('get_hotspots_insights')
+@admitted
+async def get_hotspots_insights(request):
+    """Get AI-powered insights for municipality."""
+    festival = request.path_params['festival']
+    hotspots = await run_cpu(get_festival_hotspots, festival)
+
+    if not hotspots:
+        return json_response({'error': 'Festival not found'}, 404)
+
+    async with admission_async(*client(request)):
+        insights = await generate_municipality_insights_async(hotspots, festival)
+
+    return json_response({
+        'festival': festival,
+        'top_hotspots': hotspots[:5],
+        'ai_insights': insights
+    })
+
+
+# ==================== AUTH ENDPOINTS ====================
+
+@endpoint('login')
+async def login(request):
+    """Authenticate user and return JWT token."""
+    data = await json_body(request)
+
+    if not data:
+        return json_response({'error': 'Missing request body'}, 400)
+
+    username = data.get('username')
+    password = data.get('password')
+
+    if not username or not password:
+        return json_response({'error': 'Username and password required'}, 400)
+
+    user = await authenticate_user_async(username, password)
+
+    if not user:
+        return json_response({'error': 'Invalid credentials'}, 401)
+
+    return json_response({
+        'token': generate_token(user['username'], user['role'], user['name']),
+        'user': user,
+        'message': 'Login successful'
+    })
+
+
+@endpoint('register')
+async def register(request):
+    """Register a new user."""
+    data = await json_body(request)
+
+    if not data:
+        return json_response({'error': 'Missing request body'}, 400)
+
+    username = data.get('username')
+    password = data.get('password')
+    name = data.get('name')
+    email = data.get('email')
+    role = data.get('role', 'shopkeeper')
+
+    if not username or not password or not name or not email:
+        return json_response({'error': 'All fields are required'}, 400)
+
+    if len(password) < 6:
+        return json_response({'error': 'Password must be at least 6 characters'}, 400)
+
+    result = await register_user_async(username, password, name, email, role)
+
+    if 'error' in result:
+        return json_response(result, 400)
+
+    return json_response({
+        'message': 'Registration successful',
+        'user': {
+            'username': result['username'],
+            'name': result['name'],
+            'role': result['role']
+        }
+    }, 201)
+
+
+# ==================== AI ENDPOINTS ====================
+
+@endpoint('ai_chat_endpoint')
+@admitted
+async def ai_chat_endpoint(request):
+    """AI chat assistant endpoint."""
+    data = await json_body(request) or {}
+    message = data.get('message', '')
+    context = data.get('context', {})
+
+    if not message:
+        return json_response({'error': 'Message is required'}, 400)
+
+    facts = await run_cpu(retrieve_facts, message, context)
+    async with admission_async(*client(request)):
+        result = await ai_chat_async(message, context, facts)
+    result['sources'] = facts
+    return json_response(result)
+
+
+@endpoint('ai_prediction_summary')
+@admitted
+async def ai_prediction_summary(request):
+    """Get AI-generated prediction summary for a festival."""
+    festival = request.path_params['festival']
+    summary = await run_cpu(_festival_summary, festival)
+
+    if not summary:
+        return json_response({'error': 'Festival not found'}, 404)
+
+    async with admission_async(*client(request)):
+        result = await generate_prediction_summary_async(festival, summary)
+    return json_response({
+        'festival': festival,
+        'stats': summary,
+        'ai_summary': result.get('summary'),
+        'success': result.get('success', False)
+    })
+
+
+# ==================== LIVE UPDATES ====================
+
+@endpoint('live_updates')
+async def live_updates(request):
+    """
+    Server-Sent Events stream of a festival's summary and hotspot changes.
+
+    Sends a snapshot, then a delta per dataset version. Reconnecting clients
+    send Last-Event-ID (or ?since=) to receive only what they missed.
+    """
+    festival = request.path_params['festival']
+
+    if not await run_cpu(festival_exists, festival):
+        return json_response({'error': 'Festival not found'}, 404)
+
+    since = request.headers.get('last-event-id') or request.query_params.get('since')
+    last_version = int(since) if since and since.isdigit() else None
+
+    return StreamingResponse(
+        BROADCASTER.stream_async(festival, last_version),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+routes = [
+    Route('/api/shops/{shop_id}/suggestions', get_shop_suggestions, methods=['GET']),
+    Route('/api/shops/{shop_id}/marketing', get_shop_marketing, methods=['GET']),
+    Route('/api/hotspots/{festival}/insights', get_hotspots_insights, methods=['GET']),
+    Route('/api/auth/login', login, methods=['POST']),
+    Route('/api/auth/register', register, methods=['POST']),
+    Route('/api/ai/chat', ai_chat_endpoint, methods=['POST']),
+    Route('/api/ai/summary/{festival}', ai_prediction_summary, methods=['GET']),
+    Route('/api/live/{festival}', live_updates, methods=['GET']),
+    # Everything else, unchanged
+    Mount('/', app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+]
+
+# Same policy as CORS(app) in app.py; it also answers preflights for the mounted routes
+app = Starlette(routes=routes, middleware=[
+    Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+])
@@ -7,19 +7,45 @@ from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
 from dotenv import load_dotenv
+from metrics import track_supabase
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 # Secret key for JWT - in production, use a secure secret
 SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'festival-waste-prediction-secret-key-2024')
 
-# Try to import Supabase, fallback to demo users if not available
-try:
-    from database import supabase
-    USE_SUPABASE = True
-except Exception as e:
-    print(f"Supabase not available, using demo users: {e}")
-    USE_SUPABASE = False
+# Supabase is imported and connected on first use; without credentials, or if
+# the client fails to load, fall back to demo users
+USE_SUPABASE = bool(os.getenv('SUPABASE_URL') and os.getenv('SUPABASE_KEY'))
+_supabase = None
+_async_supabase = None
+
+
+def get_supabase():
+    """Return the Supabase client, importing it on first use, or None if unavailable."""
+    global USE_SUPABASE, _supabase
+    if _supabase is None and USE_SUPABASE:
+        try:
+            from database import supabase
+            _supabase = supabase
+        except Exception as e:
+            print(f"Supabase not available, using demo users: {e}")
+            USE_SUPABASE = False
+    return _supabase
+
+
+async def get_async_supabase():
+    """Return the asyncio Supabase client used by asgi.py, connecting on first use, or None if unavailable."""
+    global USE_SUPABASE, _async_supabase
+    if _async_supabase is None and USE_SUPABASE:
+        try:
+            from database import get_async_client
+            _async_supabase = await get_async_client()
+        except Exception as e:
+            print(f"Supabase not available, using demo users: {e}")
+            USE_SUPABASE = False
+    return _async_supabase
+
 
 # Fallback demo users (used if Supabase connection fails)
 DEMO_USERS = {
@@ -67,27 +93,63 @@ def verify_token(token):
         return None
 
 
+def _hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def _supabase_login(rows, username, password_hash):
+    """The user in a Supabase ``users`` lookup if the password matches, else None."""
+    if rows and len(rows) > 0:
+        user = rows[0]
+        if user['password_hash'] == password_hash:
+            return {
+                'username': username,
+                'role': user['role'],
+                'name': user['name'],
+                'email': user.get('email', '')
+            }
+    return None
+
+
 def authenticate_user(username, password):
     """Authenticate user credentials - tries Supabase first, then fallback to demo users."""
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
+    password_hash = _hash_password(password)
     
     # Try Supabase authentication
-    if USE_SUPABASE:
+    supabase = get_supabase()
+    if supabase is not None:
         try:
-            response = supabase.table('users').select('*').eq('username', username).execute()
-            if response.data and len(response.data) > 0:
-                user = response.data[0]
-                if user['password_hash'] == password_hash:
-                    return {
-                        'username': username,
-                        'role': user['role'],
-                        'name': user['name'],
-                        'email': user.get('email', '')
-                    }
+            with track_supabase('users', 'select'):
+                response = supabase.table('users').select('*').eq('username', username).execute()
+            user = _supabase_login(response.data, username, password_hash)
+            if user:
+                return user
             # User not found in Supabase, try demo users
         except Exception as e:
             print(f"Supabase auth error: {e}")
     
+    return _demo_login(username, password_hash)
+
+
+async def authenticate_user_async(username, password):
+    """Async ``authenticate_user``, querying Supabase without blocking the event loop."""
+    password_hash = _hash_password(password)
+    
+    supabase = await get_async_supabase()
+    if supabase is not None:
+        try:
+            with track_supabase('users', 'select'):
+                response = await supabase.table('users').select('*').eq('username', username).execute()
+            user = _supabase_login(response.data, username, password_hash)
+            if user:
+                return user
+        except Exception as e:
+            print(f"Supabase auth error: {e}")
+    
+    return _demo_login(username, password_hash)
+
+
+def _demo_login(username, password_hash):
     # Fallback to demo users
     if username in DEMO_USERS:
         user = DEMO_USERS[username]
@@ -102,34 +164,40 @@ def authenticate_user(username, password):
     return None
 
 
-def register_user(username, password, name, email, role='shopkeeper'):
-    """Register a new user - tries Supabase first, then fallback to demo users."""
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
-    
+def _normalise_role(role):
     # Validate role
     valid_roles = ['shopkeeper', 'municipality', 'Shopkeeper', 'Municipality']
     if role not in valid_roles:
         role = 'Shopkeeper'
     
     # Capitalize role for consistency
-    role = role.capitalize()
+    return role.capitalize()
+
+
+def register_user(username, password, name, email, role='shopkeeper'):
+    """Register a new user - tries Supabase first, then fallback to demo users."""
+    password_hash = _hash_password(password)
+    role = _normalise_role(role)
     
     # Try Supabase registration
-    if USE_SUPABASE:
+    supabase = get_supabase()
+    if supabase is not None:
         try:
             # Check if username already exists
-            existing = supabase.table('users').select('username').eq('username', username).execute()
+            with track_supabase('users', 'select'):
+                existing = supabase.table('users').select('username').eq('username', username).execute()
             if existing.data and len(existing.data) > 0:
                 return {'error': 'Username already exists'}
             
             # Create new user
-            response = supabase.table('users').insert({
-                'username': username,
-                'password_hash': password_hash,
-                'name': name,
-                'email': email,
-                'role': role
-            }).execute()
+            with track_supabase('users', 'insert'):
+                response = supabase.table('users').insert({
+                    'username': username,
+                    'password_hash': password_hash,
+                    'name': name,
+                    'email': email,
+                    'role': role
+                }).execute()
             
             if response.data:
                 return {
@@ -142,6 +210,45 @@ def register_user(username, password, name, email, role='shopkeeper'):
             print(f"Supabase registration error: {e}")
             # Fall through to demo user creation
     
+    return _register_demo_user(username, password_hash, name, email, role)
+
+
+async def register_user_async(username, password, name, email, role='shopkeeper'):
+    """Async ``register_user``, writing to Supabase without blocking the event loop."""
+    password_hash = _hash_password(password)
+    role = _normalise_role(role)
+    
+    supabase = await get_async_supabase()
+    if supabase is not None:
+        try:
+            with track_supabase('users', 'select'):
+                existing = await supabase.table('users').select('username').eq('username', username).execute()
+            if existing.data and len(existing.data) > 0:
+                return {'error': 'Username already exists'}
+            
+            with track_supabase('users', 'insert'):
+                response = await supabase.table('users').insert({
+                    'username': username,
+                    'password_hash': password_hash,
+                    'name': name,
+                    'email': email,
+                    'role': role
+                }).execute()
+            
+            if response.data:
+                return {
+                    'success': True,
+                    'username': username,
+                    'name': name,
+                    'role': role
+                }
+        except Exception as e:
+            print(f"Supabase registration error: {e}")
+    
+    return _register_demo_user(username, password_hash, name, email, role)
+
+
+def _register_demo_user(username, password_hash, name, email, role):
     # Fallback: Add to demo users (in-memory only)
     if username in DEMO_USERS:
         return {'error': 'Username already exists'}
@@ -196,7 +303,7 @@ def admin_required(f):
         if not hasattr(request, 'current_user'):
             return jsonify({'error': 'Authentication required'}), 401
         
-        if request.current_user.get('role') != 'admin':
+        if str(request.current_user.get('role', '')).lower() != 'admin':
             return jsonify({'error': 'Admin access required'}), 403
         
         return f(*args, **kwargs)
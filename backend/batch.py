@@ -0,0 +1,119 @@
+"""Composite GET requests answered against one dataset snapshot."""
+
+import sys
+import zlib
+from flask import request
+from data_loader import DATASETS
+from serialization import dumps_bytes
+
+MAX_SUBREQUESTS = 20
+
+# Endpoints that stream, recurse or aren't JSON reads, and the Gemini-backed ones,
+# whose admission queue and model call would hold the batch's snapshot open
+EXCLUDED_ENDPOINTS = {
+    'batch_requests', 'live_updates',
+    'get_hotspots_insights', 'ai_chat_endpoint', 'ai_prediction_summary'
+}
+
+# Request headers passed on to sub-requests
+FORWARDED_HEADERS = ('Authorization', 'X-Forwarded-For')
+
+# Responses smaller than this aren't worth compressing
+MIN_GZIP_BYTES = 1024
+
+
+class BatchError(ValueError):
+    """Raised for a malformed batch body."""
+
+
+def normalize_batch(spec):
+    """
+    Validate a batch body.
+
+    Args:
+        spec: {"requests": [{"id": ..., "path": "/api/..."}]}; ids default to the
+            position in the list
+
+    Returns:
+        list: (id, path) pairs
+
+    Raises:
+        BatchError: If the body is malformed or has too many sub-requests
+    """
+    if not isinstance(spec, dict) or not isinstance(spec.get('requests'), list):
+        raise BatchError('Body must be {"requests": [{"id", "path"}]}')
+
+    subrequests = spec['requests']
+    if not 1 <= len(subrequests) <= MAX_SUBREQUESTS:
+        raise BatchError(f'A batch holds 1 to {MAX_SUBREQUESTS} requests')
+
+    result = []
+    for i, sub in enumerate(subrequests):
+        if not isinstance(sub, dict) or not isinstance(sub.get('path'), str) or not sub['path'].startswith('/api/'):
+            raise BatchError(f'requests[{i}].path must be an /api/ path')
+        result.append((str(sub.get('id', i)), sub['path']))
+
+    if len({sub_id for sub_id, _ in result}) != len(result):
+        raise BatchError('Request ids must be unique')
+    return result
+
+
+def dispatch(app, path, headers=None, remote_addr=None):
+    """
+    Run one GET sub-request through the app's routing, hooks and error handlers.
+
+    An unhandled exception in the view is logged and answered with 500 in its
+    slot, so the batch's other responses still go out.
+
+    Returns:
+        tuple: (status code, JSON body bytes)
+    """
+    # The client's address, so sub-requests are rate limited as the client and not as the server
+    environ_base = {'REMOTE_ADDR': remote_addr} if remote_addr else None
+    with app.test_request_context(path, method='GET', headers=headers, environ_base=environ_base):
+        if request.endpoint in EXCLUDED_ENDPOINTS:
+            return 400, dumps_bytes({'error': 'Endpoint not available in a batch'})
+
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            app.log_exception(sys.exc_info())
+            return 500, dumps_bytes({'error': 'Internal server error'})
+        try:
+            if response.is_streamed or not response.is_json:
+                # Keep the status of routing errors such as 404, whose pages are HTML
+                if response.status_code >= 400:
+                    return response.status_code, dumps_bytes({'error': response.status})
+                return 400, dumps_bytes({'error': 'Endpoint does not return JSON'})
+            return response.status_code, response.get_data() or b'null'
+        finally:
+            response.close()
+
+
+def run_batch(app, spec, headers=None):
+    """
+    Answer a list of GET sub-requests with one JSON body.
+
+    All sub-requests run inside one dataset snapshot, so they see the same
+    version, and share its cached intermediates (hotspot lists, summaries)
+    instead of recomputing them. Sub-response bodies are spliced in as the
+    bytes the endpoints produced, without re-encoding.
+
+    Returns:
+        bytes: {"version", "responses": [{"id", "status", "body"}]}
+    """
+    subrequests = normalize_batch(spec)
+    forwarded = {k: v for k, v in (headers or {}).items() if k in FORWARDED_HEADERS}
+
+    parts = []
+    with DATASETS.snapshot() as version:
+        for sub_id, path in subrequests:
+            status, body = dispatch(app, path, forwarded, request.remote_addr)
+            parts.append(b'{"id":%s,"status":%d,"body":%s}' % (dumps_bytes(sub_id), status, body.strip()))
+    return b'{"version":%d,"responses":[%s]}' % (version, b','.join(parts))
+
+
+def gzip_bytes(body):
+    """Gzip-compress a response body."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
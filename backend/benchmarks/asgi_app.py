@@ -0,0 +1,11 @@
+"""
+ASGI entry point serving asgi.py on local stand-ins, for HTTP benchmarks.
+
+    BENCH_SCALE=10 uvicorn --app-dir benchmarks asgi_app:app
+
+Reads the same environment variables as wsgi.py.
+"""
+
+import wsgi  # noqa: F401  installs the stand-ins before the app is imported
+
+from asgi import app
@@ -0,0 +1,109 @@
+"""
+Benchmark how many AI requests one worker keeps in flight, per serving mode.
+
+Serves the app on local stand-ins (standins.py, with the fake Gemini model
+answering after --llm-latency seconds) from a single worker of each server,
+then drives the AI routes with increasing numbers of concurrent clients.
+Reports throughput, latency percentiles and the average number of model
+calls the worker had in flight (throughput x model latency, by Little's law).
+Once a server keeps fewer than half the clients in flight it is saturated and
+higher levels are skipped, as their requests would only queue.
+
+The servers are gunicorn's sync worker (app.py), its gevent worker (app.py)
+and uvicorn (asgi.py, async Gemini client). The fake model's sleep yields
+under gevent; the real SDK's gRPC transport does not unless grpc's gevent
+support is enabled, so gevent numbers here are an upper bound.
+
+Usage:
+    python benchmarks/bench_ai_concurrency.py [--servers gunicorn,gevent,uvicorn] [--concurrency 1,8,32,128]
+    python benchmarks/bench_ai_concurrency.py --llm-latency 2 --requests 256
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_endpoints import HTTPClient, LOGIN, Sample, process_tree_rss_mb, start_server, summarize
+
+# The routes whose time is dominated by the Gemini round trip
+AI_SAMPLES = {
+    'ai_chat_endpoint': Sample('ai_chat_endpoint', 'POST', '/api/ai/chat',
+                               {'message': 'Where will waste peak?'}, False, False),
+    'ai_prediction_summary': Sample('ai_prediction_summary', 'GET', '/api/ai/summary/Diwali',
+                                    None, False, False),
+    'get_hotspots_insights': Sample('get_hotspots_insights', 'GET', '/api/hotspots/Diwali/insights',
+                                    None, False, False),
+}
+
+
+def login(port):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    connection.request('POST', '/api/auth/login', body=json.dumps(LOGIN),
+                       headers={'Content-Type': 'application/json'})
+    return json.loads(connection.getresponse().read())['token']
+
+
+def run_level(client, sample, concurrency, n_requests, llm_latency):
+    """Send ``n_requests`` with ``concurrency`` client threads; returns the summary."""
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda i: client.call(sample, i), range(concurrency)))  # open connections
+        start = time.perf_counter()
+        calls = list(pool.map(lambda i: client.call(sample, i), range(n_requests)))
+        elapsed = time.perf_counter() - start
+    latencies = [latency for _, latency in calls]
+    result = summarize(latencies, elapsed)
+    result['status'] = sorted({status for status, _ in calls})
+    result['in_flight'] = round(len(latencies) / elapsed * llm_latency, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--servers', default='gunicorn,gevent,uvicorn')
+    parser.add_argument('--concurrency', default='1,8,32,128', help='comma-separated client counts')
+    parser.add_argument('--endpoint', choices=sorted(AI_SAMPLES), default='ai_chat_endpoint')
+    parser.add_argument('--requests', type=int, default=128, help='timed requests per concurrency level')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='seconds the fake Gemini model takes')
+    parser.add_argument('--llm-cap', type=int, help='LLM_MAX_CONCURRENCY for the server (default: uncapped)')
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=5057)
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    args = parser.parse_args()
+    args.workers = 1
+    if args.llm_cap:
+        os.environ['LLM_MAX_CONCURRENCY'] = str(args.llm_cap)
+
+    sample = AI_SAMPLES[args.endpoint]
+    levels = [int(level) for level in args.concurrency.split(',')]
+    print(f'endpoint: {args.endpoint}  fake LLM latency: {args.llm_latency}s  workers: 1  '
+          f'LLM cap: {args.llm_cap or "none"}')
+    print(f"{'server':<10}{'clients':>8}{'status':>8}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'req/s':>9}{'in flight':>11}{'RSS MB':>9}")
+    for server in args.servers.split(','):
+        args.server = server
+        process = start_server(args)
+        try:
+            client = HTTPClient(args.port, login(args.port))
+            for concurrency in levels:
+                result = run_level(client, sample, concurrency, max(args.requests, concurrency), args.llm_latency)
+                status = ','.join(str(s) for s in result['status'])
+                print(f"{server:<10}{concurrency:>8}{status:>8}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                      f"{result['rps']:>9.1f}{result['in_flight']:>11.1f}{process_tree_rss_mb(process.pid):>9.1f}")
+                sys.stdout.flush()
+                if result['in_flight'] < concurrency / 2:
+                    print(f'{server:<10}saturated, skipping higher levels')
+                    break
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
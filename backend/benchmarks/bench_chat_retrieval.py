@@ -0,0 +1,67 @@
+"""
+Benchmark chat fact retrieval against city size.
+
+Builds the fact index over synthetic datasets (standins.py) at each scale,
+then times retrieve_facts over a fixed set of chat questions. Reports the
+index size and build time, retrieval latency percentiles and the prompt
+tokens the retrieved facts add.
+
+Usage:
+    python benchmarks/bench_chat_retrieval.py [--scales 1,10,50] [--queries 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+from chat_retrieval import CONTEXT_TOKENS, estimate_tokens, get_chat_index, retrieve_facts
+
+QUESTIONS = [
+    ('Which areas need the most trucks for Diwali?', None),
+    ('How much extra waste will Indiranagar produce during Holi?', None),
+    ('What should Shop 12 stop selling?', None),
+    ('Critical hotspots for Ganesh Chaturthi', None),
+    ('How many extra workers do we need?', {'festival': 'Christmas'}),
+    ('Is Whitefield a priority area?', {'festival': 'Sankranti', 'area': 'Whitefield'}),
+    ('Give me tips for an eco-friendly celebration', {'festival': 'Diwali'}),
+    ('Which shops in Jayanagar produce the most waste?', None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='1,10,50', help='comma-separated dataset scales')
+    parser.add_argument('--queries', type=int, default=5000, help='timed retrievals per scale')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"token budget: {CONTEXT_TOKENS}")
+    print(f"{'scale':>6}{'facts':>9}{'terms':>9}{'build s':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'tokens':>8}")
+    for scale in (int(s) for s in args.scales.split(',')):
+        standins.install(scale, args.seed)
+        start = time.perf_counter()
+        index = get_chat_index()
+        build = time.perf_counter() - start
+
+        latencies, tokens = [], []
+        for i in range(args.queries):
+            message, context = QUESTIONS[i % len(QUESTIONS)]
+            start = time.perf_counter()
+            facts = retrieve_facts(message, context)
+            latencies.append(time.perf_counter() - start)
+            tokens.append(sum(estimate_tokens(fact) for fact in facts))
+        latencies = np.array(latencies) * 1000
+        print(f"{scale:>6}{len(index):>9,}{len(index.postings):>9,}{build:>9.2f}"
+              f"{np.percentile(latencies, 50):>9.3f}{np.percentile(latencies, 99):>9.3f}"
+              f"{latencies.max():>9.3f}{np.mean(tokens):>8.0f}")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,440 @@
+"""
+Benchmark every API route in-process and over HTTP on local stand-ins.
+
+Each route gets a sample request, driven through the Flask test client or
+through a real server (gunicorn by default) by concurrent keep-alive clients.
+Gemini and Supabase are replaced by standins.py and the datasets are synthetic,
+scaled to a multiple of the mega_*.csv sizes. Reports p50/p95/p99 latency,
+throughput and memory per endpoint; results can be saved as a baseline and
+later runs compared against it, exiting non-zero on regressions.
+
+Usage:
+    python benchmarks/bench_endpoints.py [--scale 1] [--requests 50]
+    python benchmarks/bench_endpoints.py --mode http [--server gunicorn|gevent|uvicorn] [--workers 2] [--concurrency 8]
+    python benchmarks/bench_endpoints.py --save-baseline
+    python benchmarks/bench_endpoints.py --compare [--tolerance 0.25]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+
+sys.path.insert(0, BENCH_DIR)
+
+Sample = namedtuple('Sample', 'endpoint method path body auth stream')
+
+# Routes deliberately left out, with the reason shown in the report
+SKIPPED = {
+    'retrain_forecasts': 'rewrites dataset/area_forecasts.csv',
+    'static': 'no static files',
+    'get_profile': 'reads a profile file saved by an admin request',
+}
+
+# A slower run only counts as a regression beyond both the relative tolerance and these floors
+MIN_REGRESSION_MS = 1.0
+MIN_REGRESSION_MB = 1.0
+
+LOGIN = {'username': 'admin', 'password': 'admin123'}
+
+
+def sample_requests(datasets, festival='Diwali'):
+    """
+    One representative request per endpoint, using ids present in the datasets.
+
+    ``{n}`` in a body is replaced by the request number, for endpoints that
+    create records.
+    """
+    sales, areas = datasets['sales'], datasets['areas']
+    shop = sales['Shop_ID'].iloc[0]
+    area = areas['Area'].iloc[0]
+    pincode = int(areas['Pincode'].iloc[0])
+    google_token = 'e30.eyJzdWIiOiAiMTIzNDU2Nzg5MCIsICJlbWFpbCI6ICJiZW5jaEBleGFtcGxlLmNvbSJ9.sig'
+
+    def get(endpoint, path, auth=False, stream=False):
+        return Sample(endpoint, 'GET', path, None, auth, stream)
+
+    def post(endpoint, path, body, auth=False):
+        return Sample(endpoint, 'POST', path, body, auth, False)
+
+    return [
+        get('root', '/'),
+        get('health_check', '/api/health'),
+        get('prometheus_metrics', '/metrics'),
+        get('list_shops', '/api/shops?page_size=50'),
+        get('list_festivals', '/api/festivals'),
+        get('list_areas', '/api/areas'),
+        get('get_shop_analysis', f'/api/shops/{shop}?festival={festival}'),
+        get('get_shop_suggestions', f'/api/shops/{shop}/suggestions?festival={festival}'),
+        get('get_shop_marketing', f'/api/shops/{shop}/marketing?festival={festival}'),
+        get('get_similar_shops', f'/api/shops/{shop}/similar?festival={festival}'),
+        get('compare_shops', f'/api/compare-shops?festival={festival}'),
+        get('get_hotspots', f'/api/hotspots/{festival}'),
+        get('get_hotspots_summary', f'/api/hotspots/{festival}/summary'),
+        get('get_hotspots_insights', f'/api/hotspots/{festival}/insights'),
+        get('get_hotspots_simulation', f'/api/hotspots/{festival}/simulation?samples=2000&seed=1'),
+        get('get_hotspots_allocation', f'/api/hotspots/{festival}/allocation?trucks=40&workers=200'),
+        get('get_hotspot_routes', f'/api/hotspots/{festival}/routes'),
+        get('get_hotspots_geojson', f'/api/hotspots/{festival}/geojson'),
+        get('get_nearest_hotspots', f'/api/hotspots/{festival}/nearest?lat=12.97&lon=77.59&k=5'),
+        post('get_hotspots_adoption', f'/api/hotspots/{festival}/adoption', {'rate': 0.5}),
+        get('get_rollup', f'/api/rollup/{festival}?area={area}&pincode={pincode}'),
+        get('get_area_info', f'/api/areas/{area}'),
+        get('get_forecasts', f'/api/forecasts/{festival}'),
+        get('get_dashboard_stats', f'/api/dashboard/stats?festival={festival}'),
+        get('live_updates', f'/api/live/{festival}', stream=True),
+        post('batch_requests', '/api/batch', {'requests': [
+            {'path': f'/api/dashboard/stats?festival={festival}'},
+            {'path': f'/api/hotspots/{festival}'},
+            {'path': f'/api/hotspots/{festival}/summary'},
+            {'path': '/api/areas'},
+        ]}),
+        post('analytical_query', '/api/query', {
+            'dataset': 'sales', 'group_by': ['Area'],
+            'aggregates': [{'fn': 'sum', 'column': 'Estimated_Waste_kg', 'as': 'waste'}],
+            'order_by': [{'column': 'waste', 'desc': True}], 'limit': 10,
+        }),
+        get('analytical_query_schema', '/api/query/schema'),
+        get('export_hotspots', f'/api/export/hotspots/{festival}?format=csv'),
+        get('export_shop_products', f'/api/export/shops/{shop}/products?format=csv'),
+        get('export_shop_comparison', f'/api/export/shops/comparison?festival={festival}&format=csv'),
+        get('export_action_plan', f'/api/export/action-plan/{festival}'),
+        get('export_all_action_plans', '/api/export/action-plans'),
+        post('login', '/api/auth/login', LOGIN),
+        post('register', '/api/auth/register', {
+            'username': 'bench{n}', 'password': 'bench-pass', 'name': 'Bench', 'email': 'bench{n}@example.com'
+        }),
+        post('google_auth', '/api/auth/google', {'credential': google_token}),
+        get('verify_auth', '/api/auth/verify', auth=True),
+        get('get_current_user', '/api/auth/me', auth=True),
+        get('slow_requests', '/api/admin/slow-requests', auth=True),
+        post('ai_chat_endpoint', '/api/ai/chat', {'message': 'Where will waste peak?'}),
+        get('ai_prediction_summary', f'/api/ai/summary/{festival}'),
+    ]
+
+
+def unbenchmarked(app, samples):
+    """Endpoints registered on the app with neither a sample nor a skip reason."""
+    covered = {s.endpoint for s in samples} | set(SKIPPED)
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered)
+
+
+def fill(body, n):
+    """Substitute the request number into string values of a sample body."""
+    if body is None:
+        return None
+    return json.loads(json.dumps(body).replace('{n}', str(n)))
+
+
+def summarize(latencies, elapsed):
+    """Latency percentiles (ms) and throughput for one endpoint."""
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'requests': len(ms),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'rps': round(len(ms) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+# ---------------------------------------------------------------- in-process
+
+def _inprocess_call(client, sample, headers, n):
+    if sample.stream:
+        # Time to the first event; the stream itself never ends
+        response = client.get(sample.path, headers=headers, buffered=False)
+        for chunk in response.response:
+            if b'event:' in chunk:
+                break
+        response.close()
+        return response.status_code
+    if sample.method == 'POST':
+        return client.post(sample.path, json=fill(sample.body, n), headers=headers).status_code
+    return client.get(sample.path, headers=headers).status_code
+
+
+def run_inprocess(samples, n_requests, warmup):
+    """Drive each sample through the Flask test client, one request at a time."""
+    from app import app
+
+    client = app.test_client()
+    token = client.post('/api/auth/login', json=LOGIN).get_json()['token']
+    auth = {'Authorization': f'Bearer {token}'}
+
+    results = {}
+    for sample in samples:
+        headers = auth if sample.auth else {}
+        for i in range(warmup):
+            _inprocess_call(client, sample, headers, -i - 1)
+
+        # Peak Python allocation of one warm request
+        tracemalloc.start()
+        _inprocess_call(client, sample, headers, 0)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        latencies, statuses = [], set()
+        start = time.perf_counter()
+        for i in range(n_requests):
+            t = time.perf_counter()
+            statuses.add(_inprocess_call(client, sample, headers, i + 1))
+            latencies.append(time.perf_counter() - t)
+        result = summarize(latencies, time.perf_counter() - start)
+        result['status'] = sorted(statuses)
+        result['memory_mb'] = round(peak / 2 ** 20, 2)
+        results[sample.endpoint] = result
+        print_row(sample.endpoint, result)
+    return results
+
+
+# ---------------------------------------------------------------- over HTTP
+
+def server_command(server, port, workers):
+    """Command line serving benchmarks/wsgi.py (asgi_app.py for uvicorn) on ``port``."""
+    if server in ('gunicorn', 'gevent'):
+        return [sys.executable, '-m', 'gunicorn', '--chdir', BENCH_DIR, '--bind', f'127.0.0.1:{port}',
+                '--workers', str(workers), '--worker-class', 'sync' if server == 'gunicorn' else 'gevent',
+                '--worker-connections', '1000', '--log-level', 'warning', 'wsgi:app']
+    if server == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', '--app-dir', BENCH_DIR, '--port', str(port),
+                '--workers', str(workers), '--log-level', 'warning', 'asgi_app:app']
+    return [sys.executable, '-c', (
+        'import logging, wsgi; from werkzeug.serving import run_simple; '
+        "logging.getLogger('werkzeug').setLevel(logging.WARNING); "
+        f"run_simple('127.0.0.1', {port}, wsgi.app, threaded=True)"
+    )]
+
+
+def start_server(args):
+    env = dict(os.environ, BENCH_SCALE=str(args.scale), BENCH_SEED=str(args.seed),
+               BENCH_LLM_LATENCY=str(args.llm_latency))
+    process = subprocess.Popen(server_command(args.server, args.port, args.workers), cwd=BENCH_DIR, env=env)
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{args.server} exited with code {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', args.port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{args.server} did not start within {args.startup_timeout}s')
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and its children, from /proc (Linux only)."""
+    total_kb, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, StopIteration):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+class HTTPClient:
+    """Per-thread keep-alive connections to the benchmark server."""
+
+    def __init__(self, port, token):
+        self.port = port
+        self.token = token
+        self.local = threading.local()
+
+    def connection(self):
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        return self.local.connection
+
+    def call(self, sample, n):
+        headers = {'Content-Type': 'application/json'}
+        if sample.auth:
+            headers['Authorization'] = f'Bearer {self.token}'
+        body = json.dumps(fill(sample.body, n)) if sample.body is not None else None
+
+        start = time.perf_counter()
+        connection = self.connection()
+        try:
+            connection.request(sample.method, sample.path, body=body, headers=headers)
+            response = connection.getresponse()
+            if sample.stream:
+                for line in iter(response.readline, b''):
+                    if line.startswith(b'event:'):
+                        break
+                connection.close()
+                self.local.connection = None
+            else:
+                response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            raise
+        return response.status, time.perf_counter() - start
+
+
+def run_http(samples, n_requests, warmup, args):
+    """Drive each sample against a real server with ``args.concurrency`` client threads."""
+    process = start_server(args)
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', args.port, timeout=60)
+        connection.request('POST', '/api/auth/login', body=json.dumps(LOGIN),
+                           headers={'Content-Type': 'application/json'})
+        client = HTTPClient(args.port, json.loads(connection.getresponse().read())['token'])
+
+        results = {}
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            for sample in samples:
+                list(pool.map(lambda i: client.call(sample, -i - 1), range(warmup)))
+                start = time.perf_counter()
+                calls = list(pool.map(lambda i: client.call(sample, i + 1), range(n_requests)))
+                result = summarize([latency for _, latency in calls], time.perf_counter() - start)
+                result['status'] = sorted({status for status, _ in calls})
+                result['memory_mb'] = process_tree_rss_mb(process.pid)
+                results[sample.endpoint] = result
+                print_row(sample.endpoint, result)
+        return results
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+# ---------------------------------------------------------------- baselines
+
+def baseline_path(args):
+    return args.baseline or os.path.join(BASELINE_DIR, f'{args.mode}-x{args.scale}.json')
+
+
+def save_baseline(path, args, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'mode': args.mode, 'scale': args.scale, 'requests': args.requests,
+            'concurrency': args.concurrency if args.mode == 'http' else 1,
+            'endpoints': results,
+        }, f, indent=2, sort_keys=True)
+    print(f'baseline saved to {path}')
+
+
+def find_regressions(baseline, results, tolerance):
+    """
+    Compare results with a baseline.
+
+    Returns:
+        list: (endpoint, metric, baseline value, current value) for each regression
+    """
+    regressions = []
+    for endpoint, current in results.items():
+        previous = baseline['endpoints'].get(endpoint)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if (current[metric] > previous[metric] * (1 + tolerance)
+                    and current[metric] - previous[metric] > MIN_REGRESSION_MS):
+                regressions.append((endpoint, metric, previous[metric], current[metric]))
+        if previous.get('rps') and current.get('rps') and current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append((endpoint, 'rps', previous['rps'], current['rps']))
+        if (current['memory_mb'] > previous['memory_mb'] * (1 + tolerance)
+                and current['memory_mb'] - previous['memory_mb'] > MIN_REGRESSION_MB):
+            regressions.append((endpoint, 'memory_mb', previous['memory_mb'], current['memory_mb']))
+        if current['status'] != previous['status']:
+            regressions.append((endpoint, 'status', previous['status'], current['status']))
+    return regressions
+
+
+# ---------------------------------------------------------------- report
+
+def print_header(memory_label):
+    print(f"{'endpoint':<28}{'status':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'req/s':>10}{memory_label:>12}")
+
+
+def print_row(endpoint, result):
+    status = ','.join(str(s) for s in result['status'])
+    rps = f"{result['rps']:.1f}" if result['rps'] is not None else '-'
+    print(f"{endpoint:<28}{status:>10}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+          f"{result['p99_ms']:>10.2f}{rps:>10}{result['memory_mb']:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['inprocess', 'http'], default='inprocess')
+    parser.add_argument('--scale', type=int, default=1, help='dataset size as a multiple of mega_*.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', help='comma-separated endpoint names')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='seconds the fake Gemini model sleeps')
+    parser.add_argument('--server', choices=['gunicorn', 'gevent', 'uvicorn', 'werkzeug'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--baseline', help='baseline file (default: benchmarks/baselines/<mode>-x<scale>.json)')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    args = parser.parse_args()
+
+    import standins
+    start = time.perf_counter()
+    datasets = standins.synthetic_datasets(args.scale, args.seed)
+    all_samples = sample_requests(datasets)
+    samples = all_samples
+    if args.only:
+        names = set(args.only.split(','))
+        samples = [s for s in samples if s.endpoint in names]
+
+    print(f"mode: {args.mode}  scale: x{args.scale}  sales rows: {len(datasets['sales'])}  "
+          f"areas: {len(datasets['areas'])}  requests/endpoint: {args.requests}")
+    if args.mode == 'inprocess':
+        standins.install(args.scale, args.seed, args.llm_latency, datasets)
+        from app import app
+        print(f'datasets ready in {time.perf_counter() - start:.1f}s')
+        for endpoint in unbenchmarked(app, all_samples):
+            print(f'warning: no benchmark sample for endpoint {endpoint}')
+        print_header('peak MB')
+        results = run_inprocess(samples, args.requests, args.warmup)
+    else:
+        del datasets
+        print_header('RSS MB')
+        results = run_http(samples, args.requests, args.warmup, args)
+
+    for endpoint, reason in SKIPPED.items():
+        print(f'skipped {endpoint}: {reason}')
+
+    path = baseline_path(args)
+    exit_code = 0
+    if args.compare:
+        with open(path) as f:
+            regressions = find_regressions(json.load(f), results, args.tolerance)
+        for endpoint, metric, before, after in regressions:
+            print(f'REGRESSION {endpoint} {metric}: {before} -> {after}')
+        print(f'{len(regressions)} regression(s) against {path}')
+        exit_code = 1 if regressions else 0
+    if args.save_baseline:
+        save_baseline(path, args, results)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
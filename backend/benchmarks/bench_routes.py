@@ -0,0 +1,38 @@
+"""
+Benchmark collection route planning against city size.
+
+Usage:
+    python benchmarks/bench_routes.py [--max-areas 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_serialization import synthetic_areas
+from route_planner import plan_festival_routes, TRUCK_CAPACITY_KG
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-areas', type=int, default=5000)
+    parser.add_argument('--capacity', type=int, default=TRUCK_CAPACITY_KG)
+    args = parser.parse_args()
+
+    print(f"{'areas':>8}{'stops':>8}{'routes':>8}{'trips':>8}{'km':>12}{'plan ms':>10}")
+    for n_areas in (50, 200, 1000, 5000, 20000):
+        if n_areas > args.max_areas:
+            break
+        area_df = synthetic_areas(n_areas)
+        start = time.perf_counter()
+        plan = plan_festival_routes('Diwali', capacity=args.capacity, area_df=area_df)
+        elapsed = (time.perf_counter() - start) * 1000
+        totals = plan['totals']
+        print(f"{n_areas:>8}{totals['stops']:>8}{totals['routes']:>8}{totals['truck_trips']:>8}"
+              f"{totals['distance_km']:>12,.0f}{elapsed:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark JSON serialization of the largest API responses.
+
+Compares the old path (iterrows/to_dict records full of numpy scalars,
+encoded by the stdlib with a per-value default() hook) against the current
+path (column-wise native records encoded by serialization.dumps_bytes).
+
+Usage:
+    python benchmarks/bench_serialization.py [--areas 5000] [--rows 200000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from generate_datasets import build_area_festivals, build_areas, festival_table
+from hotspot_analyzer import identify_hotspots, get_priority_level, calculate_resources
+from serialization import dumps_bytes, records, USE_ORJSON
+
+
+def numpy_default(obj):
+    """The per-value hook the old NumpyJSONProvider used."""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(type(obj).__name__)
+
+
+def legacy_hotspots(festival, area_df):
+    """Row-by-row hotspot construction as it was before vectorization."""
+    festival_data = area_df[area_df['Festival'] == festival].copy()
+    festival_data = festival_data.sort_values('Predicted_Festival_Extra_Waste_kg', ascending=False)
+    hotspots = []
+    for _, row in festival_data.iterrows():
+        extra_waste = row['Predicted_Festival_Extra_Waste_kg']
+        hotspots.append({
+            'area': row['Area'],
+            'pincode': int(row['Pincode']),
+            'population': int(row['Population']),
+            'baseline_waste_kg': round(row['Baseline_Daily_Waste_kg'], 2),
+            'extra_waste_kg': round(extra_waste, 2),
+            'total_waste_kg': round(row['Predicted_Total_Daily_Waste_kg'], 2),
+            'waste_increase_percent': round((extra_waste / row['Baseline_Daily_Waste_kg']) * 100, 1),
+            'priority': get_priority_level(extra_waste),
+            'recommended_resources': calculate_resources(extra_waste),
+            'forecast_confidence': row.get('Forecast_Confidence')
+        })
+    return hotspots
+
+
+def synthetic_areas(n_areas, seed=0):
+    """Area-festival rows for n_areas wards from generate_datasets' builders, all for Diwali."""
+    rng = np.random.default_rng(seed)
+    return build_area_festivals(build_areas(n_areas, rng), festival_table(1), rng)
+
+
+def synthetic_breakdown(n_rows, seed=0):
+    """A product breakdown frame shaped like calculate_shop_waste's."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Item_Name': [f'Item {i}' for i in range(n_rows)],
+        'Category': rng.choice(['Decoration', 'Lighting', 'Gifts', 'Puja'], n_rows),
+        'Quantity_Sold': rng.integers(1, 500, n_rows),
+        'Item_Waste_Score': rng.uniform(0, 1, n_rows).round(2),
+        'Estimated_Waste_kg': rng.uniform(0, 300, n_rows).round(2),
+    })
+
+
+def best_of(fn, repeat):
+    """Return the best wall time of fn() in milliseconds, and its last result."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--areas', type=int, default=5000)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    area_df = synthetic_areas(args.areas)
+    breakdown = synthetic_breakdown(args.rows)
+
+    cases = {
+        f'hotspots ({args.areas} areas)': (
+            lambda: json.dumps(legacy_hotspots('Diwali', area_df), default=numpy_default).encode(),
+            lambda: dumps_bytes(identify_hotspots('Diwali', area_df)),
+        ),
+        f'product_breakdown ({args.rows} rows)': (
+            lambda: json.dumps(breakdown.to_dict('records'), default=numpy_default).encode(),
+            lambda: dumps_bytes(records(breakdown)),
+        ),
+    }
+
+    print(f"encoder: {'orjson' if USE_ORJSON else 'stdlib json'}")
+    print(f"{'response':<36}{'legacy ms':>12}{'fast ms':>12}{'speedup':>10}{'bytes':>12}")
+    for name, (legacy, fast) in cases.items():
+        legacy_ms, legacy_body = best_of(legacy, args.repeat)
+        fast_ms, fast_body = best_of(fast, args.repeat)
+        assert json.loads(legacy_body) == json.loads(fast_body), f'{name}: payload mismatch'
+        print(f"{name:<36}{legacy_ms:>12.1f}{fast_ms:>12.1f}{legacy_ms / fast_ms:>9.1f}x{len(fast_body):>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark Monte Carlo resource simulation against sample count.
+
+Reports wall time and peak traced memory with every cell in one block and
+with the default block bound, so the linear scaling and the memory bound are
+visible.
+
+Usage:
+    python benchmarks/bench_simulation.py [--areas 200] [--max-samples 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_serialization import synthetic_areas
+from resource_simulator import simulate_resources, DEFAULT_MAX_CELLS
+
+
+def measure(area_df, n_samples, max_cells):
+    """Return (seconds, peak MiB) for one simulation run."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    simulate_resources('Diwali', area_df, n_samples=n_samples, seed=0, max_cells=max_cells)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--areas', type=int, default=200)
+    parser.add_argument('--max-samples', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    area_df = synthetic_areas(args.areas)
+
+    print(f"{args.areas} areas, blocks hold at most {DEFAULT_MAX_CELLS:,} cells by default")
+    print(f"{'samples':>10}{'1 block s':>10}{'peak MiB':>11}{'bounded s':>12}{'peak MiB':>11}")
+    n_samples = 1000
+    while n_samples <= args.max_samples:
+        # Skip single-block runs that would need more than ~4 GiB of float64 cells
+        if args.areas * n_samples * 8 * 4 < 4 * 2 ** 30:
+            full_s, full_mib = measure(area_df, n_samples, args.areas * n_samples)
+            full = f"{full_s:>10.3f}{full_mib:>11.1f}"
+        else:
+            full = f"{'-':>10}{'-':>11}"
+        chunk_s, chunk_mib = measure(area_df, n_samples, DEFAULT_MAX_CELLS)
+        print(f"{n_samples:>10}{full}{chunk_s:>12.3f}{chunk_mib:>11.1f}")
+        n_samples *= 10
+
+
+if __name__ == '__main__':
+    main()
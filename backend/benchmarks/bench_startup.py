@@ -0,0 +1,145 @@
+"""
+Benchmark gunicorn startup with and without a preloaded, copy-on-write app.
+
+Serves app.py through gunicorn.conf.py on generated datasets (see
+generate_datasets.py) and reports, per mode, the time until the first
+request succeeds and until every worker has answered, and the total RSS and
+PSS of the master and workers after a burst of requests. RSS counts shared
+pages once per process; PSS splits them between the processes sharing them,
+so it shows what copy-on-write saves.
+
+Usage:
+    python benchmarks/bench_startup.py [--workers 4] [--sales-rows 1000000] [--modes preload,no-preload]
+    python benchmarks/bench_startup.py --dataset-path OUT_DIR
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, BENCH_DIR)
+
+from bench_endpoints import process_tree_rss_mb
+from generate_datasets import generate
+
+MODES = {'preload': '1', 'no-preload': '0'}
+
+# Requests sent to every worker after startup, so memory reflects serving
+BURST_PATHS = ('/api/dashboard/stats?festival=Diwali', '/api/hotspots/Holi', '/api/shops?page_size=50')
+
+
+def process_tree_pss_mb(pid):
+    """Proportional set size of a process and its children, from /proc (Linux only)."""
+    total_kb, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/smaps_rollup') as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, StopIteration):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+def get(port, path):
+    """GET over a fresh connection, so the kernel may hand it to any worker. Returns (status, body)."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def measure(mode, args, dataset_path):
+    """Start gunicorn in one mode and return its startup times and memory."""
+    env = dict(os.environ, PRELOAD_APP=MODES[mode], DATASET_PATH=dataset_path,
+               WORKER_CLASS=args.worker_class)
+    command = [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{args.port}',
+               '--workers', str(args.workers), '--log-level', 'warning']
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first_request = all_workers = None
+    workers = set()
+    try:
+        deadline = time.monotonic() + args.startup_timeout
+        while len(workers) < args.workers and time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with code {process.returncode}')
+            try:
+                status, body = get(args.port, '/api/health')
+            except OSError:
+                time.sleep(0.05)
+                continue
+            if status == 200:
+                first_request = first_request or time.perf_counter() - start
+                workers.add(json.loads(body)['worker'])
+        if len(workers) < args.workers:
+            raise RuntimeError(f'only {len(workers)} of {args.workers} workers answered '
+                               f'within {args.startup_timeout}s')
+        all_workers = time.perf_counter() - start
+
+        for _ in range(args.burst * args.workers):
+            for path in BURST_PATHS:
+                get(args.port, path)
+        return {
+            'mode': mode,
+            'first_request_s': round(first_request, 2),
+            'all_workers_s': round(all_workers, 2),
+            'rss_mb': process_tree_rss_mb(process.pid),
+            'pss_mb': process_tree_pss_mb(process.pid),
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modes', default='preload,no-preload', help='comma-separated: preload, no-preload')
+    parser.add_argument('--worker-class', default='gevent', choices=['gevent', 'sync', 'gthread'])
+    parser.add_argument('--dataset-path', help='existing generated datasets (default: generate into a temp dir)')
+    parser.add_argument('--sales-rows', type=int, default=1_000_000)
+    parser.add_argument('--shops', type=int, default=5_000)
+    parser.add_argument('--areas', type=int, default=200)
+    parser.add_argument('--burst', type=int, default=5, help='requests per burst path per worker')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    modes = args.modes.split(',')
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f'unknown mode {mode}')
+
+    with tempfile.TemporaryDirectory() as scratch:
+        dataset_path = args.dataset_path
+        if dataset_path is None:
+            dataset_path = scratch
+            start = time.perf_counter()
+            generate(dataset_path, sales_rows=args.sales_rows, shops=args.shops, areas=args.areas, years=1)
+            print(f'generated {args.sales_rows:,} sales rows in {time.perf_counter() - start:.1f}s')
+
+        print(f'workers: {args.workers}  worker class: {args.worker_class}')
+        print(f"{'mode':<12} {'first request s':>16} {'all workers s':>14} {'RSS MB':>10} {'PSS MB':>10}")
+        for mode in modes:
+            result = measure(mode, args, dataset_path)
+            print(f"{result['mode']:<12} {result['first_request_s']:>16.2f} {result['all_workers_s']:>14.2f} "
+                  f"{result['rss_mb']:>10.1f} {result['pss_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
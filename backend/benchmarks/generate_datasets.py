@@ -0,0 +1,430 @@
+"""
+Generate seeded synthetic datasets at scale, in the mega_*.csv schemas.
+
+Writes sales, area-festival, product and daily timeseries files that
+data_loader reads unchanged, with configurable shop, area, festival and
+year counts. Shop sizes are heavy-tailed, so a few shops dominate sales;
+festivals differ in uplift and in the product categories they sell; and the
+timeseries spikes around each festival day. Sales and timeseries rows are
+generated and written in chunks, so 10M+ rows never sit in memory at once.
+The same seed and options always produce the same files. build_datasets
+gives the same rows in memory, for standins.py and the in-process benchmarks.
+
+Usage:
+    python benchmarks/generate_datasets.py OUT_DIR [--sales-rows 10000000] [--shops 20000]
+        [--areas 400] [--festivals 5] [--years 2] [--seed 0]
+    DATASET_PATH=OUT_DIR gunicorn app:app
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from data_loader import load_area_festivals, load_products
+from forecaster import FESTIVAL_DATES
+from geo_index import area_coordinates
+from waste_calculator import get_eco_alternatives
+
+FILES = {
+    'sales': 'mega_sales_100k.csv',
+    'areas': 'mega_area_festivals.csv',
+    'products': 'mega_products.csv',
+    'timeseries': 'mega_daily_waste_timeseries.csv',
+}
+
+# Year of the area-festival predictions; the timeseries covers the years up to it
+PREDICTION_YEAR = 2025
+
+# Mean festival-day extra waste as a share of baseline (as in mega_area_festivals.csv)
+# and the categories each festival sells more of
+FESTIVALS = {
+    'Diwali': (0.66, ('Firecracker', 'Lighting', 'Decoration')),
+    'Holi': (0.50, ('Color', 'Toy')),
+    'Ganesh Chaturthi': (0.44, ('Idol', 'Decoration')),
+    'Christmas': (0.26, ('Decoration', 'Lighting', 'Packaging', 'Toy')),
+    'Sankranti': (0.26, ('Kite',)),
+}
+
+# Sales weight of a festival's own categories relative to other products
+CATEGORY_BOOST = 8.0
+
+# Pareto shape of shop sizes; lower is more skewed
+SHOP_SIZE_SHAPE = 1.6
+
+# Waste per unit sold per point of waste score, as in the sales data
+KG_PER_SCORE_UNIT = 0.5
+
+# Share of the festival-day extra waste on the days either side of it
+SHOULDER_SHARE = 0.4
+
+CHUNK_ROWS = 1_000_000
+
+SHOP_PREFIXES = ['Sri', 'New', 'Royal', 'Lakshmi', 'Ganesh', 'City', 'Star', 'Krishna', 'Balaji', 'Om']
+SHOP_KINDS = ['Stores', 'Traders', 'Emporium', 'Mart', 'Gift House', 'Fancy Stores', 'Bazaar', 'Enterprises']
+
+
+def festival_table(n_festivals):
+    """
+    Festival names, uplifts and boosted categories.
+
+    The five known festivals come first; further ones are named "Festival N"
+    with uplifts spread between the known ones and no category preference.
+
+    Returns:
+        list: (name, uplift, categories) tuples
+    """
+    table = [(name, uplift, categories) for name, (uplift, categories) in FESTIVALS.items()]
+    extra = max(n_festivals - len(table), 0)
+    for i, uplift in enumerate(np.linspace(0.25, 0.5, extra).tolist()):
+        table.append((f'Festival {len(FESTIVALS) + i + 1}', round(uplift, 2), ()))
+    return table[:n_festivals]
+
+
+def festival_calendar(festivals, years):
+    """
+    Festival day per year, {year: {festival: 'YYYY-MM-DD'}}.
+
+    Known dates come from forecaster.FESTIVAL_DATES; other years reuse the
+    prediction year's month and day, and extra festivals are spread evenly over
+    the year.
+    """
+    reference = FESTIVAL_DATES.get(PREDICTION_YEAR, {})
+    calendar = {}
+    for year in years:
+        known = FESTIVAL_DATES.get(year, {})
+        days = {}
+        for i, name in enumerate(festivals):
+            if name in known:
+                days[name] = known[name]
+            elif name in reference:
+                days[name] = reference[name].replace(str(PREDICTION_YEAR), str(year), 1)
+            else:
+                day_of_year = int(365 * (i + 0.5) / len(festivals))
+                days[name] = (date(year, 1, 1) + pd.Timedelta(days=day_of_year)).isoformat()
+        calendar[year] = days
+    return calendar
+
+
+def build_areas(n_areas, rng):
+    """
+    Areas with coordinates, population and baseline waste.
+
+    The shipped areas come first; beyond them each area is split into wards
+    named "<Area> Ward k", with jittered coordinates and population.
+
+    Returns:
+        DataFrame: Area, Pincode, Latitude, Longitude, Population, Baseline_Daily_Waste_kg, Code
+    """
+    shipped = load_area_festivals()
+    base = shipped.groupby(['Area', 'Pincode'], sort=False).agg(
+        Population=('Population', 'first'), Baseline=('Baseline_Daily_Waste_kg', 'first')
+    ).reset_index()
+    lat, lon = area_coordinates(base)
+
+    pair = np.arange(n_areas) % len(base)
+    ward = np.arange(n_areas) // len(base)
+    names = base['Area'].to_numpy(dtype=object)[pair]
+    jitter = np.where(ward == 0, 0.0, 1.0)
+    population = base['Population'].to_numpy(dtype=float)[pair] * np.where(
+        ward == 0, 1.0, rng.lognormal(0, 0.25, n_areas))
+    per_capita = base['Baseline'].to_numpy(dtype=float)[pair] / base['Population'].to_numpy(dtype=float)[pair]
+
+    return pd.DataFrame({
+        'Area': np.where(ward == 0, names, names + ' Ward ' + ward.astype(str)),
+        'Pincode': base['Pincode'].to_numpy()[pair],
+        'Latitude': (lat[pair] + jitter * rng.normal(0, 0.01, n_areas)).round(5),
+        'Longitude': (lon[pair] + jitter * rng.normal(0, 0.01, n_areas)).round(5),
+        'Population': population.round().astype(np.int64),
+        'Baseline_Daily_Waste_kg': (population * per_capita * rng.lognormal(0, 0.05, n_areas)).round().astype(np.int64),
+        'Code': np.where(ward == 0, '', np.char.add('W', ward.astype(str))),
+    })
+
+
+def build_area_festivals(areas, festivals, rng):
+    """Area-festival predictions for PREDICTION_YEAR, one row per area and festival."""
+    n_areas, n_festivals = len(areas), len(festivals)
+    area = np.repeat(np.arange(n_areas), n_festivals)
+    festival = np.tile(np.arange(n_festivals), n_areas)
+    uplift = np.array([uplift for _, uplift, _ in festivals])[festival]
+    baseline = areas['Baseline_Daily_Waste_kg'].to_numpy()[area]
+    extra = (baseline * uplift * rng.lognormal(0, 0.2, len(area))).round().astype(np.int64)
+    names = np.array([name for name, _, _ in festivals], dtype=object)
+    initials = np.array([name[0] if name in FESTIVALS else 'F' + name.split()[-1]
+                         for name, _, _ in festivals], dtype=object)
+
+    return pd.DataFrame({
+        'Area_ID': 'A' + areas['Pincode'].astype(str).to_numpy(dtype=object)[area]
+                   + areas['Code'].to_numpy(dtype=object)[area] + initials[festival],
+        'Area': areas['Area'].to_numpy()[area],
+        'Pincode': areas['Pincode'].to_numpy()[area],
+        'Festival': names[festival],
+        'Festival_Year': PREDICTION_YEAR,
+        'Population': areas['Population'].to_numpy()[area],
+        'Baseline_Daily_Waste_kg': baseline,
+        'Predicted_Festival_Extra_Waste_kg': extra,
+        'Predicted_Total_Daily_Waste_kg': baseline + extra,
+        'Latitude': areas['Latitude'].to_numpy()[area],
+        'Longitude': areas['Longitude'].to_numpy()[area],
+    })
+
+
+def build_shops(n_shops, areas, rng):
+    """
+    Shops with a heavy-tailed sales weight and an eco-product propensity.
+
+    Shops are placed in areas in proportion to population; bigger shops also
+    sell more units per sale.
+    """
+    width = max(4, len(str(n_shops - 1)))
+    size = rng.pareto(SHOP_SIZE_SHAPE, n_shops) + 1
+    population = areas['Population'].to_numpy(dtype=float)
+    prefix = rng.integers(0, len(SHOP_PREFIXES), n_shops)
+    kind = rng.integers(0, len(SHOP_KINDS), n_shops)
+    return pd.DataFrame({
+        'Shop_ID': [f'S{i:0{width}d}' for i in range(n_shops)],
+        'Shop_Name': [f'{SHOP_PREFIXES[p]} {SHOP_KINDS[k]}' for p, k in zip(prefix.tolist(), kind.tolist())],
+        'area': rng.choice(len(areas), n_shops, p=population / population.sum()),
+        'weight': size / size.sum(),
+        'mean_quantity': np.minimum(3 * size ** 0.5, 60),
+        'eco_share': rng.beta(1.5, 5, n_shops),
+    })
+
+
+def product_weights(products, festivals):
+    """
+    Product sampling weights per festival, split into regular and eco products.
+
+    Returns:
+        ndarray: Shape (festivals, 2, products); [:, 1] covers eco alternatives
+    """
+    eco = products['Item_Name'].isin(set(get_eco_alternatives(products).values())).to_numpy()
+    category = products['Category'].to_numpy()
+    weights = np.zeros((len(festivals), 2, len(products)))
+    for i, (_, _, categories) in enumerate(festivals):
+        boost = np.where(np.isin(category, categories), CATEGORY_BOOST, 1.0)
+        for is_eco in (0, 1):
+            w = boost * (eco == bool(is_eco))
+            weights[i, is_eco] = w / w.sum()
+    return weights
+
+
+def iter_sales(n_rows, shops, areas, products, festivals, seed, chunk_rows=CHUNK_ROWS):
+    """
+    Yield sales rows as DataFrames of at most ``chunk_rows``.
+
+    Each row picks a festival in proportion to its uplift, a shop by its size
+    weight, and a product from the festival's regular or eco mix depending on
+    the shop's eco propensity.
+    """
+    uplift = np.array([uplift for _, uplift, _ in festivals])
+    festival_p = uplift / uplift.sum()
+    names = np.array([name for name, _, _ in festivals], dtype=object)
+    weights = product_weights(products, festivals)
+
+    shop_ids = shops['Shop_ID'].to_numpy(dtype=object)
+    shop_names = shops['Shop_Name'].to_numpy(dtype=object)
+    shop_area = shops['area'].to_numpy()
+    shop_p = shops['weight'].to_numpy()
+    mean_quantity = shops['mean_quantity'].to_numpy()
+    eco_share = shops['eco_share'].to_numpy()
+    area_names = areas['Area'].to_numpy(dtype=object)
+    pincodes = areas['Pincode'].to_numpy()
+    items = products['Item_Name'].to_numpy(dtype=object)
+    categories = products['Category'].to_numpy(dtype=object)
+    scores = products['Waste_Score'].to_numpy(dtype=float)
+
+    for chunk, start in enumerate(range(0, n_rows, chunk_rows)):
+        rng = np.random.default_rng([seed, chunk])
+        size = min(chunk_rows, n_rows - start)
+        festival = rng.choice(len(festivals), size, p=festival_p)
+        shop = rng.choice(len(shop_p), size, p=shop_p)
+        is_eco = (rng.random(size) < eco_share[shop]).astype(np.intp)
+
+        product = np.empty(size, dtype=np.intp)
+        for f in range(len(festivals)):
+            for e in (0, 1):
+                rows = np.nonzero((festival == f) & (is_eco == e))[0]
+                product[rows] = rng.choice(len(items), len(rows), p=weights[f, e])
+
+        quantity = 1 + rng.poisson(mean_quantity[shop])
+        score = scores[product]
+        area = shop_area[shop]
+        yield pd.DataFrame({
+            'Shop_ID': shop_ids[shop],
+            'Shop_Name': shop_names[shop],
+            'Area': area_names[area],
+            'Pincode': pincodes[area],
+            'Festival': names[festival],
+            'Item_Name': items[product],
+            'Category': categories[product],
+            'Quantity_Sold': quantity,
+            'Item_Waste_Score': score,
+            'Estimated_Waste_kg': (quantity * score * KG_PER_SCORE_UNIT).round(2),
+        })
+
+
+def iter_timeseries(areas, area_festivals, calendar, seed, chunk_rows=CHUNK_ROWS):
+    """
+    Yield daily waste per area over the calendar's years, a block of areas at a time.
+
+    Daily waste is the area baseline with slow growth, a weekend bump and
+    noise; each festival day adds the area's predicted extra waste (jittered),
+    and the days either side add SHOULDER_SHARE of it.
+    """
+    years = sorted(calendar)
+    days = pd.date_range(f'{years[0]}-01-01', f'{years[-1]}-12-31')
+    day_labels = days.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    growth = 1 + 0.03 * (days.year.to_numpy() - PREDICTION_YEAR)
+    weekly = np.where(days.dayofweek.to_numpy() >= 5, 1.06, 1.0)
+
+    # Festival spike shape per festival: (festival, day) weights
+    festival_names = list(next(iter(calendar.values())))
+    spikes = np.zeros((len(festival_names), len(days)))
+    for year in years:
+        for f, name in enumerate(festival_names):
+            centre = days.get_loc(pd.Timestamp(calendar[year][name]))
+            spikes[f, centre] += 1.0
+            for offset in (-1, 1):
+                if 0 <= centre + offset < len(days):
+                    spikes[f, centre + offset] += SHOULDER_SHARE
+
+    extra = area_festivals.pivot_table(
+        index=['Area', 'Pincode'], columns='Festival', values='Predicted_Festival_Extra_Waste_kg', sort=False
+    ).reindex(index=pd.MultiIndex.from_frame(areas[['Area', 'Pincode']]), columns=festival_names)
+    extra = extra.to_numpy(dtype=float)
+    baseline = areas['Baseline_Daily_Waste_kg'].to_numpy(dtype=float)
+    block = max(1, chunk_rows // len(days))
+
+    for chunk, start in enumerate(range(0, len(areas), block)):
+        rng = np.random.default_rng([seed, chunk])
+        stop = min(start + block, len(areas))
+        level = baseline[start:stop, None] * growth * weekly * rng.normal(1, 0.05, (stop - start, len(days)))
+        spike = (extra[start:stop] * rng.lognormal(0, 0.15, extra[start:stop].shape)) @ spikes
+        yield pd.DataFrame({
+            'Area': np.repeat(areas['Area'].to_numpy(dtype=object)[start:stop], len(days)),
+            'Pincode': np.repeat(areas['Pincode'].to_numpy()[start:stop], len(days)),
+            'Date': np.tile(day_labels, stop - start),
+            'Actual_Waste_kg': (level + spike).round().astype(np.int64).ravel(),
+        })
+
+
+def write_csv(path, frames):
+    """Append DataFrames to one CSV file, writing the header once. Returns the row count."""
+    rows = 0
+    with open(path, 'w', newline='') as f:
+        for frame in frames:
+            frame.to_csv(f, header=not rows, index=False)
+            rows += len(frame)
+    return rows
+
+
+def build_tables(shops=20_000, areas=400, festivals=5, years=2, seed=0):
+    """
+    The seeded festival, area and shop tables the datasets are generated from.
+
+    Returns:
+        dict: festivals, calendar, products, areas, area_festivals and shops
+    """
+    rng = np.random.default_rng(seed)
+    festival_rows = festival_table(festivals)
+    calendar = festival_calendar([name for name, _, _ in festival_rows],
+                                 range(PREDICTION_YEAR - years + 1, PREDICTION_YEAR + 1))
+    area_table = build_areas(areas, rng)
+    area_festivals = build_area_festivals(area_table, festival_rows, rng)
+    return {
+        'festivals': festival_rows,
+        'calendar': calendar,
+        'products': load_products(),
+        'areas': area_table,
+        'area_festivals': area_festivals,
+        'shops': build_shops(shops, area_table, rng),
+    }
+
+
+def build_datasets(sales_rows=100_000, shops=600, areas=40, festivals=5, years=1, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Build the four datasets in memory, as DATASETS holds them.
+
+    Takes the same options as ``generate`` and gives the same rows it writes.
+
+    Returns:
+        dict: DataFrames keyed by dataset name
+    """
+    tables = build_tables(shops, areas, festivals, years, seed)
+    area_table, area_festivals = tables['areas'], tables['area_festivals']
+    return {
+        'sales': pd.concat(iter_sales(sales_rows, tables['shops'], area_table, tables['products'],
+                                      tables['festivals'], seed, chunk_rows), ignore_index=True),
+        'areas': area_festivals,
+        'products': tables['products'],
+        'timeseries': pd.concat(iter_timeseries(area_table, area_festivals, tables['calendar'], seed, chunk_rows),
+                                ignore_index=True),
+    }
+
+
+def generate(out_dir, sales_rows=10_000_000, shops=20_000, areas=400, festivals=5, years=2, seed=0,
+             chunk_rows=CHUNK_ROWS):
+    """
+    Write the four datasets to ``out_dir``.
+
+    Args:
+        out_dir: Output folder, created if needed
+        sales_rows: Sales rows to write
+        shops: Number of shops
+        areas: Number of areas (the 40 shipped ones, then wards of them)
+        festivals: Number of festivals (the 5 known ones, then synthetic ones)
+        years: Years of daily timeseries, ending in PREDICTION_YEAR
+        seed: Random seed; with the other options it fully determines the output
+        chunk_rows: Rows generated and written per chunk
+
+    Returns:
+        dict: Rows written per dataset
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tables = build_tables(shops, areas, festivals, years, seed)
+    area_table, area_festivals = tables['areas'], tables['area_festivals']
+    path = {name: os.path.join(out_dir, filename) for name, filename in FILES.items()}
+
+    counts = {
+        'products': write_csv(path['products'], [tables['products']]),
+        'areas': write_csv(path['areas'], [area_festivals]),
+        'timeseries': write_csv(path['timeseries'], iter_timeseries(
+            area_table, area_festivals, tables['calendar'], seed, chunk_rows)),
+        'sales': write_csv(path['sales'], iter_sales(
+            sales_rows, tables['shops'], area_table, tables['products'], tables['festivals'], seed, chunk_rows)),
+    }
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--sales-rows', type=int, default=10_000_000)
+    parser.add_argument('--shops', type=int, default=20_000)
+    parser.add_argument('--areas', type=int, default=400)
+    parser.add_argument('--festivals', type=int, default=5)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate(args.out_dir, args.sales_rows, args.shops, args.areas, args.festivals,
+                      args.years, args.seed, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+
+    for name, rows in counts.items():
+        size = os.path.getsize(os.path.join(args.out_dir, FILES[name])) / 2 ** 20
+        print(f"{FILES[name]:<36} {rows:>12,} rows {size:>10.1f} MiB")
+    print(f"Generated in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Local stand-ins for benchmarking without network services or the sales CSV.
+
+``install()`` must run before ``app`` is imported: it registers a fake
+``google.generativeai`` and a fake ``supabase`` module, then fills the shared
+dataset registry with synthetic data scaled to a multiple of the mega_*.csv
+sizes.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from data_loader import DATASETS
+from generate_datasets import build_datasets
+
+# Sizes of the production datasets at scale 1
+SALES_ROWS = 100_000
+SHOPS = 600
+AREAS = 40
+
+# Canned model reply: valid JSON for every prompt the suggester sends
+FAKE_REPLY = {
+    'alternatives': [{'instead_of': 'Plastic Diya Pack', 'use': 'Clay Diya Pack',
+                      'reason': 'Biodegradable', 'waste_reduction': '80%'}],
+    'general_tips': ['Stock eco-friendly products early'],
+    'messages': ['Celebrate green this festival!'],
+    'key_insights': ['Waste peaks in dense commercial areas'],
+    'recommendations': ['Add evening pickups in critical areas'],
+    'summary': 'Synthetic summary for benchmarking.',
+    'response': 'Synthetic reply for benchmarking.',
+}
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel with a fixed reply and optional latency."""
+
+    latency = 0.0
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return types.SimpleNamespace(text=json.dumps(FAKE_REPLY), usage_metadata=None)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return types.SimpleNamespace(text=json.dumps(FAKE_REPLY), usage_metadata=None)
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Chainable query over one in-memory table, covering the calls the backend makes."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+        self.action = 'select'
+        self.payload = None
+        self.single_row = False
+
+    def select(self, columns='*'):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def insert(self, data):
+        self.action, self.payload = 'insert', data
+        return self
+
+    def update(self, data):
+        self.action, self.payload = 'update', data
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def _matches(self, row):
+        return all(row.get(column) == value for column, value in self.filters)
+
+    def execute(self):
+        if self.action == 'insert':
+            new = self.payload if isinstance(self.payload, list) else [self.payload]
+            new = [dict(row, id=row.get('id', len(self.rows) + i + 1)) for i, row in enumerate(new)]
+            self.rows.extend(new)
+            return FakeResult(new)
+
+        matched = [row for row in self.rows if self._matches(row)]
+        if self.action == 'update':
+            for row in matched:
+                row.update(self.payload)
+        elif self.action == 'delete':
+            self.rows[:] = [row for row in self.rows if not self._matches(row)]
+        return FakeResult(matched[0] if self.single_row and matched else matched)
+
+
+class FakeAsyncQuery(FakeQuery):
+    async def execute(self):
+        return FakeQuery.execute(self)
+
+
+class FakeSupabase:
+    """In-memory stand-in for a supabase Client."""
+
+    query_class = FakeQuery
+
+    def __init__(self, url=None, key=None):
+        self.tables = {}
+
+    def table(self, name):
+        return self.query_class(self.tables.setdefault(name, []))
+
+
+class FakeAsyncSupabase(FakeSupabase):
+    """In-memory stand-in for a supabase AsyncClient."""
+
+    query_class = FakeAsyncQuery
+
+
+async def fake_acreate_client(url, key):
+    return FakeAsyncSupabase(url, key)
+
+
+def install_fake_gemini(latency=0.0):
+    """Register a fake google.generativeai module and an API key so AI routes run."""
+    FakeGenerativeModel.latency = latency
+    genai = types.ModuleType('google.generativeai')
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = FakeGenerativeModel
+    google = sys.modules.get('google') or types.ModuleType('google')
+    google.generativeai = genai
+    sys.modules['google'] = google
+    sys.modules['google.generativeai'] = genai
+    os.environ.setdefault('GOOGLE_API_KEY', 'benchmark')
+
+
+def install_fake_supabase():
+    """Register a fake supabase module whose client keeps tables in memory."""
+    module = types.ModuleType('supabase')
+    module.Client = FakeSupabase
+    module.create_client = FakeSupabase
+    module.AsyncClient = FakeAsyncSupabase
+    module.acreate_client = fake_acreate_client
+    sys.modules['supabase'] = module
+    os.environ.setdefault('SUPABASE_URL', 'http://supabase.invalid')
+    os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+
+
+def synthetic_datasets(scale=1, seed=0):
+    """
+    Build sales, area, product and timeseries frames at ``scale`` times the production sizes.
+
+    The frames come from generate_datasets' seeded builders: areas are split
+    into wards so every dataset grows with the scale, and the product
+    catalogue is kept as is.
+
+    Returns:
+        dict: DataFrames keyed by dataset name
+    """
+    return build_datasets(sales_rows=SALES_ROWS * scale, shops=SHOPS * scale, areas=AREAS * scale, seed=seed)
+
+
+def install(scale=1, seed=0, llm_latency=0.0, datasets=None):
+    """Install fake Gemini and Supabase, then load synthetic datasets (or ``datasets``) into DATASETS."""
+    # Benchmark clients share one address and hammer the AI routes on purpose
+    os.environ.setdefault('AI_RATE_LIMITS', '0')
+    os.environ.setdefault('LLM_MAX_CONCURRENCY', '10000')
+    install_fake_gemini(llm_latency)
+    install_fake_supabase()
+    if datasets is None:
+        datasets = synthetic_datasets(scale, seed)
+    for name, frame in datasets.items():
+        DATASETS.set(name, frame)
+    return DATASETS
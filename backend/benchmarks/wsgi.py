@@ -0,0 +1,19 @@
+"""
+WSGI entry point serving the app on local stand-ins, for HTTP benchmarks.
+
+    BENCH_SCALE=10 gunicorn --chdir benchmarks wsgi:app
+
+Reads BENCH_SCALE, BENCH_SEED and BENCH_LLM_LATENCY (seconds) from the environment.
+"""
+
+import os
+
+import standins
+
+standins.install(
+    scale=int(os.getenv('BENCH_SCALE', '1')),
+    seed=int(os.getenv('BENCH_SEED', '0')),
+    llm_latency=float(os.getenv('BENCH_LLM_LATENCY', '0')),
+)
+
+from app import app
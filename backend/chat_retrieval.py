@@ -0,0 +1,313 @@
+"""
+Retrieval of dataset facts to ground the AI chat.
+
+Every dataset version is distilled once into short fact sentences: a summary
+and rankings per festival, one fact per hotspot, one per area across
+festivals, and one per shop. The facts go into a BM25 index whose postings
+hold precomputed per-document weights, so scoring a question is a few numpy
+additions per query term. The best matches are packed into the chat prompt
+up to TOP_K facts and a CONTEXT_TOKENS budget, so prompt size (and Gemini
+latency and cost) stays flat however large the city's data grows.
+"""
+
+import math
+import os
+import re
+from collections import Counter, namedtuple
+import numpy as np
+from data_loader import DATASETS
+from hotspot_analyzer import get_festival_hotspots, get_festival_summary
+from profiler import stage
+from waste_calculator import get_eco_alternatives, get_shop_comparison_frame
+
+# Facts added to a chat prompt, and the prompt tokens they may use between them
+TOP_K = int(os.getenv('CHAT_CONTEXT_FACTS', '8'))
+CONTEXT_TOKENS = int(os.getenv('CHAT_CONTEXT_TOKENS', '400'))
+
+# Areas or shops named in each ranking fact
+RANKING_SIZE = 5
+
+# BM25 term-frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+
+# Added to the BM25 score of matching facts of these kinds: most questions
+# ask about a festival as a whole, which summaries and rankings answer directly
+KIND_BOOST = {'summary': 1.0, 'ranking': 1.0}
+
+# Ranked facts considered when filling the token budget past a long one
+CANDIDATES = 4
+
+TOKEN = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from how i in is it me my of on or should the their them
+there these this to was we what when where which who will with would you your
+""".split())
+
+
+# One indexed sentence: its kind, the festival it is about (None for areas
+# and shops) and extra search terms not shown in the prompt
+Fact = namedtuple('Fact', 'kind festival text keywords')
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords, with plural endings stripped ('areas' -> 'area')."""
+    terms = []
+    for term in TOKEN.findall(text.lower()):
+        if term in STOPWORDS:
+            continue
+        if len(term) > 4 and term.endswith('ies'):
+            term = term[:-3] + 'y'
+        elif len(term) > 3 and term.endswith('s') and not term.endswith('ss'):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def _indexed_terms(fact):
+    # Measurements ("12 extra workers") would match any number in a question;
+    # only six-digit pincodes are kept, and names are indexed from keywords
+    terms = [term for term in tokenize(fact.text) if not term.isdigit() or len(term) == 6]
+    return terms + tokenize(fact.keywords)
+
+
+def estimate_tokens(text):
+    """Rough Gemini token count: about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def _ranking(items):
+    return ', '.join(items)
+
+
+def _count(n, noun):
+    return f"{n} {noun}" if n == 1 else f"{n} {noun}s"
+
+
+def festival_facts(festival):
+    """Summary, ranking and per-hotspot facts for one festival."""
+    summary = get_festival_summary(festival)
+    hotspots = get_festival_hotspots(festival)
+    if not summary or not hotspots:
+        return []
+
+    facts = [Fact('summary', festival, (
+        f"{festival} overview: {summary['total_areas']} areas monitored, "
+        f"{summary['total_extra_waste_kg']:,.0f} kg extra waste "
+        f"({summary['average_increase_percent']}% above baseline), "
+        f"{summary['critical_areas']} critical and {summary['high_priority_areas']} high priority areas; "
+        f"{summary['total_extra_trucks_needed']} extra trucks and "
+        f"{summary['total_extra_workers_needed']} extra workers needed in total."
+    ), '')]
+
+    # hotspots come sorted by extra waste, so the stable sorts below break ties by it
+    by_trucks = sorted(hotspots, key=lambda h: -h['recommended_resources']['extra_trucks'])[:RANKING_SIZE]
+    by_workers = sorted(hotspots, key=lambda h: -h['recommended_resources']['extra_workers'])[:RANKING_SIZE]
+    by_increase = sorted(hotspots, key=lambda h: -h['waste_increase_percent'])[:RANKING_SIZE]
+    critical = list(dict.fromkeys(h['area'] for h in hotspots if h['priority'] == 'CRITICAL'))
+
+    facts += [
+        Fact('ranking', festival, f"{festival}: areas needing the most extra trucks: " + _ranking(
+            f"{h['area']} ({_count(h['recommended_resources']['extra_trucks'], 'truck')})" for h in by_trucks
+        ) + '.', ''),
+        Fact('ranking', festival, f"{festival}: areas needing the most extra workers: " + _ranking(
+            f"{h['area']} ({_count(h['recommended_resources']['extra_workers'], 'worker')})" for h in by_workers
+        ) + '.', ''),
+        Fact('ranking', festival, f"{festival}: areas with the most extra waste (biggest hotspots): " + _ranking(
+            f"{h['area']} ({h['extra_waste_kg']:,.0f} kg)" for h in hotspots[:RANKING_SIZE]) + '.', ''),
+        Fact('ranking', festival, f"{festival}: areas with the highest percentage increase in waste: " + _ranking(
+            f"{h['area']} (+{h['waste_increase_percent']}%)" for h in by_increase) + '.', ''),
+        Fact('ranking', festival, (
+            f"{festival} critical priority areas ({len(critical)}): {_ranking(critical[:10])}"
+            + (' and others.' if len(critical) > 10 else '.')
+            if critical else f"{festival}: no areas at critical priority."
+        ), 'hotspot'),
+    ]
+
+    top_shops = get_shop_comparison_frame(festival=festival).head(RANKING_SIZE)
+    if not top_shops.empty:
+        facts.append(Fact('ranking', festival, f"{festival}: shops with the most estimated waste: " + _ranking(
+            f"{name} ({shop_id}, {area}) {kg:,.0f} kg"
+            for shop_id, name, area, kg in zip(top_shops['Shop_ID'], top_shops['Shop_Name'],
+                                               top_shops['Area'], top_shops['Estimated_Waste_kg'])
+        ) + '.', ''))
+
+    facts += [
+        Fact('hotspot', festival, (
+            f"{festival} in {h['area']} ({h['pincode']}): {h['extra_waste_kg']:,.0f} kg extra waste "
+            f"(+{h['waste_increase_percent']}%, {h['total_waste_kg']:,.0f} kg/day total), "
+            f"{h['priority']} priority; needs {_count(h['recommended_resources']['extra_trucks'], 'extra truck')} and "
+            f"{_count(h['recommended_resources']['extra_workers'], 'extra worker')} for "
+            f"{h['recommended_resources']['days_needed']} days."
+        ), '')
+        for h in hotspots
+    ]
+    return facts
+
+
+def area_facts(hotspots_by_festival):
+    """
+    One fact per area across festivals, as get_area_details reports it.
+
+    Built from the festivals' hotspots rather than get_area_details, which
+    scans the area table once per area.
+    """
+    areas = {}
+    for festival, hotspots in hotspots_by_festival.items():
+        for h in hotspots:
+            areas.setdefault((h['area'], h['pincode']), (h, []))[1].append((festival, h))
+
+    facts = []
+    for (area, pincode), (first, festivals) in areas.items():
+        festivals.sort(key=lambda item: -item[1]['extra_waste_kg'])
+        facts.append(Fact('area', None, (
+            f"{area} ({pincode}), population {first['population']:,}: baseline "
+            f"{first['baseline_waste_kg']:,.0f} kg/day; festival extra waste: " + _ranking(
+                f"{festival} {h['extra_waste_kg']:,.0f} kg ({h['priority']})" for festival, h in festivals) + '.'
+        ), ''))
+    return facts
+
+
+def shop_facts(sales_df):
+    """One fact per shop: its waste totals and the product it should swap first."""
+    shops = get_shop_comparison_frame(sales_df=sales_df)
+    if shops.empty:
+        return []
+
+    # Each shop's product with the most estimated waste
+    products = sales_df.groupby(['Shop_ID', 'Item_Name'], sort=False)['Estimated_Waste_kg'].sum().reset_index()
+    top = products.loc[products.groupby('Shop_ID', sort=False)['Estimated_Waste_kg'].idxmax()]
+    top_items = dict(zip(top['Shop_ID'], zip(top['Item_Name'], top['Estimated_Waste_kg'])))
+    alternatives = get_eco_alternatives()
+
+    facts = []
+    for shop_id, name, area, kg, score, units, level in zip(
+            shops['Shop_ID'], shops['Shop_Name'], shops['Area'], shops['Estimated_Waste_kg'],
+            shops['Item_Waste_Score'], shops['Quantity_Sold'], shops['waste_level']):
+        item, item_kg = top_items[shop_id]
+        swap = f"; eco swap: {alternatives[item]}" if item in alternatives else ''
+        facts.append(Fact('shop', None, (
+            f"{name} (shop {shop_id}) in {area}: {kg:,.0f} kg estimated waste from {units:,} items sold, "
+            f"average waste score {score:.2f} ({level}); biggest waste item {item} ({item_kg:,.0f} kg){swap}."
+        ), name))
+    return facts
+
+
+def build_facts():
+    """All chat facts over the current datasets."""
+    festivals = DATASETS.areas['Festival'].unique().tolist()
+    facts = []
+    for festival in festivals:
+        facts += festival_facts(festival)
+    facts += area_facts({festival: get_festival_hotspots(festival) for festival in festivals})
+    facts += shop_facts(DATASETS.sales)
+    return facts
+
+
+class FactIndex:
+    """
+    BM25 index over fact sentences.
+
+    Each term's postings hold its documents and their final BM25 weights, so
+    a query adds one precomputed array per term into the score vector. A
+    question naming festivals only gets facts about those festivals, or about
+    no festival in particular.
+    """
+
+    def __init__(self, facts):
+        self.texts = [fact.text for fact in facts]
+        self.boost = np.array([KIND_BOOST.get(fact.kind, 0.0) for fact in facts], dtype=np.float32)
+        self.tokens = np.array([estimate_tokens(text) for text in self.texts], dtype=np.int32)
+
+        self.festivals = sorted({fact.festival for fact in facts if fact.festival})
+        self.festival_terms = [set(tokenize(festival)) for festival in self.festivals]
+        codes = {festival: code for code, festival in enumerate(self.festivals)}
+        self.festival_codes = np.array([codes.get(fact.festival, -1) for fact in facts], dtype=np.int16)
+
+        documents = {}
+        lengths = np.zeros(len(self.texts), dtype=np.float32)
+        for doc, fact in enumerate(facts):
+            terms = _indexed_terms(fact)
+            lengths[doc] = len(terms)
+            for term, tf in Counter(terms).items():
+                postings = documents.setdefault(term, ([], []))
+                postings[0].append(doc)
+                postings[1].append(tf)
+
+        n = len(self.texts)
+        average_length = float(lengths.mean()) if n else 1.0
+        self.postings = {}
+        for term, (docs, tfs) in documents.items():
+            docs = np.array(docs, dtype=np.int32)
+            tfs = np.array(tfs, dtype=np.float32)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1 - B + B * lengths[docs] / average_length)
+            self.postings[term] = (docs, (idf * tfs * (K1 + 1) / (tfs + norm)).astype(np.float32))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def search(self, query, k=TOP_K, token_budget=CONTEXT_TOKENS):
+        """
+        Find the facts most relevant to ``query``.
+
+        Args:
+            query: Free-text question
+            k: Maximum number of facts
+            token_budget: Maximum estimated tokens of all facts together
+
+        Returns:
+            list: Fact sentences, best match first
+        """
+        terms = set(tokenize(query))
+        scores = np.zeros(len(self.texts), dtype=np.float32)
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None:
+                scores[postings[0]] += postings[1]
+
+        named = [code for code, festival_terms in enumerate(self.festival_terms) if terms & festival_terms]
+        if named:
+            scores[~np.isin(self.festival_codes, named + [-1])] = 0
+
+        matched = np.flatnonzero(scores)
+        if not matched.size:
+            return []
+        scores = scores[matched] + self.boost[matched]
+        n = min(len(matched), k * CANDIDATES)
+        best = np.argpartition(-scores, n - 1)[:n]
+        ranked = matched[best[np.argsort(-scores[best], kind='stable')]]
+
+        facts = []
+        for doc in ranked:
+            if self.tokens[doc] <= token_budget:
+                facts.append(self.texts[doc])
+                token_budget -= self.tokens[doc]
+                if len(facts) == k:
+                    break
+        return facts
+
+
+def get_chat_index():
+    """Fact index over the shared datasets, built once per dataset version."""
+    return DATASETS.cached('chat_index', lambda: FactIndex(build_facts()))
+
+
+def retrieve_facts(message, context=None):
+    """
+    Facts to ground a chat reply to ``message``.
+
+    Args:
+        message: User's question
+        context: Optional chat context; its festival and area join the query
+
+    Returns:
+        list: Up to TOP_K fact sentences within CONTEXT_TOKENS
+    """
+    query = message
+    if isinstance(context, dict):
+        query = ' '.join([message] + [str(context[key]) for key in ('festival', 'area') if context.get(key)])
+    index = get_chat_index()
+    with stage('retrieve'):
+        return index.search(query)
@@ -1,10 +1,16 @@
 """Data loader module for Festival Waste Prediction system."""
 
+import numpy as np
 import pandas as pd
 import os
+import threading
+import time
+from contextlib import contextmanager
+from metrics import record_cache, record_dataset_load
 
-# Path to dataset folder (relative to backend)
-DATASET_PATH = os.path.join(os.path.dirname(__file__), '..', 'dataset')
+# Path to dataset folder (relative to backend); DATASET_PATH points it elsewhere,
+# e.g. at files written by benchmarks/generate_datasets.py
+DATASET_PATH = os.getenv('DATASET_PATH') or os.path.join(os.path.dirname(__file__), '..', 'dataset')
 
 
 def load_sales_data():
@@ -35,10 +41,408 @@ def load_timeseries():
     return df
 
 
+# Local store written by forecaster.py
+FORECASTS_PATH = os.path.join(DATASET_PATH, 'area_forecasts.csv')
+
+# Forecasts below this confidence keep the static CSV prediction
+MIN_FORECAST_CONFIDENCE = 0.5
+
+
+def load_forecasts():
+    """Load stored per-area festival forecasts, or None if none have been trained."""
+    if not os.path.exists(FORECASTS_PATH):
+        return None
+    return pd.read_csv(FORECASTS_PATH)
+
+
+def apply_forecasts(area_df, forecasts, min_confidence=MIN_FORECAST_CONFIDENCE):
+    """
+    Overlay trained forecasts on the static area-festival predictions.
+
+    Rows with a forecast at or above ``min_confidence`` get their predicted
+    extra/total waste replaced; every row gets a ``Forecast_Confidence``
+    column (NaN where the static prediction is kept).
+    """
+    area_df = area_df.copy()
+    area_df['Forecast_Confidence'] = float('nan')
+    if forecasts is None or forecasts.empty:
+        return area_df
+
+    keys = ['Area', 'Pincode', 'Festival']
+    merged = area_df[keys].merge(
+        forecasts[keys + ['Predicted_Extra_Waste_kg', 'Predicted_Total_Daily_Waste_kg', 'Confidence']],
+        on=keys, how='left'
+    )
+    use = (merged['Confidence'] >= min_confidence).to_numpy()
+    if not use.any():
+        return area_df
+
+    for column in ('Predicted_Festival_Extra_Waste_kg', 'Predicted_Total_Daily_Waste_kg'):
+        area_df[column] = area_df[column].astype(float)
+    area_df.loc[use, 'Predicted_Festival_Extra_Waste_kg'] = merged.loc[use, 'Predicted_Extra_Waste_kg'].to_numpy()
+    area_df.loc[use, 'Predicted_Total_Daily_Waste_kg'] = merged.loc[use, 'Predicted_Total_Daily_Waste_kg'].to_numpy()
+    area_df.loc[use, 'Forecast_Confidence'] = merged.loc[use, 'Confidence'].to_numpy()
+    return area_df
+
+
+def load_area_predictions():
+    """Load area-festival data with any stored forecasts applied."""
+    return apply_forecasts(load_area_festivals(), load_forecasts())
+
+
+# Files each dataset is read from; when another process replaces one, the
+# dataset is reloaded on the next access (see DatasetRegistry.refresh)
+DATASET_SOURCES = {
+    'areas': (os.path.join(DATASET_PATH, 'mega_area_festivals.csv'), FORECASTS_PATH),
+}
+
+# Seconds between checks of the source files
+WATCH_INTERVAL = 1.0
+
+# Above this share of changed rows, derived structures are rebuilt rather than updated row by row
+MAX_CHANGED_SHARE = 0.1
+
+
+def file_stamp(paths):
+    """Return (mtime_ns, size, inode) for each path, None where the file is missing."""
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            stamps.append(None)
+            continue
+        stamps.append((st.st_mtime_ns, st.st_size, st.st_ino))
+    return tuple(stamps)
+
+
+def changed_rows(old, new, keys):
+    """
+    Positions of the rows of ``new`` whose values differ from the same row of ``old``.
+
+    Returns:
+        ndarray: Row positions, or None if the frames don't line up (different
+        columns, length, or ``keys`` values at any position)
+    """
+    if len(old) != len(new) or list(old.columns) != list(new.columns):
+        return None
+    for key in keys:
+        if not np.array_equal(old[key].to_numpy(), new[key].to_numpy()):
+            return None
+
+    differs = np.zeros(len(new), dtype=bool)
+    for column in new.columns:
+        a, b = old[column].to_numpy(), new[column].to_numpy()
+        differs |= ~((a == b) | (pd.isna(a) & pd.isna(b)))
+    return np.flatnonzero(differs)
+
+
+class _Build:
+    """A derived structure being built for one dataset version; other callers wait on it."""
+
+    def __init__(self, version):
+        self.version = version
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def finish(self, value):
+        self._value = value
+        self._done.set()
+
+    def fail(self, error):
+        self._error = error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class DatasetRegistry:
+    """
+    Process-wide holder for the CSV datasets.
+
+    Each dataset is read from disk lazily, at most once, on first access.
+    Loads are guarded by a lock so concurrent requests never parse the same
+    file twice, and ``load_counts`` records every disk read so tests can
+    assert that no request path triggers a reload.
+
+    Datasets with ``sources`` are re-read when those files change, so data
+    published by one gunicorn worker reaches the others. ``stamp`` identifies
+    the published data: the newest source mtime, the same in every worker.
+    ``version`` counts changes in this process and keys its derived caches.
+    The frame a reload or ``set`` replaces is kept until the next one, so
+    ``row_changes`` can tell derived structures which rows to update.
+    """
+
+    def __init__(self, loaders=None, sources=None):
+        if loaders is None:
+            loaders = {
+                'sales': load_sales_data,
+                'areas': load_area_predictions,
+                'products': load_products,
+                'timeseries': load_timeseries,
+            }
+            sources = DATASET_SOURCES if sources is None else sources
+        self._loaders = dict(loaders)
+        self._sources = dict(sources or {})
+        self._stamps = {}
+        self._next_check = 0.0
+        self._frames = {}
+        # Version each frame was loaded at, and (first version, last version, frame) of the one it replaced
+        self._loaded_at = {}
+        self._replaced = {}
+        self._derived = {}
+        self._building = {}
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._readers = 0
+        self.load_counts = {name: 0 for name in self._loaders}
+        self.version = 0
+        self.stamp = self._published()
+
+    def _published(self):
+        mtimes = [stamp[0] for paths in self._sources.values() for stamp in file_stamp(paths) if stamp]
+        return max(mtimes, default=0)
+
+    def get(self, name):
+        """Return the named dataset, loading it from disk on first use."""
+        self.refresh()
+        frame = self._frames.get(name)
+        if frame is not None:
+            return frame
+
+        with self._lock:
+            frame = self._frames.get(name)
+            if frame is None:
+                if name in self._sources:
+                    # Stamped before reading, so a write during the load triggers another
+                    self._stamps[name] = file_stamp(self._sources[name])
+                start = time.perf_counter()
+                frame = self._loaders[name]()
+                record_dataset_load(name, time.perf_counter() - start)
+                self.load_counts[name] += 1
+                self._frames[name] = frame
+                self._loaded_at[name] = self.version
+        return frame
+
+    @property
+    def sales(self):
+        return self.get('sales')
+
+    @property
+    def areas(self):
+        return self.get('areas')
+
+    @property
+    def products(self):
+        return self.get('products')
+
+    @property
+    def timeseries(self):
+        return self.get('timeseries')
+
+    def cached(self, key, builder, update=None):
+        """
+        Return a structure derived from the datasets, building it once per version.
+
+        ``builder`` is called with no arguments the first time ``key`` is requested
+        and again only after ``set``/``reload`` bump the dataset version. It runs
+        outside the registry lock, inside a snapshot, so a slow build only holds
+        up callers waiting for the same key; they wait on its ``_Build`` entry.
+
+        ``update``, if given, is tried before ``builder`` when the cached value is
+        stale: it is called with that value and the version it was built at, and
+        returns the value for the current version (usually the same object,
+        updated from ``row_changes``), or None to rebuild it with ``builder``.
+        """
+        self.refresh()
+        entry = self._derived.get(key)
+        if entry is not None and entry[0] == self.version:
+            record_cache(key, hit=True)
+            return entry[1]
+
+        with self._lock:
+            entry = self._derived.get(key)
+            if entry is not None and entry[0] == self.version:
+                record_cache(key, hit=True)
+                return entry[1]
+            build = self._building.get(key)
+            owner = build is None or build.version != self.version
+            if owner:
+                build = self._building[key] = _Build(self.version)
+        record_cache(key, hit=False)
+
+        if not owner:
+            return build.wait()
+
+        try:
+            with self.snapshot() as version:
+                value = None
+                if update is not None and entry is not None:
+                    value = update(entry[1], entry[0])
+                if value is None:
+                    value = builder()
+        except BaseException as e:
+            with self._lock:
+                if self._building.get(key) is build:
+                    del self._building[key]
+                # A failed update may have left the old value half changed
+                if entry is not None and self._derived.get(key) is entry:
+                    del self._derived[key]
+            build.fail(e)
+            raise
+        with self._lock:
+            self._derived[key] = (version, value)
+            if self._building.get(key) is build:
+                del self._building[key]
+        build.finish(value)
+        return value
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Hold the datasets at one version for the duration of a block.
+
+        ``set``/``reload`` wait until every open snapshot has exited, so all reads
+        inside the block see the same frames. Yields the pinned version.
+        """
+        with self._lock:
+            self._readers += 1
+            version = self.version
+        try:
+            yield version
+        finally:
+            with self._lock:
+                self._readers -= 1
+                if not self._readers:
+                    self._idle.notify_all()
+
+    def set(self, name, frame):
+        """Replace a dataset in memory (e.g. after ingestion) and bump the version."""
+        with self._lock:
+            self._idle.wait_for(lambda: not self._readers)
+            self._keep_replaced(name)
+            self._frames[name] = frame
+            self.version += 1
+            self._loaded_at[name] = self.version
+            self.stamp = max(self.stamp + 1, time.time_ns())
+            self._changed.notify_all()
+
+    def reload(self, *names):
+        """Drop cached datasets so the next access re-reads them from disk."""
+        with self._lock:
+            self._idle.wait_for(lambda: not self._readers)
+            self._drop(names or list(self._frames))
+
+    def _keep_replaced(self, name):
+        frame = self._frames.get(name)
+        if frame is not None:
+            self._replaced[name] = (self._loaded_at[name], self.version, frame)
+
+    def _drop(self, names):
+        for name in names:
+            self._keep_replaced(name)
+            self._frames.pop(name, None)
+            self._stamps.pop(name, None)
+        self.version += 1
+        published = self._published()
+        # Files replaced by older copies keep the mtime; the stamp must still change
+        self.stamp = published if published != self.stamp else self.stamp + 1
+        self._changed.notify_all()
+
+    def refresh(self, force=False):
+        """
+        Reload datasets whose source files changed since they were read.
+
+        Checks at most once per WATCH_INTERVAL unless ``force``. Never waits:
+        while snapshots are open the reload is skipped and retried on the next
+        access, so it is safe to call from inside a builder.
+
+        Returns:
+            bool: True if any dataset was dropped for reloading
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        self._next_check = now + WATCH_INTERVAL
+        stale = [name for name, stamp in list(self._stamps.items())
+                 if file_stamp(self._sources[name]) != stamp]
+        if not stale:
+            return False
+
+        with self._lock:
+            if self._readers:
+                self._next_check = now
+                return False
+            self._drop(stale)
+        return True
+
+    def row_changes(self, name, version, keys):
+        """
+        Rows of a dataset that changed since ``version``, for updating derived structures in place.
+
+        Args:
+            name: Dataset name
+            version: Version the derived structure was built at
+            keys: Columns identifying a row; rows must keep their keys and positions
+
+        Returns:
+            tuple: (old rows, new rows) as DataFrames aligned row for row, or None
+            if the frame held at ``version`` is gone, the rows don't line up, or
+            more than MAX_CHANGED_SHARE of them changed
+        """
+        frame = self.get(name)
+        with self._lock:
+            replaced = self._replaced.get(name)
+            if self._loaded_at.get(name, version) <= version:
+                # Nothing of ``name`` changed since ``version``
+                return frame.iloc[:0], frame.iloc[:0]
+        if replaced is None or not replaced[0] <= version <= replaced[1]:
+            return None
+
+        old = replaced[2]
+        rows = changed_rows(old, frame, keys)
+        if rows is None or len(rows) > MAX_CHANGED_SHARE * len(frame):
+            return None
+        return old.iloc[rows], frame.iloc[rows]
+
+    def wait_for_change(self, stamp, timeout=None):
+        """
+        Block until the published data stamp differs from ``stamp`` or ``timeout`` passes.
+
+        Returns:
+            int: The current stamp (equal to ``stamp`` on timeout)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            # Wakes every WATCH_INTERVAL to notice data published by other processes
+            while self.stamp == stamp:
+                wait = WATCH_INTERVAL if deadline is None else min(WATCH_INTERVAL, deadline - time.monotonic())
+                if wait <= 0:
+                    break
+                self._changed.wait(wait)
+                if self.stamp == stamp:
+                    self.refresh()
+            return self.stamp
+
+    def reloads(self):
+        """Return the number of disk reads beyond the first, per dataset."""
+        return {name: max(0, count - 1) for name, count in self.load_counts.items()}
+
+
+# Shared registry used by all modules when no DataFrame is passed explicitly
+DATASETS = DatasetRegistry()
+
+
 def get_all_shops(sales_df=None):
     """Get list of all unique shops."""
     if sales_df is None:
-        sales_df = load_sales_data()
+        sales_df = DATASETS.sales
     
     shops = sales_df[['Shop_ID', 'Shop_Name', 'Area', 'Pincode']].drop_duplicates()
     return shops.to_dict('records')
@@ -47,7 +451,7 @@ def get_all_shops(sales_df=None):
 def get_all_festivals(sales_df=None):
     """Get list of all unique festivals."""
     if sales_df is None:
-        sales_df = load_sales_data()
+        sales_df = DATASETS.sales
     
     festivals = sales_df['Festival'].unique().tolist()
     return festivals
@@ -56,7 +460,7 @@ def get_all_festivals(sales_df=None):
 def get_all_areas(area_df=None):
     """Get list of all unique areas."""
     if area_df is None:
-        area_df = load_area_festivals()
+        area_df = DATASETS.areas
     
     areas = area_df[['Area', 'Pincode']].drop_duplicates()
     return areas.to_dict('records')
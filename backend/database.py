@@ -4,6 +4,7 @@ Supabase Database Client Configuration
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from metrics import track_supabase
 
 # Load environment variables from .env file
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -22,38 +23,57 @@ def get_client() -> Client:
     return supabase
 
 
+# asyncio client for asgi.py, created on first use inside the event loop
+_async_client = None
+
+
+async def get_async_client():
+    """Returns the asyncio Supabase client instance"""
+    global _async_client
+    if _async_client is None:
+        from supabase import acreate_client
+        _async_client = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+    return _async_client
+
+
 # Database helper functions
 def fetch_all(table_name: str):
     """Fetch all records from a table"""
-    response = supabase.table(table_name).select("*").execute()
+    with track_supabase(table_name, 'select'):
+        response = supabase.table(table_name).select("*").execute()
     return response.data
 
 
 def fetch_by_id(table_name: str, id_value: int):
     """Fetch a single record by ID"""
-    response = supabase.table(table_name).select("*").eq("id", id_value).single().execute()
+    with track_supabase(table_name, 'select'):
+        response = supabase.table(table_name).select("*").eq("id", id_value).single().execute()
     return response.data
 
 
 def fetch_where(table_name: str, column: str, value):
     """Fetch records matching a condition"""
-    response = supabase.table(table_name).select("*").eq(column, value).execute()
+    with track_supabase(table_name, 'select'):
+        response = supabase.table(table_name).select("*").eq(column, value).execute()
     return response.data
 
 
 def insert(table_name: str, data: dict):
     """Insert a new record"""
-    response = supabase.table(table_name).insert(data).execute()
+    with track_supabase(table_name, 'insert'):
+        response = supabase.table(table_name).insert(data).execute()
     return response.data
 
 
 def update(table_name: str, id_value: int, data: dict):
     """Update a record by ID"""
-    response = supabase.table(table_name).update(data).eq("id", id_value).execute()
+    with track_supabase(table_name, 'update'):
+        response = supabase.table(table_name).update(data).eq("id", id_value).execute()
     return response.data
 
 
 def delete(table_name: str, id_value: int):
     """Delete a record by ID"""
-    response = supabase.table(table_name).delete().eq("id", id_value).execute()
+    with track_supabase(table_name, 'delete'):
+        response = supabase.table(table_name).delete().eq("id", id_value).execute()
     return response.data
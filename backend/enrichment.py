@@ -0,0 +1,271 @@
+"""
+Eco suggestions and marketing copy in two tiers: rules first, Gemini in the background.
+
+The shop suggestion and marketing routes answer at once from local_suggester.
+When Gemini is configured, the first request for a shop, festival and product
+set also starts the Gemini call in the background (a thread, or an asyncio
+task under asgi.py) and is answered with enrichment 'pending'. The reply is
+stored, and later requests get it merged over the rule-based answer with
+source 'gemini'. No request waits on Gemini.
+
+A new call costs the requesting client a token from its admission bucket
+and, without queueing, a slot in admission's 'background' lane. When the
+client's bucket is empty the answer stays rule-based ('rate_limited'), and
+when no slot is free it does too ('busy'); a later request tries again.
+Replies live in admission's SQLite store, shared by every worker on the
+host, for ENRICH_TTL seconds, and failed calls for FAILURE_TTL, so a bad key
+or an exhausted quota costs one call a minute rather than one per request.
+
+Under gunicorn's gevent workers the background threads are greenlets;
+gunicorn.conf.py switches gRPC to gevent in each worker, so a Gemini call
+yields to other requests instead of blocking the worker.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import gemini_suggester
+from admission import LANES, SLOT_LEASE, STORE, release, release_async, try_admit, try_take_token
+from gemini_suggester import (
+    generate_eco_suggestions, generate_eco_suggestions_async,
+    generate_marketing_message, generate_marketing_message_async
+)
+from local_suggester import local_eco_suggestions, local_marketing_message
+
+# Threads running background Gemini calls in each worker (greenlets under gevent)
+ENRICH_THREADS = int(os.getenv('ENRICH_THREADS', '4'))
+
+# Seconds a Gemini reply is served before it is regenerated
+ENRICH_TTL = int(os.getenv('ENRICH_TTL', '3600'))
+
+# Seconds before a failed call is retried
+FAILURE_TTL = 60
+
+# Enrichment states reported beside each answer
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+BUSY = 'busy'
+RATE_LIMITED = 'rate_limited'
+DISABLED = 'disabled'
+
+
+class EnrichmentCache:
+    """Background Gemini replies and in-progress calls, keyed by request inputs, shared across workers."""
+
+    def __init__(self, store=STORE):
+        self._store = store
+
+    def claim(self, key):
+        """
+        Look up ``key``, claiming it for a new Gemini call if it is missing or expired.
+
+        Returns:
+            tuple: (state, reply); state None means the caller claimed the key and must start the call
+        """
+        # A claim expires like a slot lease, so a lost call can't hold the key forever
+        return self._store.claim_reply(json.dumps(key), PENDING, SLOT_LEASE)
+
+    def store(self, key, state, reply, ttl):
+        self._store.store_reply(json.dumps(key), state, reply, ttl)
+
+    def forget(self, key):
+        self._store.forget_reply(json.dumps(key))
+
+
+CACHE = EnrichmentCache()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+# Running asyncio tasks, referenced so they aren't garbage collected mid-call
+_tasks = set()
+
+
+def _pool():
+    # Created on first use in each worker: threads don't survive gunicorn's fork
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=ENRICH_THREADS, thread_name_prefix='enrich')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _store(key, field, reply):
+    if reply and 'error' not in reply and isinstance(reply.get(field), dict):
+        CACHE.store(key, READY, reply, ENRICH_TTL)
+    else:
+        CACHE.store(key, FAILED, None, FAILURE_TTL)
+
+
+def _enrich(key, field, run, ticket):
+    reply = None
+    try:
+        reply = run()
+    finally:
+        _store(key, field, reply)
+        release(ticket)
+
+
+async def _enrich_async(key, field, run_async, ticket):
+    reply = None
+    try:
+        reply = await run_async()
+    finally:
+        await asyncio.to_thread(_store, key, field, reply)
+        await release_async(ticket)
+
+
+def _claim(key, client):
+    """
+    Look up ``key``, claiming it for a new Gemini call if ``client`` may start one.
+
+    Returns:
+        tuple: (state, reply); state None means the caller claimed the key and must start the call
+    """
+    state, reply = CACHE.claim(key)
+    # The client's bucket pays for new calls only, not for stored replies
+    if state is None and client is not None and not try_take_token(*client):
+        CACHE.forget(key)
+        return RATE_LIMITED, None
+    return state, reply
+
+
+def _admit(key):
+    """Take a background slot for ``key``'s call; returns the ticket, or None after forgetting the claim."""
+    ticket = try_admit(LANES['background'])
+    if ticket is None:
+        CACHE.forget(key)
+    return ticket
+
+
+def _answer(field, local, state, reply):
+    if state == READY:
+        # Gemini's fields win; the rules fill any it left out
+        return {
+            field: {**local, **reply[field]},
+            'source': 'gemini',
+            'enrichment': READY,
+            'raw_response': reply.get('raw_response')
+        }
+    return {field: local, 'source': 'rules', 'enrichment': state}
+
+
+def _tiered(key, field, local, run, client):
+    """
+    Answer with the stored Gemini reply for ``key`` if there is one, else with ``local``.
+
+    Args:
+        key: Cache key identifying the request's inputs
+        field: Key of the answer in the Gemini reply ('suggestions' or 'messages')
+        local: The rule-based answer
+        run: Function making the Gemini call, in a background thread
+        client: (key, lane) of the requesting client, whose bucket pays for a new call
+
+    Returns:
+        dict: {field: answer, 'source': 'rules' or 'gemini', 'enrichment': state}
+    """
+    if not gemini_suggester.api_key:
+        return {field: local, 'source': 'rules', 'enrichment': DISABLED}
+
+    state, reply = _claim(key, client)
+    if state is None:
+        ticket = _admit(key)
+        if ticket is None:
+            state = BUSY
+        else:
+            _pool().submit(_enrich, key, field, run, ticket)
+            state = PENDING
+    return _answer(field, local, state, reply)
+
+
+async def _tiered_async(key, field, local_fn, run_async, client):
+    """Async ``_tiered`` for the event loop: the SQLite and rule work run in a thread, the call as a task."""
+    if not gemini_suggester.api_key:
+        return {field: await asyncio.to_thread(local_fn), 'source': 'rules', 'enrichment': DISABLED}
+
+    local, (state, reply) = await asyncio.to_thread(lambda: (local_fn(), _claim(key, client)))
+    if state is None:
+        ticket = await asyncio.to_thread(_admit, key)
+        if ticket is None:
+            state = BUSY
+        else:
+            task = asyncio.get_running_loop().create_task(_enrich_async(key, field, run_async, ticket))
+            _tasks.add(task)
+            task.add_done_callback(_tasks.discard)
+            state = PENDING
+    return _answer(field, local, state, reply)
+
+
+def _eco_key(high_waste_products, shop_name, festival):
+    return ('eco_suggestions', shop_name, festival, [p.get('Item_Name', '') for p in high_waste_products[:5]])
+
+
+def _marketing_key(shop_name, festival, eco_products):
+    return ('marketing_message', shop_name, festival, list(eco_products or ()))
+
+
+def eco_suggestions(high_waste_products, shop_name, festival, client=None):
+    """
+    Eco suggestions for a shop, from the rules or a stored Gemini reply, without waiting on Gemini.
+
+    Args:
+        high_waste_products: List of products with high waste scores
+        shop_name: Name of the shop
+        festival: Festival name
+        client: (key, lane) from admission.classify; its bucket pays for a new Gemini call
+
+    Returns:
+        dict: {'suggestions', 'source', 'enrichment'}, plus 'raw_response' once enriched
+    """
+    return _tiered(
+        _eco_key(high_waste_products, shop_name, festival), 'suggestions',
+        local_eco_suggestions(high_waste_products, shop_name, festival),
+        lambda: generate_eco_suggestions(high_waste_products, shop_name, festival),
+        client
+    )
+
+
+async def eco_suggestions_async(high_waste_products, shop_name, festival, client=None):
+    """Async ``eco_suggestions`` for asgi.py; the Gemini call runs as a task on the event loop."""
+    return await _tiered_async(
+        _eco_key(high_waste_products, shop_name, festival), 'suggestions',
+        lambda: local_eco_suggestions(high_waste_products, shop_name, festival),
+        lambda: generate_eco_suggestions_async(high_waste_products, shop_name, festival),
+        client
+    )
+
+
+def marketing_messages(shop_name, festival, eco_products=None, client=None):
+    """
+    Marketing copy for a shop, from templates or a stored Gemini reply, without waiting on Gemini.
+
+    Args:
+        shop_name: Name of the shop
+        festival: Festival name
+        eco_products: List of eco-friendly products to promote
+        client: (key, lane) from admission.classify; its bucket pays for a new Gemini call
+
+    Returns:
+        dict: {'messages', 'source', 'enrichment'}, plus 'raw_response' once enriched
+    """
+    return _tiered(
+        _marketing_key(shop_name, festival, eco_products), 'messages',
+        local_marketing_message(shop_name, festival, eco_products),
+        lambda: generate_marketing_message(shop_name, festival, eco_products),
+        client
+    )
+
+
+async def marketing_messages_async(shop_name, festival, eco_products=None, client=None):
+    """Async ``marketing_messages`` for asgi.py; the Gemini call runs as a task on the event loop."""
+    return await _tiered_async(
+        _marketing_key(shop_name, festival, eco_products), 'messages',
+        lambda: local_marketing_message(shop_name, festival, eco_products),
+        lambda: generate_marketing_message_async(shop_name, festival, eco_products),
+        client
+    )
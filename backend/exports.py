@@ -0,0 +1,131 @@
+"""Streaming CSV/NDJSON export of columnar analysis results."""
+
+import csv
+import io
+import re
+import unicodedata
+import zlib
+from urllib.parse import quote
+from flask import Response, stream_with_context
+from werkzeug.http import dump_options_header
+from serialization import dumps_bytes
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+# Characters replaced in download names: controls, quotes and path separators
+UNSAFE_FILENAME = re.compile(r'[\x00-\x1f\x7f"\\/]')
+
+# Rows converted and encoded per chunk; bounds memory regardless of export size
+CHUNK_ROWS = 2000
+
+
+def _column_chunks(df, columns, chunk_rows):
+    """Yield lists of row tuples of native values, chunk_rows at a time."""
+    arrays = [df[c].to_numpy() for c in columns]
+    for start in range(0, len(df), chunk_rows):
+        stop = start + chunk_rows
+        yield list(zip(*(a[start:stop].tolist() for a in arrays)))
+
+
+def iter_csv(df, columns, header=None, formatters=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yield CSV-encoded byte chunks for the given DataFrame columns.
+
+    Args:
+        df: Source DataFrame
+        columns: Columns to export, in order
+        header: Header labels (defaults to the column names)
+        formatters: Optional mapping of column index to a value formatter
+        chunk_rows: Rows encoded per yielded chunk
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header or columns)
+
+    for rows in _column_chunks(df, columns, chunk_rows):
+        if formatters:
+            rows = [
+                [formatters[i](v) if i in formatters else v for i, v in enumerate(row)]
+                for row in rows
+            ]
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(df, columns, keys=None, chunk_rows=CHUNK_ROWS):
+    """Yield newline-delimited JSON byte chunks, one object per row."""
+    keys = keys or columns
+    for rows in _column_chunks(df, columns, chunk_rows):
+        yield b''.join(dumps_bytes(dict(zip(keys, row))) + b'\n' for row in rows)
+
+
+def gzip_chunks(chunks, level=6):
+    """Incrementally gzip-compress an iterable of byte chunks."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def content_disposition(filename):
+    """
+    Content-Disposition value downloading ``filename``, which may contain user-supplied parts.
+
+    Unsafe characters are replaced and the name is quoted as needed; non-ASCII
+    names get an ASCII fallback plus an RFC 5987 ``filename*``, as send_file does.
+    """
+    filename = UNSAFE_FILENAME.sub('_', filename)
+    try:
+        filename.encode('ascii')
+        return dump_options_header('attachment', {'filename': filename})
+    except UnicodeEncodeError:
+        fallback = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return dump_options_header('attachment', {
+            'filename': fallback or 'download',
+            'filename*': f"UTF-8''{quote(filename, safe='')}"
+        })
+
+
+def stream_export(df, columns, fmt, filename, header=None, formatters=None, gzip=False):
+    """
+    Build a streaming Flask response exporting DataFrame columns.
+
+    Args:
+        df: Source DataFrame
+        columns: Columns to export, in order
+        fmt: 'csv' or 'ndjson'
+        filename: Download filename without extension
+        header: CSV header labels / NDJSON keys (defaults to the column names)
+        formatters: CSV-only mapping of column index to a value formatter
+        gzip: Compress the stream and add a .gz extension
+
+    Returns:
+        Response: Chunked response whose body is generated row block by row block
+    """
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    if fmt == 'csv':
+        chunks = iter_csv(df, columns, header, formatters)
+    else:
+        chunks = iter_ndjson(df, columns, header)
+
+    filename = f'{filename}.{extension}'
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': content_disposition(filename)}
+    )
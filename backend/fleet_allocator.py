@@ -0,0 +1,244 @@
+"""Fleet-constrained allocation of trucks and workers across festival hotspots."""
+
+import copy
+import numpy as np
+from data_loader import DATASETS
+from hotspot_analyzer import festival_exists, get_hotspot_frame, get_priority_level
+
+# Waste one crew (a truck and its workers) collects in one shift
+CREW_KG_PER_SHIFT = 5000
+CREW_WORKERS = 4
+SHIFTS_PER_DAY = 2
+DEFAULT_DAYS = 3
+
+# Weight of one uncollected kg by area priority
+PRIORITY_WEIGHTS = {'CRITICAL': 4.0, 'HIGH': 3.0, 'MEDIUM': 2.0, 'LOW': 1.0}
+
+# Columns identifying an area-festival row
+AREA_KEYS = ('Festival', 'Area', 'Pincode')
+
+
+def allocate_day(demand, weights, crews, crew_capacity):
+    """
+    Allocate crews for one day to minimize priority-weighted uncollected waste.
+
+    Each area's demand splits into full crew-loads (gain weight * capacity) and
+    at most one partial load (gain weight * remainder). Marginal gains per area
+    never increase, so taking loads in descending gain order is optimal; this is
+    done with one argsort over 2 x areas blocks and a cumulative sum.
+
+    Returns:
+        ndarray: Crews assigned per area
+    """
+    full = np.floor(demand / crew_capacity).astype(np.int64)
+    partial = demand - full * crew_capacity
+
+    n_areas = len(demand)
+    gains = np.concatenate([weights * crew_capacity, weights * partial])
+    counts = np.concatenate([full, (partial > 0).astype(np.int64)])
+    owners = np.concatenate([np.arange(n_areas), np.arange(n_areas)])
+
+    # Highest gain first; ties go to the larger demand
+    order = np.lexsort((-np.concatenate([demand, demand]), -gains))
+    counts = counts[order]
+    cumulative = np.cumsum(counts)
+    taken = np.clip(crews - (cumulative - counts), 0, counts)
+
+    assigned = np.zeros(n_areas, dtype=np.int64)
+    np.add.at(assigned, owners[order], taken)
+    return assigned
+
+
+class FleetAllocator:
+    """
+    Multi-day crew allocation over a fixed truck/worker pool.
+
+    Area demands and weights are held as NumPy arrays, so each day's
+    allocation is a handful of vector operations however many areas there are.
+    A changed forecast for one area is applied in place with ``update_area``,
+    and the next solve runs from the held arrays without rebuilding the
+    hotspot data.
+    """
+
+    def __init__(self, areas, pincodes, extra_waste_kg, priorities, trucks, workers,
+                 days=DEFAULT_DAYS, shifts_per_day=SHIFTS_PER_DAY):
+        self.areas = list(areas)
+        self.pincodes = [int(p) for p in pincodes]
+        # Area names repeat across pincodes, so areas are keyed by both
+        self.index = {key: i for i, key in enumerate(zip(self.areas, self.pincodes))}
+        self.demand = np.asarray(extra_waste_kg, dtype=float).copy()
+        self.priorities = np.asarray(priorities).copy()
+        self.weights = np.array([PRIORITY_WEIGHTS[p] for p in self.priorities])
+        self.trucks = int(trucks)
+        self.workers = int(workers)
+        self.days = int(days)
+        self.shifts_per_day = int(shifts_per_day)
+
+    @property
+    def crews(self):
+        """Crews that can be staffed from the truck and worker pools."""
+        return min(self.trucks, self.workers // CREW_WORKERS)
+
+    def with_fleet(self, trucks, workers, days=DEFAULT_DAYS, shifts_per_day=SHIFTS_PER_DAY):
+        """An allocator over the same held area arrays with another fleet."""
+        allocator = copy.copy(self)
+        allocator.trucks = int(trucks)
+        allocator.workers = int(workers)
+        allocator.days = int(days)
+        allocator.shifts_per_day = int(shifts_per_day)
+        return allocator
+
+    def update_area(self, area, pincode, extra_waste_kg, priority=None):
+        """Replace one area's forecast (and optionally priority) in the held arrays."""
+        i = self.index[(area, int(pincode))]
+        self.demand[i] = float(extra_waste_kg)
+        if priority is not None:
+            self.priorities[i] = priority
+            self.weights[i] = PRIORITY_WEIGHTS[priority]
+
+    def solve(self):
+        """
+        Allocate crews day by day, carrying uncollected waste forward.
+
+        Returns:
+            dict: Per-day crew assignments, collected and uncollected waste per area
+        """
+        crew_capacity = CREW_KG_PER_SHIFT * self.shifts_per_day
+        backlog = self.demand.copy()
+        schedule = np.zeros((self.days, len(self.areas)), dtype=np.int64)
+
+        for day in range(self.days):
+            assigned = allocate_day(backlog, self.weights, self.crews, crew_capacity)
+            schedule[day] = assigned
+            backlog = np.maximum(0.0, backlog - assigned * crew_capacity)
+
+        return {
+            'schedule': schedule,
+            'collected_kg': self.demand - backlog,
+            'uncollected_kg': backlog,
+        }
+
+    def plan(self):
+        """Solve and format the allocation for API responses and reports."""
+        result = self.solve()
+        schedule = result['schedule']
+        collected = result['collected_kg']
+        uncollected = result['uncollected_kg']
+
+        # Highest priority first, then largest demand; built column-wise for large cities
+        order = np.lexsort((-self.demand, -self.weights))
+        per_area = schedule.T[order]
+        columns = zip(
+            [self.areas[i] for i in order],
+            [self.pincodes[i] for i in order],
+            self.priorities[order].tolist(),
+            self.demand[order].round(2).tolist(),
+            per_area.tolist(),
+            (per_area * CREW_WORKERS).tolist(),
+            collected[order].round(2).tolist(),
+            uncollected[order].round(2).tolist()
+        )
+        allocations = [
+            {
+                'area': area,
+                'pincode': pincode,
+                'priority': priority,
+                'extra_waste_kg': demand,
+                'trucks_per_day': trucks,
+                'workers_per_day': workers,
+                'collected_kg': collected_kg,
+                'uncollected_kg': uncollected_kg,
+            }
+            for (area, pincode, priority, demand, trucks, workers,
+                 collected_kg, uncollected_kg) in columns
+        ]
+
+        used = schedule.sum(axis=1)
+        return {
+            'fleet': {
+                'trucks': self.trucks,
+                'workers': self.workers,
+                'crews': self.crews,
+                'days': self.days,
+                'shifts_per_day': self.shifts_per_day,
+                'crew_kg_per_shift': CREW_KG_PER_SHIFT,
+            },
+            'totals': {
+                'extra_waste_kg': round(float(self.demand.sum()), 2),
+                'collected_kg': round(float(collected.sum()), 2),
+                'uncollected_kg': round(float(uncollected.sum()), 2),
+                'weighted_uncollected_kg': round(float((uncollected * self.weights).sum()), 2),
+                'crews_used_per_day': used.tolist(),
+                'areas_fully_cleared': int((uncollected <= 0).sum()),
+            },
+            'allocations': allocations
+        }
+
+
+def build_fleet_allocator(festival, area_df=None):
+    """Build an allocator over the hotspots of a festival with no fleet, or None if it has no data."""
+    frame = get_hotspot_frame(festival, area_df)
+    if frame.empty:
+        return None
+    return FleetAllocator(
+        frame['area'].tolist(),
+        frame['pincode'].tolist(),
+        frame['extra_waste_kg'].to_numpy(dtype=float),
+        frame['priority'].to_numpy(),
+        trucks=0, workers=0
+    )
+
+
+def _apply_forecast_changes(festival, allocator, version):
+    """Apply the area rows changed since ``version`` to a cached allocator, or None to rebuild it."""
+    changes = DATASETS.row_changes('areas', version, AREA_KEYS)
+    if changes is None or allocator is None:
+        return None
+    _, new = changes
+    new = new[new['Festival'] == festival]
+    if not set(zip(new['Area'], new['Pincode'].astype(int))) <= allocator.index.keys():
+        return None
+
+    for area, pincode, extra in zip(new['Area'], new['Pincode'], new['Predicted_Festival_Extra_Waste_kg']):
+        allocator.update_area(area, pincode, round(float(extra), 2), get_priority_level(extra))
+    return allocator
+
+
+def get_fleet_allocator(festival, trucks, workers, days=DEFAULT_DAYS,
+                        shifts_per_day=SHIFTS_PER_DAY, area_df=None):
+    """
+    Allocator over the hotspots of a festival with the given fleet, or None if it has no data.
+
+    Without ``area_df`` the area arrays are cached per festival, and forecast
+    changes to a few areas are applied to them with ``update_area``.
+    """
+    if area_df is not None:
+        allocator = build_fleet_allocator(festival, area_df)
+    elif not festival_exists(festival):
+        # Only known festivals are cached so arbitrary names can't grow the cache
+        return None
+    else:
+        allocator = DATASETS.cached(
+            ('fleet_allocator', festival),
+            lambda: build_fleet_allocator(festival),
+            update=lambda allocator, version: _apply_forecast_changes(festival, allocator, version)
+        )
+    if allocator is None:
+        return None
+    return allocator.with_fleet(trucks, workers, days, shifts_per_day)
+
+
+def allocate_fleet(festival, trucks, workers, days=DEFAULT_DAYS,
+                   shifts_per_day=SHIFTS_PER_DAY, area_df=None):
+    """
+    Distribute a finite truck/worker pool across a festival's hotspots.
+
+    Returns:
+        dict: Allocation plan, or None if the festival has no data
+    """
+    allocator = get_fleet_allocator(festival, trucks, workers, days, shifts_per_day, area_df)
+    if allocator is None:
+        return None
+    plan = allocator.plan()
+    plan['festival'] = festival
+    return plan
@@ -0,0 +1,271 @@
+"""
+Per-area festival uplift forecasting from the daily waste timeseries.
+
+Every area shares the same calendar, so one design matrix (intercept, trend,
+weekly cycle and a window indicator per festival) is fitted against all areas
+at once with a single least-squares solve over a (days x areas) matrix.
+
+Run directly to train and store forecasts:
+    python forecaster.py [--supabase]
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from data_loader import (
+    DATASETS, FORECASTS_PATH, MIN_FORECAST_CONFIDENCE,
+    load_timeseries, load_area_festivals
+)
+from metrics import track_supabase
+from offload import run_native
+
+# Main festival day per year; the uplift window is centred on it
+FESTIVAL_DATES = {
+    2024: {
+        'Sankranti': '2024-01-15',
+        'Holi': '2024-03-25',
+        'Ganesh Chaturthi': '2024-09-07',
+        'Diwali': '2024-11-01',
+        'Christmas': '2024-12-25',
+    },
+    2025: {
+        'Sankranti': '2025-01-14',
+        'Holi': '2025-03-14',
+        'Ganesh Chaturthi': '2025-08-27',
+        'Diwali': '2025-10-20',
+        'Christmas': '2025-12-25',
+    },
+    2026: {
+        'Sankranti': '2026-01-14',
+        'Holi': '2026-03-04',
+        'Ganesh Chaturthi': '2026-09-14',
+        'Diwali': '2026-11-08',
+        'Christmas': '2026-12-25',
+    },
+}
+
+# Days before/after the festival day counted as festival days
+UPLIFT_WINDOW = (-1, 1)
+
+# Two-sided 95% normal quantile used for confidence
+Z_95 = 1.96
+
+
+def build_design_matrix(dates, calendar=FESTIVAL_DATES, window=UPLIFT_WINDOW):
+    """
+    Build the regression design matrix shared by every area.
+
+    Args:
+        dates: DatetimeIndex of the (common) observation days
+        calendar: {year: {festival: date}}
+        window: (days_before, days_after) around each festival day
+
+    Returns:
+        tuple: (X of shape days x features, list of festival names in column order)
+    """
+    days = ((dates - dates[0]).days).to_numpy(dtype=float)
+    weekday = 2 * np.pi * dates.dayofweek.to_numpy() / 7
+
+    base = [
+        np.ones_like(days),
+        days / 365.0,
+        np.sin(weekday),
+        np.cos(weekday),
+    ]
+
+    festivals = sorted({name for year in calendar.values() for name in year})
+    indicators = []
+    fitted = []
+    for festival in festivals:
+        column = np.zeros_like(days)
+        for year in calendar.values():
+            if festival not in year:
+                continue
+            offset = (dates - pd.Timestamp(year[festival])).days.to_numpy()
+            column[(offset >= window[0]) & (offset <= window[1])] = 1.0
+        # Festivals with no days inside the observed range can't be estimated
+        if column.any():
+            indicators.append(column)
+            fitted.append(festival)
+
+    return np.column_stack(base + indicators), fitted
+
+
+def timeseries_matrix(ts_df):
+    """
+    Pivot the long timeseries into a (days x areas) matrix.
+
+    Gaps inside an area's series are interpolated so all areas share one design matrix.
+    """
+    ts_df = ts_df.assign(Date=pd.to_datetime(ts_df['Date']))
+    wide = ts_df.pivot_table(
+        index='Date', columns=['Area', 'Pincode'], values='Actual_Waste_kg', aggfunc='sum'
+    ).sort_index()
+    wide = wide.asfreq('D').interpolate(limit_direction='both')
+    return wide
+
+
+def fit_uplift_models(ts_df=None, calendar=FESTIVAL_DATES, window=UPLIFT_WINDOW):
+    """
+    Fit festival uplift models for all areas in one batched least-squares solve.
+
+    Returns:
+        DataFrame: One row per (Area, Pincode, Festival) with the uplift as a
+        ratio of the area's non-festival level, its standard error and confidence
+    """
+    if ts_df is None:
+        ts_df = DATASETS.timeseries
+
+    wide = timeseries_matrix(ts_df)
+    X, festivals = build_design_matrix(wide.index, calendar, window)
+    Y = wide.to_numpy(dtype=float)
+
+    n_days, n_features = X.shape
+    beta, _, _, _ = np.linalg.lstsq(X, Y, rcond=None)
+
+    # Per-area residual variance and coefficient standard errors, all areas at once
+    residuals = Y - X @ beta
+    dof = max(1, n_days - n_features)
+    sigma2 = (residuals ** 2).sum(axis=0) / dof
+    xtx_inv_diag = np.diag(np.linalg.pinv(X.T @ X))
+    se = np.sqrt(np.outer(xtx_inv_diag, sigma2))
+
+    # Normalize by each area's mean level on non-festival days
+    festival_days = X[:, 4:].any(axis=1) if festivals else np.zeros(n_days, dtype=bool)
+    level = Y[~festival_days].mean(axis=0)
+
+    uplift = beta[4:] / level
+    uplift_se = se[4:] / level
+    confidence = 1 - np.minimum(1, Z_95 * uplift_se / np.maximum(np.abs(uplift), 1e-9))
+
+    areas = wide.columns
+    n_areas = len(areas)
+    return pd.DataFrame({
+        'Area': np.tile(areas.get_level_values('Area'), len(festivals)),
+        'Pincode': np.tile(areas.get_level_values('Pincode'), len(festivals)),
+        'Festival': np.repeat(festivals, n_areas),
+        'Uplift_Ratio': uplift.ravel(),
+        'Uplift_SE': uplift_se.ravel(),
+        'Confidence': confidence.ravel(),
+    })
+
+
+def forecast_area_festivals(models, area_df=None):
+    """
+    Turn fitted uplift ratios into predicted extra/total waste for each area-festival row.
+
+    Returns:
+        DataFrame: Predictions aligned with the area-festival dataset
+    """
+    if area_df is None:
+        area_df = load_area_festivals()
+
+    keys = ['Area', 'Pincode', 'Festival']
+    forecasts = area_df[keys + ['Festival_Year', 'Baseline_Daily_Waste_kg']].merge(models, on=keys, how='inner')
+
+    baseline = forecasts['Baseline_Daily_Waste_kg']
+    forecasts['Predicted_Extra_Waste_kg'] = (baseline * forecasts['Uplift_Ratio'].clip(lower=0)).round(2)
+    forecasts['Predicted_Total_Daily_Waste_kg'] = (baseline + forecasts['Predicted_Extra_Waste_kg']).round(2)
+    forecasts['Confidence'] = forecasts['Confidence'].round(2)
+    forecasts['Trained_At'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    return forecasts.drop(columns=['Baseline_Daily_Waste_kg'])
+
+
+def save_forecasts(forecasts, path=FORECASTS_PATH):
+    """
+    Write forecasts to the local store and refresh the shared area dataset.
+
+    The file is replaced in one rename, so other workers never read it half
+    written; they pick up the new forecasts from the file's changed stamp
+    (DatasetRegistry.refresh) rather than from this process's memory.
+    """
+    tmp = f'{path}.{os.getpid()}.tmp'
+    forecasts.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    DATASETS.refresh(force=True)
+
+
+# Unique key of the predictions table (see schema.sql)
+PREDICTION_KEY = 'area_id,pincode,festival_id,festival_year'
+
+
+def persist_predictions(forecasts):
+    """
+    Write forecasts to the Supabase ``predictions`` table.
+
+    Rows are upserted on (area, pincode, festival, year), so retraining
+    replaces each forecast instead of adding another copy.
+    """
+    from database import supabase
+
+    with track_supabase('festivals', 'select'):
+        festivals_response = supabase.table('festivals').select('id, name').execute()
+    with track_supabase('areas', 'select'):
+        areas_response = supabase.table('areas').select('id, name').execute()
+    festival_map = {f['name']: f['id'] for f in festivals_response.data}
+    area_map = {a['name']: a['id'] for a in areas_response.data}
+
+    records = [
+        {
+            'festival_id': festival_map[row['Festival']],
+            'area_id': area_map[row['Area']],
+            'pincode': str(row['Pincode']),
+            'festival_year': int(row['Festival_Year']),
+            'predicted_waste_kg': row['Predicted_Total_Daily_Waste_kg'],
+            'confidence': row['Confidence'],
+            'prediction_date': FESTIVAL_DATES.get(row['Festival_Year'], {}).get(row['Festival']),
+        }
+        for row in forecasts.to_dict('records')
+        if row['Festival'] in festival_map and row['Area'] in area_map
+    ]
+
+    batch_size = 100
+    for i in range(0, len(records), batch_size):
+        batch = records[i:i+batch_size]
+        try:
+            with track_supabase('predictions', 'upsert'):
+                supabase.table('predictions').upsert(batch, on_conflict=PREDICTION_KEY).execute()
+        except Exception as e:
+            print(f"Error upserting predictions batch: {e}")
+    return len(records)
+
+
+def train(persist_supabase=False):
+    """
+    Fit, store and optionally persist forecasts for every area.
+
+    Returns:
+        dict: Training summary
+    """
+    start = time.perf_counter()
+    # The fits are NumPy-bound; on a native thread they don't stall a gevent worker
+    models = run_native(lambda: fit_uplift_models(load_timeseries()))
+    forecasts = run_native(forecast_area_festivals, models)
+    save_forecasts(forecasts)
+
+    persisted = persist_predictions(forecasts) if persist_supabase else 0
+    return {
+        'areas': int(models[['Area', 'Pincode']].drop_duplicates().shape[0]),
+        'forecasts': len(forecasts),
+        'applied': int((forecasts['Confidence'] >= MIN_FORECAST_CONFIDENCE).sum()),
+        'persisted': persisted,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train per-area festival uplift forecasts')
+    parser.add_argument('--supabase', action='store_true', help='Also write to the predictions table')
+    args = parser.parse_args()
+
+    result = train(persist_supabase=args.supabase)
+    print(f"Trained {result['forecasts']} forecasts for {result['areas']} areas "
+          f"in {result['seconds']}s ({result['applied']} confident enough to apply)")
+    print(f"Saved to {FORECASTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
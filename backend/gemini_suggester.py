@@ -1,21 +1,102 @@
 """Gemini AI integration for eco-friendly suggestions and marketing messages."""
 
+import json
 import os
-import google.generativeai as genai
+import re
+import threading
+import time
+from collections import namedtuple
 from dotenv import load_dotenv
+from metrics import record_gemini_call
+from profiler import stage
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini
 api_key = os.getenv('GOOGLE_API_KEY')
-if api_key:
-    genai.configure(api_key=api_key)
+
+# The SDK is imported and configured on first use, so workers that never call
+# Gemini don't pay for importing it
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """Import and configure the google.generativeai SDK once."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
 
 
 def get_model():
     """Get the Gemini model instance."""
-    return genai.GenerativeModel('gemini-2.0-flash')
+    return get_genai().GenerativeModel('gemini-2.0-flash')
+
+
+def generate_content(prompt, call):
+    """Send a prompt to Gemini, recording latency, errors and token usage under ``call``."""
+    start = time.perf_counter()
+    try:
+        with stage('llm'):
+            response = get_model().generate_content(prompt)
+    except Exception:
+        record_gemini_call(call, time.perf_counter() - start, error=True)
+        raise
+    record_gemini_call(call, time.perf_counter() - start, getattr(response, 'usage_metadata', None))
+    return response
+
+
+async def generate_content_async(prompt, call):
+    """Async ``generate_content``: awaits Gemini without blocking the event loop."""
+    start = time.perf_counter()
+    try:
+        response = await get_model().generate_content_async(prompt)
+    except Exception:
+        record_gemini_call(call, time.perf_counter() - start, error=True)
+        raise
+    record_gemini_call(call, time.perf_counter() - start, getattr(response, 'usage_metadata', None))
+    return response
+
+
+# One Gemini call: its metric name, the prompt, a function turning the reply
+# text into the result, and the fields returned (beside 'error') when the API
+# key is missing or the call fails. Sync and async callers share it.
+GeminiCall = namedtuple('GeminiCall', 'name prompt parse unconfigured failed')
+
+
+def _run(call):
+    if not api_key:
+        return {'error': 'GOOGLE_API_KEY not configured', **call.unconfigured}
+    try:
+        response = generate_content(call.prompt, call.name)
+        return call.parse(response.text)
+    except Exception as e:
+        return {'error': str(e), **call.failed}
+
+
+async def _run_async(call):
+    if not api_key:
+        return {'error': 'GOOGLE_API_KEY not configured', **call.unconfigured}
+    try:
+        response = await generate_content_async(call.prompt, call.name)
+        return call.parse(response.text)
+    except Exception as e:
+        return {'error': str(e), **call.failed}
+
+
+def _json_reply(key):
+    """Parser putting the first JSON object in the reply under ``key``, alongside the raw reply."""
+    def parse(response_text):
+        json_match = re.search(r'\{[\s\S]*\}', response_text)
+        if json_match:
+            return {key: json.loads(json_match.group()), 'raw_response': response_text}
+        return {key: None, 'raw_response': response_text}
+    return parse
 
 
 def generate_eco_suggestions(high_waste_products, shop_name, festival):
@@ -30,12 +111,15 @@ def generate_eco_suggestions(high_waste_products, shop_name, festival):
     Returns:
         dict: AI-generated suggestions and alternatives
     """
-    if not api_key:
-        return {
-            'error': 'GOOGLE_API_KEY not configured',
-            'suggestions': []
-        }
-    
+    return _run(_eco_suggestions_call(high_waste_products, shop_name, festival))
+
+
+async def generate_eco_suggestions_async(high_waste_products, shop_name, festival):
+    """Async ``generate_eco_suggestions``."""
+    return await _run_async(_eco_suggestions_call(high_waste_products, shop_name, festival))
+
+
+def _eco_suggestions_call(high_waste_products, shop_name, festival):
     # Build product list for prompt
     product_list = "\n".join([
         f"- {p.get('Item_Name', p.get('item_name', 'Unknown'))}: "
@@ -67,27 +151,8 @@ Provide eco-friendly alternatives and suggestions in JSON format:
 
 Be specific to Indian festivals and practical for shopkeepers. Keep responses concise."""
 
-    try:
-        model = get_model()
-        response = model.generate_content(prompt)
-        
-        # Parse JSON from response
-        response_text = response.text
-        
-        # Try to extract JSON from the response
-        import json
-        import re
-        
-        # Find JSON in response
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            suggestions = json.loads(json_match.group())
-            return {'suggestions': suggestions, 'raw_response': response_text}
-        else:
-            return {'suggestions': None, 'raw_response': response_text}
-            
-    except Exception as e:
-        return {'error': str(e), 'suggestions': None}
+    return GeminiCall('eco_suggestions', prompt, _json_reply('suggestions'),
+                      unconfigured={'suggestions': []}, failed={'suggestions': None})
 
 
 def generate_marketing_message(shop_name, festival, eco_products=None):
@@ -102,12 +167,15 @@ def generate_marketing_message(shop_name, festival, eco_products=None):
     Returns:
         dict: Marketing messages for different channels
     """
-    if not api_key:
-        return {
-            'error': 'GOOGLE_API_KEY not configured',
-            'messages': None
-        }
-    
+    return _run(_marketing_message_call(shop_name, festival, eco_products))
+
+
+async def generate_marketing_message_async(shop_name, festival, eco_products=None):
+    """Async ``generate_marketing_message``."""
+    return await _run_async(_marketing_message_call(shop_name, festival, eco_products))
+
+
+def _marketing_message_call(shop_name, festival, eco_products):
     products_text = ""
     if eco_products:
         products_text = f"\nEco-friendly products available: {', '.join(eco_products[:5])}"
@@ -127,24 +195,8 @@ Generate messages in JSON format:
 
 Make it festive, appealing, and highlight eco-friendly benefits. Use Indian context."""
 
-    try:
-        model = get_model()
-        response = model.generate_content(prompt)
-        
-        response_text = response.text
-        
-        import json
-        import re
-        
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            messages = json.loads(json_match.group())
-            return {'messages': messages, 'raw_response': response_text}
-        else:
-            return {'messages': None, 'raw_response': response_text}
-            
-    except Exception as e:
-        return {'error': str(e), 'messages': None}
+    return GeminiCall('marketing_message', prompt, _json_reply('messages'),
+                      unconfigured={'messages': None}, failed={'messages': None})
 
 
 def generate_municipality_insights(hotspots, festival):
@@ -158,12 +210,15 @@ def generate_municipality_insights(hotspots, festival):
     Returns:
         dict: AI-generated insights and recommendations
     """
-    if not api_key:
-        return {
-            'error': 'GOOGLE_API_KEY not configured',
-            'insights': None
-        }
-    
+    return _run(_municipality_insights_call(hotspots, festival))
+
+
+async def generate_municipality_insights_async(hotspots, festival):
+    """Async ``generate_municipality_insights``."""
+    return await _run_async(_municipality_insights_call(hotspots, festival))
+
+
+def _municipality_insights_call(hotspots, festival):
     # Build hotspot summary
     top_hotspots = hotspots[:5] if len(hotspots) > 5 else hotspots
     hotspot_text = "\n".join([
@@ -188,43 +243,31 @@ Provide actionable insights in JSON format:
 
 Be practical and specific to Indian municipal operations."""
 
-    try:
-        model = get_model()
-        response = model.generate_content(prompt)
-        
-        response_text = response.text
-        
-        import json
-        import re
-        
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            insights = json.loads(json_match.group())
-            return {'insights': insights, 'raw_response': response_text}
-        else:
-            return {'insights': None, 'raw_response': response_text}
-            
-    except Exception as e:
-        return {'error': str(e), 'insights': None}
+    return GeminiCall('municipality_insights', prompt, _json_reply('insights'),
+                      unconfigured={'insights': None}, failed={'insights': None})
 
 
-def ai_chat(message, context=None):
+def ai_chat(message, context=None, facts=None):
     """
     AI chat assistant for waste management and eco-friendly advice.
     
     Args:
         message: User's question or message
         context: Optional context about user role, festival, etc.
+        facts: Optional dataset facts to ground the answer (see chat_retrieval)
     
     Returns:
         dict: AI response
     """
-    if not api_key:
-        return {
-            'error': 'GOOGLE_API_KEY not configured',
-            'response': 'I apologize, but AI features are currently unavailable.'
-        }
-    
+    return _run(_chat_call(message, context, facts))
+
+
+async def ai_chat_async(message, context=None, facts=None):
+    """Async ``ai_chat``."""
+    return await _run_async(_chat_call(message, context, facts))
+
+
+def _chat_call(message, context, facts=None):
     context_text = ""
     if context:
         if context.get('festival'):
@@ -234,6 +277,11 @@ def ai_chat(message, context=None):
         if context.get('area'):
             context_text += f"\nArea of interest: {context['area']}"
     
+    facts_text = ""
+    if facts:
+        facts_text = "\nEcoFest data relevant to the question (quote these figures; say so if they don't answer it):\n"
+        facts_text += "\n".join(f"- {fact}" for fact in facts)
+    
     prompt = f"""You are EcoBot, an AI assistant for EcoFest - a festival waste prediction and management platform for Indian cities.
 
 Your expertise includes:
@@ -243,6 +291,7 @@ Your expertise includes:
 - Municipal waste management planning
 - Sustainable celebration practices
 {context_text}
+{facts_text}
 
 User message: {message}
 
@@ -250,12 +299,11 @@ Respond helpfully and concisely. If discussing products, mention Indian alternat
 Keep responses under 150 words unless the question requires detailed explanation.
 Be friendly and use occasional emojis. Focus on actionable advice."""
 
-    try:
-        model = get_model()
-        response = model.generate_content(prompt)
-        return {'response': response.text, 'success': True}
-    except Exception as e:
-        return {'error': str(e), 'response': 'Sorry, I encountered an error. Please try again.'}
+    return GeminiCall(
+        'chat', prompt, lambda text: {'response': text, 'success': True},
+        unconfigured={'response': 'I apologize, but AI features are currently unavailable.'},
+        failed={'response': 'Sorry, I encountered an error. Please try again.'}
+    )
 
 
 def generate_prediction_summary(festival, stats):
@@ -269,12 +317,15 @@ def generate_prediction_summary(festival, stats):
     Returns:
         dict: AI-generated summary in natural language
     """
-    if not api_key:
-        return {
-            'error': 'GOOGLE_API_KEY not configured',
-            'summary': None
-        }
-    
+    return _run(_prediction_summary_call(festival, stats))
+
+
+async def generate_prediction_summary_async(festival, stats):
+    """Async ``generate_prediction_summary``."""
+    return await _run_async(_prediction_summary_call(festival, stats))
+
+
+def _prediction_summary_call(festival, stats):
     prompt = f"""Generate a brief, engaging summary of these waste prediction statistics for {festival}:
 
 Statistics:
@@ -291,10 +342,6 @@ Write a 2-3 sentence summary that:
 
 Be concise and use a professional but accessible tone. Include one relevant emoji."""
 
-    try:
-        model = get_model()
-        response = model.generate_content(prompt)
-        return {'summary': response.text.strip(), 'success': True}
-    except Exception as e:
-        return {'error': str(e), 'summary': None}
+    return GeminiCall('prediction_summary', prompt, lambda text: {'summary': text.strip(), 'success': True},
+                      unconfigured={'summary': None}, failed={'summary': None})
 
@@ -0,0 +1,293 @@
+"""Spatial index and GeoJSON layers for festival hotspots."""
+
+import zlib
+import numpy as np
+from data_loader import DATASETS
+from hotspot_analyzer import get_hotspot_frame, festival_exists
+from serialization import dumps_bytes
+
+# Area centroids (lat, lon): schema.sql coordinates where listed, otherwise the
+# HotspotMap positions or approximate locality centres
+AREA_COORDINATES = {
+    'BTM Layout': (12.9166, 77.6101),
+    'Banashankari': (12.9255, 77.5468),
+    'Bannerghatta': (12.8887, 77.5974),
+    'Basavanagudi': (12.9425, 77.5749),
+    'Bellandur': (12.9260, 77.6762),
+    'Electronic City': (12.8399, 77.6770),
+    'Frazer Town': (12.9966, 77.6131),
+    'HSR Layout': (12.9116, 77.6389),
+    'Hebbal': (13.0358, 77.5970),
+    'Indiranagar': (12.9784, 77.6408),
+    'JP Nagar': (12.9063, 77.5857),
+    'Jayanagar': (12.9308, 77.5838),
+    'KR Puram': (13.0068, 77.6968),
+    'Kengeri': (12.8961, 77.4723),
+    'Koramangala': (12.9352, 77.6245),
+    'MG Road': (12.9753, 77.6063),
+    'Mahadevapura': (12.9814, 77.7170),
+    'Malleshwaram': (13.0035, 77.5647),
+    'Marathahalli': (12.9591, 77.6974),
+    'RR Nagar': (12.9261, 77.5093),
+    'Rajajinagar': (12.9876, 77.5536),
+    'Richmond Town': (12.9650, 77.6010),
+    'Sarjapur': (12.9107, 77.6830),
+    'Uttarahalli': (12.9053, 77.5440),
+    'Vijayanagar': (12.9693, 77.5343),
+    'Whitefield': (12.9698, 77.7499),
+    'Yelahanka': (13.1007, 77.5963),
+}
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+# Grid cell size in degrees (~1.1 km), a few wards per cell at city scale
+DEFAULT_CELL_DEG = 0.01
+
+# Features in the full per-festival GeoJSON; larger cities fetch by viewport
+MAX_GEOJSON_FEATURES = 2000
+MAX_VIEWPORT_FEATURES = 1000
+
+# Hotspot columns carried as GeoJSON feature properties
+FEATURE_PROPERTIES = [
+    'area', 'pincode', 'priority', 'extra_waste_kg',
+    'waste_increase_percent', 'extra_trucks', 'extra_workers'
+]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in km; arguments broadcast like NumPy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def area_coordinates(area_df):
+    """
+    Get (lat, lon) arrays for rows of an area DataFrame.
+
+    Uses ``Latitude``/``Longitude`` columns when the dataset has them (ward-level
+    data), otherwise the known area centroids; unknown areas get NaN.
+    """
+    if 'Latitude' in area_df and 'Longitude' in area_df:
+        return area_df['Latitude'].to_numpy(dtype=float), area_df['Longitude'].to_numpy(dtype=float)
+
+    missing = (np.nan, np.nan)
+    coords = np.array([AREA_COORDINATES.get(a, missing) for a in area_df['Area'].tolist()], dtype=float)
+    coords = coords.reshape(-1, 2)
+    return coords[:, 0], coords[:, 1]
+
+
+class GridIndex:
+    """
+    Uniform grid index over points for bounding-box, radius and k-nearest queries.
+
+    Points are sorted by cell key (row * n_cols + col), so the cells of one grid
+    row inside a box form a contiguous slice found with two binary searches.
+    """
+
+    def __init__(self, lat, lon, cell_deg=DEFAULT_CELL_DEG):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.cell_deg = cell_deg
+
+        if len(self.lat):
+            self.lat0, self.lon0 = self.lat.min(), self.lon.min()
+            self.lat1, self.lon1 = self.lat.max(), self.lon.max()
+        else:
+            self.lat0 = self.lon0 = self.lat1 = self.lon1 = 0.0
+
+        self.n_rows = int((self.lat1 - self.lat0) // cell_deg) + 1
+        self.n_cols = int((self.lon1 - self.lon0) // cell_deg) + 1
+        keys = self._rows(self.lat) * self.n_cols + self._cols(self.lon)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _rows(self, lat):
+        return np.clip((np.asarray(lat) - self.lat0) // self.cell_deg, 0, self.n_rows - 1).astype(np.int64)
+
+    def _cols(self, lon):
+        return np.clip((np.asarray(lon) - self.lon0) // self.cell_deg, 0, self.n_cols - 1).astype(np.int64)
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Return sorted indices of points inside the box (edges inclusive); empty if it is inverted or NaN."""
+        # Written as negations so NaN bounds, which fail every comparison, give an empty box
+        if (not len(self) or not (min_lat <= max_lat and min_lon <= max_lon)
+                or not (max_lat >= self.lat0 and min_lat <= self.lat1
+                        and max_lon >= self.lon0 and min_lon <= self.lon1)):
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(self._rows(min_lat), self._rows(max_lat) + 1)
+        starts = np.searchsorted(self.keys, rows * self.n_cols + self._cols(min_lon), side='left')
+        stops = np.searchsorted(self.keys, rows * self.n_cols + self._cols(max_lon), side='right')
+        ranges = [self.order[s:e] for s, e in zip(starts, stops) if e > s]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate(ranges)
+
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(candidates[inside])
+
+    def within(self, lat, lon, radius_km):
+        """
+        Find points within ``radius_km`` of (lat, lon).
+
+        Returns:
+            tuple: (indices, distances in km), both sorted by index
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        candidates = self.bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        keep = distances <= radius_km
+        return candidates[keep], distances[keep]
+
+    def nearest(self, lat, lon, k=5, max_km=None):
+        """
+        Find the k points nearest to (lat, lon), optionally within ``max_km``.
+
+        The search radius doubles from one cell until it holds k points, so only
+        nearby cells are scanned.
+
+        Returns:
+            tuple: (indices, distances in km), nearest first
+        """
+        k = min(int(k), len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        limit = np.inf if max_km is None else float(max_km)
+        radius = min(self.cell_deg * KM_PER_DEGREE, limit)
+        while True:
+            indices, distances = self.within(lat, lon, radius)
+            # Half the Earth's circumference reaches every point
+            if len(indices) >= k or radius >= limit or radius > np.pi * EARTH_RADIUS_KM:
+                break
+            radius = min(radius * 2, limit)
+
+        if len(indices) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            indices, distances = indices[top], distances[top]
+        order = np.argsort(distances, kind='stable')
+        return indices[order], distances[order]
+
+
+class HotspotLayer:
+    """A festival's hotspots with coordinates, a spatial index and GeoJSON builders."""
+
+    def __init__(self, festival, frame):
+        self.festival = festival
+        self.frame = frame.reset_index(drop=True)
+        self.index = GridIndex(self.frame['latitude'].to_numpy(), self.frame['longitude'].to_numpy())
+
+    def feature_collection(self, rows=None, limit=None):
+        """
+        Build a GeoJSON FeatureCollection for the given frame rows (all if None).
+
+        Rows are kept in hotspot rank order; with ``limit`` only the top rows are
+        included and ``truncated`` tells the client to query by viewport instead.
+        """
+        frame = self.frame if rows is None else self.frame.iloc[rows]
+        total = len(frame)
+        if limit is not None:
+            frame = frame.iloc[:limit]
+
+        lons = frame['longitude'].round(5).tolist()
+        lats = frame['latitude'].round(5).tolist()
+        columns = [frame[c].tolist() for c in FEATURE_PROPERTIES]
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                'properties': dict(zip(FEATURE_PROPERTIES, values)),
+            }
+            for lon, lat, *values in zip(lons, lats, *columns)
+        ]
+        return {
+            'type': 'FeatureCollection',
+            'festival': self.festival,
+            'total': total,
+            'truncated': len(features) < total,
+            'features': features,
+        }
+
+    def viewport(self, min_lon, min_lat, max_lon, max_lat, limit=MAX_VIEWPORT_FEATURES):
+        """GeoJSON for hotspots inside a bounding box, highest waste first."""
+        rows = self.index.bbox(min_lat, min_lon, max_lat, max_lon)
+        return self.feature_collection(rows, limit)
+
+    def nearest(self, lat, lon, k=5, max_km=None):
+        """The k hotspots nearest to a point, with distances in km."""
+        rows, distances = self.index.nearest(lat, lon, k, max_km)
+        frame = self.frame.iloc[rows]
+        return [
+            {
+                'area': area,
+                'pincode': pincode,
+                'priority': priority,
+                'extra_waste_kg': extra_kg,
+                'distance_km': round(distance, 3),
+                'coordinates': [lat_, lon_],
+            }
+            for area, pincode, priority, extra_kg, distance, lat_, lon_ in zip(
+                frame['area'].tolist(), frame['pincode'].tolist(), frame['priority'].tolist(),
+                frame['extra_waste_kg'].tolist(), distances.tolist(),
+                frame['latitude'].tolist(), frame['longitude'].tolist()
+            )
+        ]
+
+
+def build_hotspot_layer(festival, area_df=None):
+    """
+    Build the spatial layer for a festival, or None if it has no data.
+
+    Areas without known coordinates are left out of the layer.
+    """
+    if area_df is None:
+        area_df = DATASETS.areas
+
+    frame = get_hotspot_frame(festival, area_df)
+    if frame.empty:
+        return None
+
+    # get_hotspot_frame ranks rows, so look coordinates up in the same order
+    festival_rows = area_df[area_df['Festival'] == festival].sort_values(
+        'Predicted_Festival_Extra_Waste_kg', ascending=False
+    )
+    lat, lon = area_coordinates(festival_rows)
+    frame['latitude'] = lat
+    frame['longitude'] = lon
+    frame = frame[~(np.isnan(lat) | np.isnan(lon))]
+    return HotspotLayer(festival, frame)
+
+
+def get_hotspot_layer(festival):
+    """Spatial layer for a festival over the shared dataset, cached per dataset version."""
+    if not festival_exists(festival):
+        return None
+    return DATASETS.cached(('hotspot_layer', festival), lambda: build_hotspot_layer(festival))
+
+
+def get_hotspot_geojson(festival):
+    """
+    Size-bounded GeoJSON for a festival, encoded and gzip-compressed once per dataset version.
+
+    Returns:
+        tuple: (json bytes, gzip bytes), or None if the festival has no data
+    """
+    def build():
+        layer = get_hotspot_layer(festival)
+        if layer is None:
+            return None
+        body = dumps_bytes(layer.feature_collection(limit=MAX_GEOJSON_FEATURES))
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return body, compressor.compress(body) + compressor.flush()
+
+    if get_hotspot_layer(festival) is None:
+        return None
+    return DATASETS.cached(('hotspot_geojson', festival), build)
@@ -0,0 +1,79 @@
+"""
+Gunicorn settings, loaded automatically from the working directory.
+
+With PRELOAD_APP (on by default) the master imports the app, parses the CSVs
+and builds the shared indexes once, then forks workers that share those pages
+copy-on-write instead of each loading its own copy. Garbage collection is off
+while loading and everything loaded is frozen before forking, so collections
+in the workers never write to the shared objects' headers and un-share them.
+
+The default gevent workers keep thousands of connections (SSE streams) open
+per worker, but only while nothing blocks the hub: gRPC, which the Gemini SDK
+uses, is switched to gevent in each worker, and DuckDB queries, simulations
+and forecast fitting run on gevent's native threadpool (offload.run_native).
+WORKER_CLASS=gthread serves with OS threads instead.
+
+WORKER_CLASS=uvicorn.workers.UvicornWorker serves the async mode (asgi:app)
+with the same preloading.
+
+Also points prometheus_client at a shared directory so every worker's metrics
+are aggregated by /metrics, clears samples left by a previous run, and drops
+the live gauges of workers that exit.
+"""
+
+import gc
+import glob
+import os
+import tempfile
+
+worker_class = os.getenv('WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '2000'))
+preload_app = os.getenv('PRELOAD_APP', '1') == '1'
+
+if preload_app:
+    if worker_class == 'gevent':
+        # Patch before the app creates its locks and conditions, so workers inherit cooperative ones
+        from gevent import monkey
+        monkey.patch_all()
+    gc.disable()
+
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'ecofest-metrics')
+)
+os.makedirs(metrics_dir, exist_ok=True)
+for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+    os.remove(path)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from app import warm_indexes
+    warm_indexes()
+    gc.freeze()
+    gc.enable()
+
+
+def post_worker_init(worker):
+    if worker_class != 'gevent':
+        return
+    # gRPC's C core blocks the hub while waiting on Gemini unless told to use gevent
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+    except ImportError:
+        return
+    grpc_gevent.init_gevent()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Also covers workers respawned later, after the master allocated more
+        gc.freeze()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
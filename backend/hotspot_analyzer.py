@@ -1,7 +1,13 @@
 """Hotspot analyzer module for municipality waste predictions."""
 
+import numpy as np
 import pandas as pd
-from data_loader import load_area_festivals, load_sales_data
+from data_loader import DATASETS
+
+# Waste one extra truck and one extra worker handle over the festival period;
+# route_planner loads trucks to the same capacity
+TRUCK_CAPACITY_KG = 20000
+WORKER_CAPACITY_KG = 5000
 
 
 def get_priority_level(extra_waste_kg):
@@ -18,9 +24,8 @@ def get_priority_level(extra_waste_kg):
 
 def calculate_resources(extra_waste_kg):
     """Calculate recommended extra resources based on waste volume."""
-    # Assumptions: 1 truck handles ~5000kg, 1 worker handles ~500kg
-    extra_trucks = max(1, int(extra_waste_kg / 20000))
-    extra_workers = max(2, int(extra_waste_kg / 5000))
+    extra_trucks = max(1, int(extra_waste_kg / TRUCK_CAPACITY_KG))
+    extra_workers = max(2, int(extra_waste_kg / WORKER_CAPACITY_KG))
     days_needed = 3 if extra_waste_kg > 50000 else 2
     
     return {
@@ -30,21 +35,37 @@ def calculate_resources(extra_waste_kg):
     }
 
 
-def identify_hotspots(festival, area_df=None):
+def get_priority_levels(extra_waste_kg):
+    """Vectorized get_priority_level over an array of extra waste amounts."""
+    extra_waste_kg = np.asarray(extra_waste_kg)
+    return np.select(
+        [extra_waste_kg > 80000, extra_waste_kg > 50000, extra_waste_kg > 30000],
+        ['CRITICAL', 'HIGH', 'MEDIUM'],
+        default='LOW'
+    )
+
+
+def calculate_resources_array(extra_waste_kg):
+    """Vectorized calculate_resources returning arrays of trucks, workers and days."""
+    extra_waste_kg = np.asarray(extra_waste_kg, dtype=float)
+    extra_trucks = np.maximum(1, (extra_waste_kg / TRUCK_CAPACITY_KG).astype(np.int64))
+    extra_workers = np.maximum(2, (extra_waste_kg / WORKER_CAPACITY_KG).astype(np.int64))
+    days_needed = np.where(extra_waste_kg > 50000, 3, 2)
+    return extra_trucks, extra_workers, days_needed
+
+
+def get_hotspot_frame(festival, area_df=None):
     """
-    Identify waste hotspots for a specific festival.
+    Get hotspot metrics for a festival as a DataFrame.
     
     Returns:
-        list: Areas ranked by predicted extra waste
+        DataFrame: One row per area, ranked by predicted extra waste
     """
     if area_df is None:
-        area_df = load_area_festivals()
+        area_df = DATASETS.areas
     
     # Filter for festival
-    festival_data = area_df[area_df['Festival'] == festival].copy()
-    
-    if festival_data.empty:
-        return []
+    festival_data = area_df[area_df['Festival'] == festival]
     
     # Sort by predicted extra waste
     festival_data = festival_data.sort_values(
@@ -52,31 +73,86 @@ def identify_hotspots(festival, area_df=None):
         ascending=False
     )
     
-    # Add priority levels and resource recommendations
-    hotspots = []
-    for _, row in festival_data.iterrows():
-        extra_waste = row['Predicted_Festival_Extra_Waste_kg']
-        resources = calculate_resources(extra_waste)
-        
-        hotspots.append({
-            'area': row['Area'],
-            'pincode': int(row['Pincode']),
-            'population': int(row['Population']),
-            'baseline_waste_kg': round(row['Baseline_Daily_Waste_kg'], 2),
-            'extra_waste_kg': round(extra_waste, 2),
-            'total_waste_kg': round(row['Predicted_Total_Daily_Waste_kg'], 2),
-            'waste_increase_percent': round((extra_waste / row['Baseline_Daily_Waste_kg']) * 100, 1),
-            'priority': get_priority_level(extra_waste),
-            'recommended_resources': resources
-        })
+    # Add priority levels and resource recommendations, one column at a time
+    extra_waste = festival_data['Predicted_Festival_Extra_Waste_kg'].to_numpy(dtype=float)
+    baseline = festival_data['Baseline_Daily_Waste_kg'].to_numpy(dtype=float)
+    trucks, workers, days = calculate_resources_array(extra_waste)
+    
+    return pd.DataFrame({
+        'area': festival_data['Area'].to_numpy(),
+        'pincode': festival_data['Pincode'].to_numpy(dtype=np.int64),
+        'population': festival_data['Population'].to_numpy(dtype=np.int64),
+        'baseline_waste_kg': festival_data['Baseline_Daily_Waste_kg'].round(2).to_numpy(),
+        'extra_waste_kg': festival_data['Predicted_Festival_Extra_Waste_kg'].round(2).to_numpy(),
+        'total_waste_kg': festival_data['Predicted_Total_Daily_Waste_kg'].round(2).to_numpy(),
+        'waste_increase_percent': (extra_waste / baseline * 100).round(1),
+        'priority': get_priority_levels(extra_waste),
+        'extra_trucks': trucks,
+        'extra_workers': workers,
+        'days_needed': days,
+        'forecast_confidence': (
+            festival_data['Forecast_Confidence'].to_numpy(dtype=float)
+            if 'Forecast_Confidence' in festival_data else np.full(len(festival_data), np.nan)
+        )
+    })
+
+
+def identify_hotspots(festival, area_df=None):
+    """
+    Identify waste hotspots for a specific festival.
+    
+    Returns:
+        list: Areas ranked by predicted extra waste
+    """
+    frame = get_hotspot_frame(festival, area_df)
+    
+    if frame.empty:
+        return []
+    
+    columns = zip(*(frame[c].tolist() for c in frame.columns))
+    
+    hotspots = [
+        {
+            'area': area,
+            'pincode': pincode,
+            'population': population,
+            'baseline_waste_kg': baseline_kg,
+            'extra_waste_kg': extra_kg,
+            'total_waste_kg': total_kg,
+            'waste_increase_percent': increase,
+            'priority': priority,
+            'recommended_resources': {
+                'extra_trucks': n_trucks,
+                'extra_workers': n_workers,
+                'days_needed': n_days
+            },
+            # None when the static CSV prediction is used rather than a trained forecast
+            'forecast_confidence': None if confidence != confidence else confidence
+        }
+        for (area, pincode, population, baseline_kg, extra_kg, total_kg,
+             increase, priority, n_trucks, n_workers, n_days, confidence) in columns
+    ]
     
     return hotspots
 
 
+def festival_exists(festival):
+    """Whether the area dataset has predictions for the festival."""
+    return festival in DATASETS.cached('festival_names', lambda: set(DATASETS.areas['Festival'].unique()))
+
+
+def get_festival_hotspots(festival):
+    """Hotspots over the shared dataset, identified once per festival and dataset version."""
+    # Only known festivals are cached so arbitrary names can't grow the cache
+    if not festival_exists(festival):
+        return []
+    return DATASETS.cached(('hotspots', festival), lambda: identify_hotspots(festival))
+
+
 def get_festival_summary(festival, area_df=None):
     """Get summary statistics for a festival."""
     if area_df is None:
-        area_df = load_area_festivals()
+        area_df = DATASETS.areas
     
     festival_data = area_df[area_df['Festival'] == festival]
     
@@ -110,7 +186,7 @@ def get_festival_summary(festival, area_df=None):
 def get_area_details(area, pincode=None, area_df=None):
     """Get detailed information for a specific area across festivals."""
     if area_df is None:
-        area_df = load_area_festivals()
+        area_df = DATASETS.areas
     
     area_data = area_df[area_df['Area'] == area]
     
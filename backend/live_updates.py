@@ -0,0 +1,213 @@
+"""Server-Sent Events channel pushing festival changes to dashboards."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from data_loader import DATASETS, WATCH_INTERVAL
+from hotspot_analyzer import get_hotspot_frame
+from rollup_cube import get_rollup_cube
+from serialization import dumps_bytes
+
+# Comment lines keep idle connections open through proxies
+HEARTBEAT_SECONDS = 15
+
+# Streams end after this long; EventSource reconnects with Last-Event-ID
+STREAM_SECONDS = 600
+RETRY_MS = 3000
+
+# Festival states kept per broadcaster for diffing against reconnecting clients
+RETAINED_STATES = 32
+
+HOTSPOT_FIELDS = (
+    'extra_waste_kg', 'total_waste_kg', 'waste_increase_percent',
+    'priority', 'extra_trucks', 'extra_workers'
+)
+
+
+def festival_state(festival):
+    """
+    Compact state of a festival that clients keep in sync.
+
+    Returns:
+        dict: City summary and hotspot fields keyed by (area, pincode)
+    """
+    frame = get_hotspot_frame(festival)
+    keys = zip(frame['area'].tolist(), frame['pincode'].tolist())
+    rows = zip(*(frame[f].tolist() for f in HOTSPOT_FIELDS))
+    return {
+        'summary': get_rollup_cube().festival_summary(festival),
+        'hotspots': {key: dict(zip(HOTSPOT_FIELDS, row)) for key, row in zip(keys, rows)},
+    }
+
+
+def _hotspot(key, fields):
+    return dict(area=key[0], pincode=key[1], **fields)
+
+
+def diff_states(old, new):
+    """
+    Changes from one festival state to another.
+
+    Returns:
+        dict: Changed summary fields and updated, added and removed hotspots
+    """
+    old_summary, new_summary = old['summary'] or {}, new['summary'] or {}
+    old_hotspots, new_hotspots = old['hotspots'], new['hotspots']
+    return {
+        'summary': {k: v for k, v in new_summary.items() if old_summary.get(k) != v},
+        'hotspots': {
+            'updated': [
+                _hotspot(key, fields) for key, fields in new_hotspots.items()
+                if key in old_hotspots and old_hotspots[key] != fields
+            ],
+            'added': [_hotspot(key, fields) for key, fields in new_hotspots.items() if key not in old_hotspots],
+            'removed': [{'area': key[0], 'pincode': key[1]} for key in old_hotspots if key not in new_hotspots],
+        },
+    }
+
+
+def format_event(event, version, payload):
+    """Encode one SSE message whose id is the dataset stamp."""
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (version, event.encode(), dumps_bytes(payload))
+
+
+class Broadcaster:
+    """
+    Fan-out of festival snapshots and deltas to any number of subscribers.
+
+    States and encoded events are built once per (festival, version) pair and
+    shared, so a version bump costs one diff however many clients listen.
+    Subscribers block on the registry's change condition between versions.
+
+    Versions are the registry's ``stamp``, which every worker derives from the
+    same files, so a client reconnecting to another worker with Last-Event-ID
+    gets a delta from the state it has rather than from an unrelated counter.
+    """
+
+    def __init__(self, registry=DATASETS, retained=RETAINED_STATES):
+        self.registry = registry
+        self.retained = retained
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+        self._events = OrderedDict()
+
+    def _remember(self, store, key, value):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.retained:
+            store.popitem(last=False)
+        return value
+
+    def state(self, festival):
+        """Return (version, state) for the festival at the current dataset stamp."""
+        # The snapshot holds the data at ``version`` while the state is built
+        with self._lock, self.registry.snapshot():
+            version = self.registry.stamp
+            state = self._states.get((festival, version))
+            if state is None:
+                state = self._remember(self._states, (festival, version), festival_state(festival))
+            return version, state
+
+    def snapshot(self, festival):
+        """Return (version, encoded snapshot event)."""
+        version, state = self.state(festival)
+        with self._lock:
+            event = self._events.get((festival, None, version))
+            if event is None:
+                payload = {
+                    'festival': festival,
+                    'version': version,
+                    'summary': state['summary'],
+                    'hotspots': [_hotspot(key, fields) for key, fields in state['hotspots'].items()],
+                }
+                event = format_event('snapshot', version, payload)
+                self._remember(self._events, (festival, None, version), event)
+            return version, event
+
+    def delta(self, festival, since):
+        """
+        Return (version, encoded event) bringing a client from ``since`` up to date.
+
+        The event is None if nothing changed for the festival, and a snapshot if
+        the ``since`` state is no longer retained.
+        """
+        version, state = self.state(festival)
+        if version == since:
+            return version, None
+
+        with self._lock:
+            key = (festival, since, version)
+            if key in self._events:
+                return version, self._events[key]
+            old = self._states.get((festival, since))
+            if old is not None:
+                changes = diff_states(old, state)
+                event = None
+                if changes['summary'] or any(changes['hotspots'].values()):
+                    payload = dict(changes, festival=festival, version=version, since=since)
+                    event = format_event('delta', version, payload)
+                return version, self._remember(self._events, key, event)
+        return self.snapshot(festival)
+
+    def stream(self, festival, last_version=None, heartbeat=HEARTBEAT_SECONDS, lifetime=STREAM_SECONDS):
+        """
+        Yield SSE messages for one subscriber.
+
+        Starts with a snapshot, or only the changes since ``last_version`` when a
+        client reconnects, then one delta per dataset version until ``lifetime``
+        seconds have passed.
+        """
+        deadline = time.monotonic() + lifetime
+        yield b'retry: %d\n\n' % RETRY_MS
+        if last_version is None:
+            version, event = self.snapshot(festival)
+        else:
+            version, event = self.delta(festival, last_version)
+        if event:
+            yield event
+
+        while time.monotonic() < deadline:
+            current = self.registry.wait_for_change(version, heartbeat)
+            if current == version:
+                yield b': keepalive\n\n'
+                continue
+            version, event = self.delta(festival, version)
+            if event:
+                yield event
+
+    async def stream_async(self, festival, last_version=None, heartbeat=HEARTBEAT_SECONDS,
+                           lifetime=STREAM_SECONDS):
+        """
+        Async ``stream`` for the event loop (asgi.py).
+
+        Checks the registry stamp every WATCH_INTERVAL rather than blocking a
+        thread on the change condition, so an open stream holds no thread.
+        Snapshots and deltas are built in a worker thread.
+        """
+        deadline = time.monotonic() + lifetime
+        yield b'retry: %d\n\n' % RETRY_MS
+        if last_version is None:
+            version, event = await asyncio.to_thread(self.snapshot, festival)
+        else:
+            version, event = await asyncio.to_thread(self.delta, festival, last_version)
+        if event:
+            yield event
+
+        idle = 0.0
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WATCH_INTERVAL)
+            self.registry.refresh()
+            if self.registry.stamp == version:
+                idle += WATCH_INTERVAL
+                if idle >= heartbeat:
+                    idle = 0.0
+                    yield b': keepalive\n\n'
+                continue
+            idle = 0.0
+            version, event = await asyncio.to_thread(self.delta, festival, version)
+            if event:
+                yield event
+
+
+BROADCASTER = Broadcaster()
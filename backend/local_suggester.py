@@ -0,0 +1,246 @@
+"""
+Rule-based eco suggestions and marketing copy, built from product data.
+
+Gives the same JSON shapes the Gemini prompts ask for, in well under a
+millisecond and with no API key. Swaps come from get_eco_alternatives, and
+their waste reduction is computed from the catalogue's waste scores. Tips and
+copy are filled in from fixed per-festival and per-category templates. The
+output is deterministic, so the same shop and festival always get the same
+text.
+"""
+
+import zlib
+from data_loader import DATASETS
+from waste_calculator import get_eco_alternatives
+
+# Catalogue products at or below this score may stand in for a high-waste product of their category
+ECO_SCORE = 0.5
+
+# Top high-waste products given an alternative, as in the Gemini prompt
+MAX_ALTERNATIVES = 5
+
+# Swaps for categories without a greener catalogue product: (alternative, estimated waste score, reason)
+CATEGORY_FALLBACKS = {
+    'Firecracker': ('Green-certified crackers or a community light show', 0.45,
+                    'Certified green crackers cut smoke and leave far less paper and chemical residue'),
+    'Toy': ('Wooden or cloth toys', 0.3, 'Durable, repairable and free of single-use plastic'),
+}
+
+CATEGORY_REASONS = {
+    'Decoration': 'Biodegradable or reusable, replacing plastic and thermocol that end up in landfill',
+    'Lighting': 'Uses a fraction of the power and lasts for years of festivals',
+    'Packaging': 'Recyclable paper instead of PVC film that cannot be recycled',
+    'Color': 'Plant-based colours wash off easily and do not pollute drains or lakes',
+    'Idol': 'Dissolves in water without releasing plaster or toxic paint into lakes',
+    'Kite': 'Paper and bamboo break down; nylon and plastic harm birds for years',
+    'Toy': 'Lasts longer and avoids single-use plastic',
+}
+
+CATEGORY_TIPS = {
+    'Decoration': 'Display eco decorations at the front and offer a small discount for bringing back reusable ones',
+    'Lighting': 'Show customers the power saving of LED lights with a running demo string',
+    'Packaging': 'Offer recycled paper wrap by default and charge a little extra for plastic',
+    'Color': 'Stock herbal colours in small packs so customers can try them at a low price',
+    'Idol': 'Take advance orders for clay idols so you can stock fewer plaster idols',
+    'Kite': 'Keep cotton thread beside the kites and explain why nylon manja is dangerous',
+    'Firecracker': 'Stock green-certified crackers and tell customers about community display timings',
+    'Toy': 'Put wooden and cloth toys at eye level near the counter',
+}
+
+FESTIVAL_TIPS = {
+    'Diwali': 'Bundle clay diyas with LED lights as a "Green Diwali" kit',
+    'Holi': 'Sell herbal gulal in combo packs with a reusable water bottle instead of balloons',
+    'Ganesh Chaturthi': 'Partner with local immersion tanks and promote clay idols as tank-safe',
+    'Christmas': 'Offer potted or rented trees and paper decorations as a set',
+    'Sankranti': 'Run a kite-thread exchange: old nylon manja in, cotton thread at a discount',
+}
+
+GENERAL_TIPS = [
+    'Place eco-friendly products next to the items they replace, with a price comparison tag',
+    'Give a cloth or paper bag with purchases above a set amount',
+    'Track which eco products sell out and reorder them before the festival peak',
+]
+
+# (greeting, emoji) per festival
+FESTIVAL_GREETINGS = {
+    'Diwali': ('Happy Diwali', '🪔'),
+    'Holi': ('Happy Holi', '🎨'),
+    'Ganesh Chaturthi': ('Ganpati Bappa Morya', '🙏'),
+    'Christmas': ('Merry Christmas', '🎄'),
+    'Sankranti': ('Happy Sankranti', '🪁'),
+}
+
+# Channel templates; one variant per channel is picked by a hash of the shop name
+SMS_TEMPLATES = [
+    '{emoji} {greeting}! {shop} has eco-friendly {products} in stock. Celebrate green, waste less! 🌿',
+    '{emoji} This {festival}, go green at {shop}: {products} and more. Visit today! 🌱',
+]
+WHATSAPP_TEMPLATES = [
+    '{emoji} *{greeting} from {shop}!*\n\nCelebrate without the waste 🌿\n{product_lines}\n\n'
+    'Visit us and make this {festival} a green one! ♻️',
+    '🌱 *Green {festival} at {shop}* {emoji}\n\nOur eco picks for you:\n{product_lines}\n\n'
+    'Less waste, same festive joy! 🙌',
+]
+POSTER_TEMPLATES = [
+    'Celebrate {festival}, Not Waste! 🌿',
+    'Go Green This {festival} {emoji}',
+]
+SOCIAL_TEMPLATES = [
+    '{emoji} {greeting}! Make it green with {products} from {shop}. 🌿 #Green{tag} #EcoFest',
+    'This {festival}, choose eco at {shop}: {products}. ♻️ #Green{tag} #EcoFest',
+]
+
+# Channel limits from the Gemini marketing prompt
+SMS_LIMIT = 160
+WHATSAPP_LIMIT = 300
+POSTER_LIMIT = 50
+SOCIAL_LIMIT = 200
+
+
+def product_scores():
+    """Map catalogue product names to (category, waste score)."""
+    def build():
+        products = DATASETS.products
+        return dict(zip(products['Item_Name'], zip(products['Category'], products['Waste_Score'].astype(float))))
+    return DATASETS.cached('product_scores', build)
+
+
+def greenest_in_category(category, scores):
+    """The lowest-scoring catalogue product of ``category`` at or below ECO_SCORE, or None."""
+    candidates = [(score, name) for name, (cat, score) in scores.items() if cat == category and score <= ECO_SCORE]
+    return min(candidates)[1] if candidates else None
+
+
+def suggest_alternative(product, alternatives_map, scores):
+    """
+    Pick a greener alternative for one high-waste product.
+
+    Args:
+        product: A high_waste_products record (Item_Name, Category, Item_Waste_Score, ...)
+        alternatives_map: get_eco_alternatives() mapping
+        scores: product_scores() mapping
+
+    Returns:
+        tuple: (alternative dict, fractional waste reduction), or (None, 0.0) if none applies
+    """
+    name = product.get('Item_Name', '')
+    category = product.get('Category') or scores.get(name, (None, None))[0]
+    score = float(product.get('Item_Waste_Score') or scores.get(name, (None, 0.0))[1] or 0.0)
+
+    use = alternatives_map.get(name) or greenest_in_category(category, scores)
+    reason = CATEGORY_REASONS.get(category, 'Lower waste score and easier to dispose of responsibly')
+    if use in scores:
+        use_score = scores[use][1]
+    elif category in CATEGORY_FALLBACKS:
+        use, use_score, reason = CATEGORY_FALLBACKS[category]
+    else:
+        return None, 0.0
+
+    reduction = max(0.0, 1 - use_score / score) if score else 0.0
+    return {
+        'instead_of': name,
+        'use': use,
+        'reason': reason,
+        'waste_reduction': f'{round(reduction * 100)}%'
+    }, reduction
+
+
+def local_eco_suggestions(high_waste_products, shop_name, festival):
+    """
+    Build eco suggestions for a shop from the product catalogue.
+
+    Args:
+        high_waste_products: List of products with high waste scores, heaviest waste first
+        shop_name: Name of the shop
+        festival: Festival name
+
+    Returns:
+        dict: {'alternatives', 'general_tips', 'eco_score_improvement'}, as the Gemini prompt asks for
+    """
+    alternatives_map = get_eco_alternatives()
+    scores = product_scores()
+
+    alternatives = []
+    reductions = []
+    categories = []
+    waste_kg = saved_kg = 0.0
+    for product in high_waste_products[:MAX_ALTERNATIVES]:
+        alternative, reduction = suggest_alternative(product, alternatives_map, scores)
+        kg = float(product.get('Estimated_Waste_kg') or 0.0)
+        waste_kg += kg
+        if alternative is None:
+            continue
+        alternatives.append(alternative)
+        reductions.append(reduction)
+        saved_kg += kg * reduction
+        category = product.get('Category')
+        if category in CATEGORY_TIPS and category not in categories:
+            categories.append(category)
+
+    tips = [FESTIVAL_TIPS[festival]] if festival in FESTIVAL_TIPS else []
+    tips += [CATEGORY_TIPS[category] for category in categories]
+    tips += GENERAL_TIPS
+    tips = list(dict.fromkeys(tips))[:3]
+
+    if waste_kg and saved_kg:
+        improvement = (f'About {round(saved_kg / waste_kg * 100)}% less waste from these products '
+                       f'(~{saved_kg:,.0f} kg this {festival}) if all alternatives are adopted')
+    elif reductions:
+        improvement = f'About {round(sum(reductions) / len(reductions) * 100)}% lower waste score for these products'
+    else:
+        improvement = 'No catalogue alternatives for these products yet'
+
+    return {
+        'alternatives': alternatives,
+        'general_tips': tips,
+        'eco_score_improvement': improvement
+    }
+
+
+def _pick(templates, shop_name):
+    # crc32 is stable across processes, unlike hash()
+    return templates[zlib.crc32(shop_name.encode('utf-8')) % len(templates)]
+
+
+def _fit(template, limit, products, **fields):
+    """Fill ``template``, dropping products from the end until it fits in ``limit`` characters."""
+    for n in range(len(products), 0, -1):
+        shown = products[:n]
+        text = template.format(
+            products=', '.join(shown),
+            product_lines='\n'.join(f'✅ {p}' for p in shown),
+            **fields
+        )
+        if len(text) <= limit:
+            return text
+    text = template.format(products='eco products', product_lines='✅ Eco-friendly festival products', **fields)
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def local_marketing_message(shop_name, festival, eco_products=None):
+    """
+    Build marketing copy for a shop's eco campaign from templates.
+
+    Args:
+        shop_name: Name of the shop
+        festival: Festival name
+        eco_products: List of eco-friendly products to promote
+
+    Returns:
+        dict: {'sms', 'whatsapp', 'poster_tagline', 'social_media'}, as the Gemini prompt asks for
+    """
+    greeting, emoji = FESTIVAL_GREETINGS.get(festival, (f'Happy {festival}', '🌿'))
+    products = list(eco_products or [])[:5]
+    fields = {
+        'shop': shop_name,
+        'festival': festival,
+        'greeting': greeting,
+        'emoji': emoji,
+        'tag': ''.join(word.capitalize() for word in festival.split())
+    }
+    return {
+        'sms': _fit(_pick(SMS_TEMPLATES, shop_name), SMS_LIMIT, products, **fields),
+        'whatsapp': _fit(_pick(WHATSAPP_TEMPLATES, shop_name), WHATSAPP_LIMIT, products, **fields),
+        'poster_tagline': _fit(_pick(POSTER_TEMPLATES, shop_name), POSTER_LIMIT, products, **fields),
+        'social_media': _fit(_pick(SOCIAL_TEMPLATES, shop_name), SOCIAL_LIMIT, products, **fields)
+    }
@@ -0,0 +1,222 @@
+"""
+Prometheus metrics for requests, caches, datasets, AI admission, Gemini and Supabase.
+
+Under gunicorn every worker writes its samples to memory-mapped files in
+PROMETHEUS_MULTIPROC_DIR (set up by gunicorn.conf.py) and ``/metrics``
+aggregates all workers' files, so a scrape hitting any worker sees the
+whole server. Without that variable metrics are kept in-process.
+
+Label children are looked up once and memoised, so recording a request costs
+a few dictionary lookups and two mmap writes.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from flask import request
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+    )
+    from prometheus_client import multiprocess
+    USE_PROMETHEUS = True
+except ImportError:
+    USE_PROMETHEUS = False
+
+# Most API responses come from memoised structures and take well under 10ms
+LATENCY_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+GEMINI_BUCKETS = (.1, .25, .5, 1, 2, 4, 8, 16, 32)
+
+# Label for requests that matched no route, so 404 probes can't add series
+UNMATCHED = 'unmatched'
+
+# WSGI environ keys holding the request start time; per request, so batch
+# sub-requests sharing an app context don't overwrite each other
+START_KEY = 'metrics.start'
+ENDPOINT_KEY = 'metrics.endpoint'
+
+if USE_PROMETHEUS:
+    REQUEST_LATENCY = Histogram(
+        'ecofest_http_request_duration_seconds', 'Time to produce a response (first byte for streams)',
+        ['method', 'endpoint'], buckets=LATENCY_BUCKETS
+    )
+    REQUESTS = Counter('ecofest_http_requests', 'Responses sent', ['method', 'endpoint', 'status'])
+    IN_FLIGHT = Gauge(
+        'ecofest_http_requests_in_flight', 'Requests being handled, including open streams',
+        ['endpoint'], multiprocess_mode='livesum'
+    )
+    CACHE_LOOKUPS = Counter('ecofest_cache_lookups', 'Derived-structure cache lookups', ['cache', 'result'])
+    DATASET_LOAD = Histogram(
+        'ecofest_dataset_load_seconds', 'Time to read a dataset from disk', ['dataset'],
+        buckets=(.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+    )
+    ADMISSIONS = Counter(
+        'ecofest_ai_admissions', 'AI requests admitted, rate limited or turned away busy', ['lane', 'outcome']
+    )
+    ADMISSION_WAIT = Histogram(
+        'ecofest_ai_admission_wait_seconds', 'Time AI requests queued for a Gemini slot', ['lane'],
+        buckets=(.001, .01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+    )
+    GEMINI_LATENCY = Histogram(
+        'ecofest_gemini_request_duration_seconds', 'Gemini generate_content latency', ['call'],
+        buckets=GEMINI_BUCKETS
+    )
+    GEMINI_CALLS = Counter('ecofest_gemini_requests', 'Gemini generate_content calls', ['call', 'outcome'])
+    GEMINI_TOKENS = Counter('ecofest_gemini_tokens', 'Gemini tokens used', ['call', 'kind'])
+    SUPABASE_LATENCY = Histogram(
+        'ecofest_supabase_request_duration_seconds', 'Supabase round-trip time', ['table', 'operation'],
+        buckets=LATENCY_BUCKETS
+    )
+    SUPABASE_CALLS = Counter(
+        'ecofest_supabase_requests', 'Supabase round trips', ['table', 'operation', 'outcome']
+    )
+
+_children = {}
+
+
+def _child(metric, *labels):
+    """Return the labelled child of a metric, memoised to skip prometheus_client's label checks."""
+    key = (metric, labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def cache_name(key):
+    """Metric label of a DatasetRegistry.cached key: its first element for tuple keys."""
+    return key[0] if isinstance(key, tuple) else key
+
+
+def record_cache(key, hit):
+    """Count one cache lookup."""
+    if USE_PROMETHEUS:
+        _child(CACHE_LOOKUPS, cache_name(key), 'hit' if hit else 'miss').inc()
+
+
+def record_dataset_load(name, seconds):
+    """Record the time taken to read a dataset from disk."""
+    if USE_PROMETHEUS:
+        _child(DATASET_LOAD, name).observe(seconds)
+
+
+def record_admission(lane, outcome, waited=None):
+    """Count one admission decision and, for queued requests, the time spent waiting."""
+    if not USE_PROMETHEUS:
+        return
+    _child(ADMISSIONS, lane, outcome).inc()
+    if waited is not None:
+        _child(ADMISSION_WAIT, lane).observe(waited)
+
+
+def record_gemini_call(call, seconds, usage=None, error=False):
+    """
+    Record one Gemini call.
+
+    Args:
+        call: Name of the suggester function making the call
+        seconds: Call latency
+        usage: The response's usage_metadata, if any
+        error: Whether the call raised
+    """
+    if not USE_PROMETHEUS:
+        return
+    _child(GEMINI_LATENCY, call).observe(seconds)
+    _child(GEMINI_CALLS, call, 'error' if error else 'ok').inc()
+    if usage is not None:
+        for kind, field in (('prompt', 'prompt_token_count'), ('completion', 'candidates_token_count')):
+            tokens = getattr(usage, field, 0) or 0
+            if tokens:
+                _child(GEMINI_TOKENS, call, kind).inc(tokens)
+
+
+@contextmanager
+def track_supabase(table, operation):
+    """Time one Supabase round trip inside the block, counting it as an error if it raises."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        if USE_PROMETHEUS:
+            _child(SUPABASE_LATENCY, table, operation).observe(time.perf_counter() - start)
+            _child(SUPABASE_CALLS, table, operation, outcome).inc()
+
+
+def record_request(method, endpoint, status, seconds):
+    """Record the latency and status of one response."""
+    if not USE_PROMETHEUS:
+        return
+    key = (method, endpoint, status)
+    children = _children.get(key)
+    if children is None:
+        children = _children[key] = (
+            REQUEST_LATENCY.labels(method, endpoint), REQUESTS.labels(method, endpoint, str(status))
+        )
+    children[0].observe(seconds)
+    children[1].inc()
+
+
+@contextmanager
+def track_in_flight(endpoint):
+    """Count a request handled outside the Flask hooks (see asgi.py) as in flight inside the block."""
+    if not USE_PROMETHEUS:
+        yield
+        return
+    gauge = _child(IN_FLIGHT, endpoint)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def _request_started():
+    environ = request.environ
+    environ[START_KEY] = time.perf_counter()
+    environ[ENDPOINT_KEY] = endpoint = request.endpoint or UNMATCHED
+    _child(IN_FLIGHT, endpoint).inc()
+
+
+def _request_finished(response):
+    environ = request.environ
+    start = environ.get(START_KEY)
+    if start is not None:
+        record_request(
+            environ['REQUEST_METHOD'], environ[ENDPOINT_KEY], response.status_code, time.perf_counter() - start
+        )
+    return response
+
+
+def _request_closed(exc):
+    # Runs when the request context pops: after a streamed body has been sent
+    endpoint = request.environ.pop(ENDPOINT_KEY, None)
+    if endpoint is not None:
+        _child(IN_FLIGHT, endpoint).dec()
+
+
+def init_app(app):
+    """Record latency, status and in-flight count for every request to ``app``."""
+    if not USE_PROMETHEUS:
+        return
+    app.before_request(_request_started)
+    app.after_request(_request_finished)
+    app.teardown_request(_request_closed)
+
+
+def render_metrics():
+    """
+    Encode all metrics in the Prometheus text format.
+
+    Returns:
+        tuple: (body bytes, content type), or (None, None) without prometheus_client
+    """
+    if not USE_PROMETHEUS:
+        return None, None
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
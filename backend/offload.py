@@ -0,0 +1,83 @@
+"""
+Blocking native calls on real OS threads, under any gunicorn worker class.
+
+gunicorn's gevent workers monkey-patch threading, so threading.Timer and
+ThreadPoolExecutor threads are greenlets sharing one OS thread with the hub.
+A DuckDB query or a NumPy simulation never yields to the hub, so every other
+request on the worker (including its timers) waits for it to finish.
+run_native hands such calls to gevent's native threadpool when threading is
+patched, and to a plain thread pool otherwise; the caller waits on the
+result while other greenlets keep running.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+
+# OS threads for native calls in each worker; the calls release the GIL while in C
+NATIVE_THREADS = int(os.getenv('NATIVE_THREADS', '4'))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def gevent_patched():
+    """Whether this process runs under gevent with threading monkey-patched."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def _pool():
+    # Created on first use in each worker: threads don't survive gunicorn's fork
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=NATIVE_THREADS, thread_name_prefix='native')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def run_native(func, *args, timeout=None, on_timeout=None, **kwargs):
+    """
+    Call ``func(*args, **kwargs)`` on an OS thread and wait for its result.
+
+    Without gevent and without a timeout the call runs in the calling thread,
+    which is already an OS thread.
+
+    Args:
+        func: Blocking function to run
+        timeout: Seconds to wait before giving up, or None to wait for it
+        on_timeout: Called from the waiting thread when the timeout passes to
+            stop the call (e.g. interrupt a query), which is then waited for;
+            without it the call is left to finish on its own
+
+    Raises:
+        concurrent.futures.TimeoutError: If ``timeout`` passes first
+    """
+    if gevent_patched():
+        import gevent
+        from gevent import get_hub
+        result = get_hub().threadpool.spawn(func, *args, **kwargs)
+        try:
+            return result.get(timeout=timeout)
+        except gevent.Timeout:
+            if on_timeout is not None:
+                on_timeout()
+                result.wait()
+            raise TimeoutError()
+
+    if timeout is None:
+        return func(*args, **kwargs)
+    future = _pool().submit(func, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        if on_timeout is not None:
+            on_timeout()
+            wait([future])
+        raise
@@ -0,0 +1,284 @@
+"""
+On-demand request profiling and a rolling log of slow requests.
+
+An admin adds ``X-Profile: 1`` (or ``?profile=1``) to any request to run it
+under a deterministic stack profiler. The profile is written in the folded
+stack format read by flamegraph.pl, speedscope and inferno; its id comes back
+in ``X-Profile-Id``, and ``?profile=inline`` returns it as the response body
+instead. Without the flag, profiling costs one environ lookup per request.
+
+Every request also gets per-stage timings (filter, groupby, serialization,
+llm) from ``stage()`` blocks in the code it runs. Requests slower than
+SLOW_REQUEST_MS are kept, with those timings, in a per-worker rolling log.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from flask import request, current_app
+
+try:
+    from greenlet import getcurrent
+except ImportError:
+    getcurrent = threading.current_thread
+
+# Requests at least this slow go into the rolling slow-request log
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '250'))
+SLOW_LOG_SIZE = 100
+
+# Profiles are files so any gunicorn worker can serve one; the newest are kept
+PROFILE_DIR = os.getenv('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'ecofest-profiles')
+PROFILES_KEPT = 50
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+TIMINGS_KEY = 'profiler.timings'
+PROFILER_KEY = 'profiler.profiler'
+
+_timings = ContextVar('request_timings', default=None)
+_no_stage = nullcontext()
+
+
+class RequestTimings:
+    """
+    Wall time of one request split into named stages.
+
+    Stages nest; time is charged to the innermost open stage only, so the
+    stage totals never add up to more than the request.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = defaultdict(float)
+        self._open = []
+        self._mark = self.start
+
+    def _charge(self):
+        now = time.perf_counter()
+        if self._open:
+            self.stages[self._open[-1]] += now - self._mark
+        self._mark = now
+
+    def enter(self, name):
+        self._charge()
+        self._open.append(name)
+
+    def exit(self):
+        self._charge()
+        self._open.pop()
+
+    def summary(self):
+        """Return (total ms, {stage: ms}) with untimed work under 'other'."""
+        total = (time.perf_counter() - self.start) * 1000
+        stages = {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        stages['other'] = round(max(total - sum(stages.values()), 0.0), 3)
+        return round(total, 3), stages
+
+
+class _Stage:
+    __slots__ = ('timings', 'name')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.timings.enter(self.name)
+
+    def __exit__(self, *exc):
+        self.timings.exit()
+
+
+def stage(name):
+    """
+    Context manager charging the time inside the block to ``name`` for the current request.
+
+    Outside a request it does nothing.
+    """
+    timings = _timings.get()
+    return _no_stage if timings is None else _Stage(timings, name)
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _builtin_name(func):
+    module = getattr(func, '__module__', None) or type(getattr(func, '__self__', None)).__name__
+    return f"{module}.{getattr(func, '__qualname__', repr(func))}"
+
+
+class StackProfiler:
+    """
+    Deterministic profiler aggregating wall time per full call stack.
+
+    Installed with ``sys.setprofile`` on the request's thread; events from
+    other greenlets on that thread are ignored, so time the request spends
+    waiting is charged to the call that yielded.
+    """
+
+    def __init__(self, root):
+        self.root = root.replace(';', ':')
+        self.totals = defaultdict(float)
+        self._paths = [self.root]
+        self._owner = getcurrent()
+        self._mark = None
+
+    def _callback(self, frame, event, arg):
+        if getcurrent() is not self._owner:
+            return
+        now = time.perf_counter()
+        self.totals[self._paths[-1]] += now - self._mark
+        self._mark = now
+        if event == 'call':
+            self._paths.append(f"{self._paths[-1]};{_frame_name(frame.f_code)}".replace('\n', ' '))
+        elif event == 'c_call':
+            self._paths.append(f"{self._paths[-1]};{_builtin_name(arg).replace(';', ':')}")
+        elif len(self._paths) > 1:
+            # Returns from frames entered before start() have nothing to pop
+            self._paths.pop()
+
+    def start(self):
+        self._mark = time.perf_counter()
+        sys.setprofile(self._callback)
+
+    def stop(self):
+        sys.setprofile(None)
+        self.totals[self._paths[-1]] += time.perf_counter() - self._mark
+
+    def folded(self):
+        """Profile in folded stack format: one "frame;frame;... microseconds" line per stack."""
+        lines = [f"{path} {round(seconds * 1e6)}" for path, seconds in self.totals.items() if seconds >= 5e-7]
+        return '\n'.join(lines) + '\n'
+
+
+def save_profile(folded):
+    """Write a folded profile to PROFILE_DIR, dropping the oldest beyond PROFILES_KEPT. Returns its id."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    with open(os.path.join(PROFILE_DIR, f'{profile_id}.folded'), 'w') as f:
+        f.write(folded)
+
+    saved = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith('.folded'))
+    for name in saved[:-PROFILES_KEPT]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+    return profile_id
+
+
+def load_profile(profile_id):
+    """Return a stored folded profile, or None if the id is unknown or malformed."""
+    if not profile_id.replace('-', '').isalnum():
+        return None
+    path = os.path.join(PROFILE_DIR, f'{profile_id}.folded')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+class SlowRequestLog:
+    """Rolling log of this worker's most recent slow requests."""
+
+    def __init__(self, threshold_ms=SLOW_REQUEST_MS, size=SLOW_LOG_SIZE):
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=size)
+
+    def record(self, entry):
+        self._entries.append(entry)
+
+    def slowest(self, limit=None):
+        """Logged requests, slowest first."""
+        entries = sorted(self._entries, key=lambda e: e['duration_ms'], reverse=True)
+        return entries[:limit] if limit else entries
+
+
+SLOW_REQUESTS = SlowRequestLog()
+
+
+def _is_admin():
+    from auth import verify_token
+
+    parts = request.headers.get('Authorization', '').split(' ')
+    payload = verify_token(parts[1]) if len(parts) == 2 else None
+    return bool(payload) and str(payload.get('role', '')).lower() == 'admin'
+
+
+def _profile_mode():
+    """'store' or 'inline' if an admin asked for a profile, else None."""
+    flag = request.environ.get(PROFILE_HEADER) or (
+        request.args.get('profile') if 'profile=' in request.environ.get('QUERY_STRING', '') else None
+    )
+    if not flag or flag == '0' or not _is_admin():
+        return None
+    return 'inline' if flag == 'inline' else 'store'
+
+
+def _request_started():
+    environ = request.environ
+    timings = RequestTimings()
+    # Batch sub-requests get their own timings and restore the outer ones on close
+    environ[TIMINGS_KEY] = (timings, _timings.get())
+    _timings.set(timings)
+
+    if PROFILE_HEADER in environ or 'profile=' in environ.get('QUERY_STRING', ''):
+        # One profiler per thread: batch sub-requests run inside the outer one
+        mode = _profile_mode()
+        if mode and sys.getprofile() is None:
+            profiler = StackProfiler(request.endpoint or request.path)
+            environ[PROFILER_KEY] = (profiler, mode)
+            profiler.start()
+
+
+def _request_finished(response):
+    environ = request.environ
+    profiled = environ.pop(PROFILER_KEY, None)
+    if profiled is not None:
+        profiler, mode = profiled
+        profiler.stop()
+        folded = profiler.folded()
+        if mode == 'inline':
+            response = current_app.response_class(folded, mimetype='text/plain')
+        else:
+            response.headers[PROFILE_ID_HEADER] = save_profile(folded)
+
+    entry = environ.get(TIMINGS_KEY)
+    if entry is not None and (time.perf_counter() - entry[0].start) * 1000 >= SLOW_REQUESTS.threshold_ms:
+        duration_ms, stages = entry[0].summary()
+        SLOW_REQUESTS.record({
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': duration_ms,
+            'stages': stages,
+            'profiled': profiled is not None,
+            'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'worker': os.getpid(),
+        })
+    return response
+
+
+def _request_closed(exc):
+    entry = request.environ.pop(TIMINGS_KEY, None)
+    if entry is not None:
+        _timings.set(entry[1])
+    profiled = request.environ.pop(PROFILER_KEY, None)
+    if profiled is not None:
+        profiled[0].stop()
+
+
+def init_app(app):
+    """Time stages of every request to ``app`` and profile admin requests that ask for it."""
+    app.before_request(_request_started)
+    app.after_request(_request_finished)
+    app.teardown_request(_request_closed)
@@ -0,0 +1,428 @@
+"""
+Constrained analytical queries over the local datasets.
+
+A query is a JSON spec of filters, group-by dimensions, aggregates, ordering
+and a limit over one dataset. Only whitelisted columns, operators and
+aggregate functions are accepted, and identifiers are never taken from the
+request verbatim, so specs compile to safe parameterized SQL. Queries run on
+an embedded DuckDB connection over the in-memory dataset snapshots, with a
+pandas executor when DuckDB is not installed.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as QueryTimeout
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from data_loader import DATASETS
+from offload import run_native
+from serialization import records
+
+# DuckDB executes the compiled SQL over the DataFrames without copying them
+try:
+    import duckdb
+    USE_DUCKDB = True
+except ImportError:
+    USE_DUCKDB = False
+
+# Queryable datasets: column -> type; types decide allowed operators and roles.
+# 'code' columns are integer identifiers (pincodes, years) treated as dimensions.
+QUERY_SCHEMAS = {
+    'sales': {
+        'Shop_ID': 'category',
+        'Shop_Name': 'category',
+        'Area': 'category',
+        'Pincode': 'code',
+        'Festival': 'category',
+        'Item_Name': 'category',
+        'Category': 'category',
+        'Quantity_Sold': 'number',
+        'Item_Waste_Score': 'number',
+        'Estimated_Waste_kg': 'number',
+    },
+    'areas': {
+        'Area': 'category',
+        'Pincode': 'code',
+        'Festival': 'category',
+        'Festival_Year': 'code',
+        'Population': 'number',
+        'Baseline_Daily_Waste_kg': 'number',
+        'Predicted_Festival_Extra_Waste_kg': 'number',
+        'Predicted_Total_Daily_Waste_kg': 'number',
+    },
+    'timeseries': {
+        'Area': 'category',
+        'Pincode': 'code',
+        'Date': 'date',
+        'Actual_Waste_kg': 'number',
+    },
+}
+
+OPERATORS = {
+    'category': {'=', '!=', 'in', 'not_in'},
+    'code': {'=', '!=', 'in', 'not_in'},
+    'number': {'=', '!=', '<', '<=', '>', '>=', 'between', 'in', 'not_in'},
+    'date': {'=', '!=', '<', '<=', '>', '>=', 'between'},
+}
+SQL_OPERATORS = {'=': '=', '!=': '<>', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+# Aggregate function -> column types it applies to (None: no column needed)
+AGGREGATES = {
+    'count': None,
+    'sum': {'number'},
+    'avg': {'number'},
+    'min': {'number', 'date'},
+    'max': {'number', 'date'},
+    'count_distinct': {'category', 'code', 'number', 'date'},
+}
+SQL_AGGREGATES = {'sum': 'SUM({})', 'avg': 'AVG({})', 'min': 'MIN({})', 'max': 'MAX({})',
+                  'count_distinct': 'COUNT(DISTINCT {})'}
+
+MAX_FILTERS = 10
+MAX_GROUP_BY = 4
+MAX_AGGREGATES = 8
+MAX_IN_VALUES = 500
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 5000
+QUERY_TIMEOUT_SECONDS = 5.0
+RESULT_CACHE_SIZE = 256
+
+
+class QueryError(ValueError):
+    """Raised for specs that use unknown datasets, columns, operators or limits."""
+
+
+def _check_column(schema, column, role):
+    if column not in schema:
+        raise QueryError(f"Unknown {role} column: {column}")
+    return schema[column]
+
+
+def normalize_query(spec):
+    """
+    Validate a query spec against the whitelist and return its canonical form.
+
+    Raises:
+        QueryError: If anything in the spec is not allowed
+    """
+    if not isinstance(spec, dict):
+        raise QueryError("Query must be a JSON object")
+
+    dataset = spec.get('dataset')
+    if dataset not in QUERY_SCHEMAS:
+        raise QueryError(f"dataset must be one of: {', '.join(QUERY_SCHEMAS)}")
+    schema = QUERY_SCHEMAS[dataset]
+
+    filters = spec.get('filters') or []
+    group_by = spec.get('group_by') or []
+    aggregates = spec.get('aggregates') or []
+    order_by = spec.get('order_by') or []
+    if not all(isinstance(v, list) for v in (filters, group_by, aggregates, order_by)):
+        raise QueryError("filters, group_by, aggregates and order_by must be lists")
+    if len(filters) > MAX_FILTERS or len(group_by) > MAX_GROUP_BY or len(aggregates) > MAX_AGGREGATES:
+        raise QueryError(f"At most {MAX_FILTERS} filters, {MAX_GROUP_BY} group_by columns "
+                         f"and {MAX_AGGREGATES} aggregates are allowed")
+
+    clean_filters = []
+    for f in filters:
+        if not isinstance(f, dict):
+            raise QueryError("Each filter must be an object")
+        column, op, value = f.get('column'), f.get('op', '='), f.get('value')
+        kind = _check_column(schema, column, 'filter')
+        if op not in OPERATORS[kind]:
+            raise QueryError(f"Operator {op!r} is not allowed on {column}")
+        if op in ('in', 'not_in'):
+            if not isinstance(value, list) or not value or len(value) > MAX_IN_VALUES:
+                raise QueryError(f"{op} needs a list of 1-{MAX_IN_VALUES} values")
+        elif op == 'between':
+            if not isinstance(value, list) or len(value) != 2:
+                raise QueryError("between needs a [low, high] list")
+        elif isinstance(value, (list, dict)) or value is None:
+            raise QueryError(f"Filter on {column} needs a single value")
+        values = value if isinstance(value, list) else [value]
+        if kind == 'number' and not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            raise QueryError(f"{column} filters need numeric values")
+        if kind == 'code':
+            try:
+                values = [int(v) for v in values]
+            except (TypeError, ValueError):
+                raise QueryError(f"{column} filters need integer values")
+            value = values if isinstance(value, list) else values[0]
+        if kind in ('category', 'date') and not all(isinstance(v, str) for v in values):
+            raise QueryError(f"{column} filters need string values")
+        clean_filters.append({'column': column, 'op': op, 'value': value})
+
+    for column in group_by:
+        if _check_column(schema, column, 'group_by') == 'number':
+            raise QueryError(f"Cannot group by measure column {column}")
+    if len(set(group_by)) != len(group_by):
+        raise QueryError("group_by columns must be unique")
+
+    clean_aggregates = []
+    for a in aggregates:
+        if not isinstance(a, dict):
+            raise QueryError("Each aggregate must be an object")
+        fn, column = a.get('fn'), a.get('column')
+        if fn not in AGGREGATES:
+            raise QueryError(f"fn must be one of: {', '.join(AGGREGATES)}")
+        if AGGREGATES[fn] is None:
+            column = None
+        elif _check_column(schema, column, 'aggregate') not in AGGREGATES[fn]:
+            raise QueryError(f"{fn} is not allowed on {column}")
+        alias = a.get('as') or (fn if column is None else f"{fn}_{column}")
+        if not isinstance(alias, str) or not alias.replace('_', '').isalnum() or len(alias) > 64:
+            raise QueryError(f"Invalid alias: {alias!r}")
+        clean_aggregates.append({'fn': fn, 'column': column, 'as': alias})
+
+    output = list(group_by) + [a['as'] for a in clean_aggregates]
+    if not clean_aggregates and not group_by:
+        output = list(schema)
+    if len(set(output)) != len(output):
+        raise QueryError("Output column names must be unique")
+
+    clean_order = []
+    for o in order_by:
+        if isinstance(o, str):
+            o = {'column': o}
+        if not isinstance(o, dict) or o.get('column') not in output:
+            raise QueryError(f"order_by must reference output columns: {', '.join(output)}")
+        clean_order.append({'column': o['column'], 'desc': bool(o.get('desc', False))})
+
+    limit = spec.get('limit', DEFAULT_LIMIT)
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_LIMIT:
+        raise QueryError(f"limit must be an integer from 1 to {MAX_LIMIT}")
+
+    return {
+        'dataset': dataset,
+        'filters': clean_filters,
+        'group_by': list(group_by),
+        'aggregates': clean_aggregates,
+        'order_by': clean_order,
+        'limit': limit,
+        'output': output,
+    }
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+@lru_cache(maxsize=RESULT_CACHE_SIZE)
+def compile_sql(query_json):
+    """
+    Compile a normalized query (as canonical JSON) to SQL and parameters.
+
+    Cached, so repeated query shapes skip planning. One extra row is fetched
+    beyond the limit to report truncation.
+    """
+    query = json.loads(query_json)
+    params = []
+
+    where = []
+    for f in query['filters']:
+        column, op, value = _quote(f['column']), f['op'], f['value']
+        if op in ('in', 'not_in'):
+            marks = ', '.join('?' for _ in value)
+            where.append(f"{column} {'NOT IN' if op == 'not_in' else 'IN'} ({marks})")
+            params.extend(value)
+        elif op == 'between':
+            where.append(f"{column} BETWEEN ? AND ?")
+            params.extend(value)
+        else:
+            where.append(f"{column} {SQL_OPERATORS[op]} ?")
+            params.append(value)
+
+    if query['aggregates'] or query['group_by']:
+        select = [_quote(c) for c in query['group_by']]
+        for a in query['aggregates']:
+            expr = 'COUNT(*)' if a['column'] is None else SQL_AGGREGATES[a['fn']].format(_quote(a['column']))
+            select.append(f"{expr} AS {_quote(a['as'])}")
+    else:
+        select = [_quote(c) for c in query['output']]
+
+    sql = f"SELECT {', '.join(select)} FROM {_quote(query['dataset'])}"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    if query['group_by']:
+        sql += ' GROUP BY ' + ', '.join(_quote(c) for c in query['group_by'])
+    if query['order_by']:
+        sql += ' ORDER BY ' + ', '.join(
+            f"{_quote(o['column'])} {'DESC' if o['desc'] else 'ASC'}" for o in query['order_by']
+        )
+    sql += f" LIMIT {query['limit'] + 1}"
+    return sql, tuple(params)
+
+
+class DuckDBExecutor:
+    """Runs compiled SQL on an embedded DuckDB database over the dataset DataFrames."""
+
+    def __init__(self):
+        self.connection = duckdb.connect(':memory:')
+
+    def execute(self, query, timeout):
+        sql, params = compile_sql(json.dumps(query, sort_keys=True))
+        frame = DATASETS.get(query['dataset'])
+        # Each query gets its own cursor; registering a DataFrame is zero-copy
+        cursor = self.connection.cursor()
+        stopped = threading.Event()
+
+        def run():
+            cursor.register(query['dataset'], frame)
+            # An interrupt only reaches a running query, not the registration before it
+            if stopped.is_set():
+                raise QueryTimeout()
+            return cursor.execute(sql, list(params)).df()
+
+        def stop():
+            stopped.set()
+            cursor.interrupt()
+
+        try:
+            # Runs on an OS thread and is interrupted from this one, so the
+            # timeout holds under gevent, where a Timer would wait on the query
+            return run_native(run, timeout=timeout, on_timeout=stop)
+        except duckdb.InterruptException:
+            raise QueryTimeout()
+        finally:
+            cursor.close()
+
+
+def _filter_mask(df, f):
+    column, op, value = df[f['column']], f['op'], f['value']
+    if op == 'in':
+        return column.isin(value)
+    if op == 'not_in':
+        return ~column.isin(value)
+    if op == 'between':
+        return column.between(value[0], value[1])
+    return {
+        '=': column.__eq__, '!=': column.__ne__, '<': column.__lt__,
+        '<=': column.__le__, '>': column.__gt__, '>=': column.__ge__,
+    }[op](value)
+
+
+PANDAS_AGGREGATES = {'sum': 'sum', 'avg': 'mean', 'min': 'min', 'max': 'max', 'count_distinct': 'nunique'}
+
+
+def execute_pandas(query, df=None):
+    """Run a normalized query with pandas; the fallback when DuckDB isn't installed."""
+    if df is None:
+        df = DATASETS.get(query['dataset'])
+
+    if query['filters']:
+        mask = np.ones(len(df), dtype=bool)
+        for f in query['filters']:
+            mask &= _filter_mask(df, f).to_numpy()
+        df = df[mask]
+
+    aggregates = query['aggregates']
+    if query['group_by']:
+        grouped = df.groupby(query['group_by'], sort=False, dropna=False)
+        if aggregates:
+            result = pd.DataFrame({
+                a['as']: grouped.size() if a['column'] is None
+                else grouped[a['column']].agg(PANDAS_AGGREGATES[a['fn']])
+                for a in aggregates
+            }).reset_index()
+        else:
+            result = grouped.size().reset_index()[query['group_by']]
+    elif aggregates:
+        result = pd.DataFrame({
+            a['as']: [len(df) if a['column'] is None else df[a['column']].agg(PANDAS_AGGREGATES[a['fn']])]
+            for a in aggregates
+        })
+    else:
+        result = df[query['output']]
+
+    if query['order_by']:
+        result = result.sort_values(
+            [o['column'] for o in query['order_by']],
+            ascending=[not o['desc'] for o in query['order_by']]
+        )
+    return result.head(query['limit'] + 1)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = DuckDBExecutor()
+    return _executor
+
+
+def run_query(spec, timeout=QUERY_TIMEOUT_SECONDS):
+    """
+    Validate and execute a query spec, caching results per dataset version.
+
+    Returns:
+        dict: Output columns, rows, truncation flag, engine and timing
+
+    Raises:
+        QueryError: If the spec is not allowed
+        concurrent.futures.TimeoutError: If the query exceeds ``timeout``
+    """
+    query = normalize_query(spec)
+    key = (json.dumps(query, sort_keys=True), DATASETS.version)
+
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return dict(_results[key], cached=True)
+
+    start = time.perf_counter()
+    if USE_DUCKDB:
+        engine = 'duckdb'
+        frame = _get_executor().execute(query, timeout)
+    else:
+        # pandas can't be interrupted; the caller stops waiting after the timeout
+        engine = 'pandas'
+        # The dataset is fetched here: registry locks are greenlet locks under gevent
+        frame = run_native(execute_pandas, query, DATASETS.get(query['dataset']), timeout=timeout)
+
+    truncated = len(frame) > query['limit']
+    frame = frame.head(query['limit'])
+    result = {
+        'dataset': query['dataset'],
+        'columns': query['output'],
+        'rows': records(frame, columns=query['output']),
+        'row_count': len(frame),
+        'truncated': truncated,
+        'engine': engine,
+        'ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+    with _results_lock:
+        _results[key] = result
+        _results.move_to_end(key)
+        while len(_results) > RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+    return dict(result, cached=False)
+
+
+def query_schema():
+    """Whitelisted datasets, columns and operations, for clients building queries."""
+    return {
+        'datasets': {
+            name: {
+                'dimensions': [c for c, kind in schema.items() if kind != 'number'],
+                'measures': [c for c, kind in schema.items() if kind == 'number'],
+                'columns': schema,
+            }
+            for name, schema in QUERY_SCHEMAS.items()
+        },
+        'operators': {kind: sorted(ops) for kind, ops in OPERATORS.items()},
+        'aggregates': list(AGGREGATES),
+        'max_limit': MAX_LIMIT,
+        'timeout_seconds': QUERY_TIMEOUT_SECONDS,
+        'engine': 'duckdb' if USE_DUCKDB else 'pandas',
+    }
@@ -0,0 +1,176 @@
+"""Template-based rendering of municipal action plans, cached per dataset version."""
+
+import io
+import os
+import zipfile
+from jinja2 import Environment, FileSystemLoader
+from data_loader import DATASETS
+from hotspot_analyzer import identify_hotspots, get_festival_summary, festival_exists
+from fleet_allocator import allocate_fleet
+from route_planner import get_festival_routes
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), 'templates')
+
+REPORT_YEAR = 2025
+
+RECOMMENDED_ACTIONS = [
+    "Pre-position waste collection vehicles in critical areas 2 days before festival",
+    "Set up temporary waste collection points near major markets",
+    "Deploy additional workforce in morning and evening shifts",
+    "Coordinate with local shops for source segregation",
+    "Arrange for special vehicles for festival-specific waste (flowers, decorations)",
+]
+
+# Output formats: mimetype and file extension
+REPORT_FORMATS = {
+    'text': ('text/plain', 'txt'),
+    'markdown': ('text/markdown', 'md'),
+    'pdf': ('application/pdf', 'pdf'),
+}
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_PATH),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=False,
+    autoescape=False
+)
+_env.filters['thousands'] = lambda value: f"{value:,.0f}"
+
+# Compile templates once at import rather than per request
+TEMPLATES = {
+    'text': _env.get_template('action_plan.txt.j2'),
+    'markdown': _env.get_template('action_plan.md.j2'),
+}
+
+
+def build_report_context(festival, area_df=None):
+    """
+    Gather the data an action plan is rendered from.
+
+    Returns:
+        dict: Template context, or None if the festival has no data
+    """
+    hotspots = identify_hotspots(festival, area_df)
+    summary = get_festival_summary(festival, area_df)
+
+    if not hotspots or summary is None:
+        return None
+
+    return {
+        'festival': festival,
+        'year': REPORT_YEAR,
+        'summary': summary,
+        'critical': [h for h in hotspots if h['priority'] == 'CRITICAL'],
+        'high': [h for h in hotspots if h['priority'] == 'HIGH'][:10],
+        'actions': RECOMMENDED_ACTIONS,
+        'allocation': None,
+        'routes': None,
+    }
+
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def render_pdf(text, lines_per_page=60, font_size=9):
+    """
+    Render plain text into a minimal multi-page PDF using the built-in Courier font.
+
+    No external PDF library is needed; each page is a single text content stream.
+    """
+    lines = text.split('\n')
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    leading = font_size + 3
+
+    # Object 1: catalog, 2: page tree, 3: font, then a (page, content) pair per page
+    objects = [None, None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>']
+    page_ids = []
+    for page_lines in pages:
+        body = [f'BT /F1 {font_size} Tf {leading} TL 40 800 Td'.encode()]
+        for line in page_lines:
+            body.append(f'({_pdf_escape(line)}) Tj T*'.encode('latin-1', 'replace'))
+        body.append(b'ET')
+        stream = b'\n'.join(body)
+
+        content_id = len(objects) + 2
+        page_ids.append(len(objects) + 1)
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>'.encode()
+        )
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+
+    objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    kids = ' '.join(f'{pid} 0 R' for pid in page_ids)
+    objects[1] = f'<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>'.encode()
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number + obj + b'\nendobj\n')
+
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b'%010d 00000 n \n' % offset)
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def _render(festival, fmt, fleet=None, routes=False):
+    context = build_report_context(festival)
+    if context is None:
+        return None
+
+    if fmt == 'pdf':
+        return render_pdf(render_action_plan(festival, 'text', fleet, routes).decode('utf-8'))
+    if fleet:
+        context['allocation'] = allocate_fleet(festival, **fleet)
+    if routes:
+        context['routes'] = get_festival_routes(festival)
+    return TEMPLATES[fmt].render(**context).encode('utf-8')
+
+
+def render_action_plan(festival, fmt='text', fleet=None, routes=False):
+    """
+    Render the action plan for a festival, cached until the dataset version changes.
+
+    Args:
+        festival: Festival name
+        fmt: One of REPORT_FORMATS
+        fleet: Optional dict of allocate_fleet arguments (trucks, workers, days);
+            adds a fleet allocation section and bypasses the cache
+        routes: Add collection routes for critical and high priority areas
+
+    Returns:
+        bytes: Rendered document, or None if the festival has no data
+    """
+    # Only known festivals are cached so arbitrary names can't grow the cache
+    if not festival_exists(festival):
+        return None
+    if fleet:
+        return _render(festival, fmt, fleet, routes)
+    if routes:
+        return DATASETS.cached(('action_plan', festival, fmt, 'routes'), lambda: _render(festival, fmt, routes=True))
+    return DATASETS.cached(('action_plan', festival, fmt), lambda: _render(festival, fmt))
+
+
+def render_action_plan_archive(fmt='text'):
+    """Render every festival's action plan into a single zip archive, cached per dataset version."""
+    return DATASETS.cached(('action_plan_archive', fmt), lambda: _render_archive(fmt))
+
+
+def _render_archive(fmt):
+    extension = REPORT_FORMATS[fmt][1]
+    festivals = DATASETS.areas['Festival'].unique().tolist()
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for festival in festivals:
+            document = render_action_plan(festival, fmt)
+            if document is not None:
+                zf.writestr(f'action_plan_{festival}_{REPORT_YEAR}.{extension}', document)
+    return archive.getvalue()
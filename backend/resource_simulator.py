@@ -0,0 +1,189 @@
+"""Monte Carlo simulation of festival waste and resource needs per area."""
+
+import numpy as np
+from hotspot_analyzer import get_hotspot_frame, calculate_resources_array, get_priority_levels
+
+# Coefficient of variation assumed for static (untrained) predictions
+DEFAULT_CV = 0.2
+
+# Z value behind forecast confidence (see forecaster.Z_95)
+Z_95 = 1.96
+
+QUANTILES = (50, 90, 99)
+
+# Upper bound on areas x samples drawn and sized at once
+DEFAULT_MAX_CELLS = 2_000_000
+
+
+def prediction_cv(frame, default_cv=DEFAULT_CV):
+    """
+    Get the coefficient of variation of each area's extra-waste prediction.
+
+    Forecast confidence is 1 - 1.96 * se / uplift, so se / uplift is recovered
+    directly; static predictions use ``default_cv``.
+    """
+    confidence = frame['forecast_confidence'].to_numpy(dtype=float)
+    cv = (1 - confidence) / Z_95
+    return np.where(np.isnan(confidence), default_cv, np.maximum(cv, 1e-6))
+
+
+def sample_waste(mean, cv, rng, n_samples):
+    """
+    Draw mean-preserving lognormal extra-waste samples.
+
+    Returns:
+        ndarray: Shape (areas, n_samples)
+    """
+    sigma = np.sqrt(np.log1p(cv ** 2))[:, None]
+    z = rng.standard_normal((len(mean), n_samples))
+    return mean[:, None] * np.exp(sigma * z - sigma ** 2 / 2)
+
+
+def _simulate_block(mean, cv, planned_trucks, rng, n_samples):
+    """Simulate one block of areas; return per-area quantiles and per-sample city totals."""
+    waste = sample_waste(mean, cv, rng, n_samples)
+    trucks, workers, days = calculate_resources_array(waste)
+    q = np.array(QUANTILES)
+
+    return {
+        'waste': np.percentile(waste, q, axis=1).T,
+        'trucks': np.percentile(trucks, q, axis=1, method='higher').T,
+        'workers': np.percentile(workers, q, axis=1, method='higher').T,
+        'overflow': (trucks > planned_trucks[:, None]).mean(axis=1),
+        'extended': (days > 2).mean(axis=1),
+        'total_waste': waste.sum(axis=0),
+        'total_trucks': trucks.sum(axis=0),
+        'total_workers': workers.sum(axis=0),
+    }
+
+
+def _simulate_area(mean, cv, planned_trucks, rng, n_samples, chunk):
+    """
+    Simulate one area whose samples don't fit in a block, ``chunk`` samples at a time.
+
+    Only the area's waste samples are kept whole, for its quantiles. Truck and
+    worker counts rise with waste, so their 'higher' quantiles are the counts
+    for the waste samples at the same ranks.
+    """
+    waste = np.empty(n_samples)
+    total_trucks = np.empty(n_samples, dtype=np.int64)
+    total_workers = np.empty(n_samples, dtype=np.int64)
+    overflow = extended = 0
+    for start in range(0, n_samples, chunk):
+        stop = min(start + chunk, n_samples)
+        block = sample_waste(mean, cv, rng, stop - start)[0]
+        trucks, workers, days = calculate_resources_array(block)
+        waste[start:stop] = block
+        total_trucks[start:stop] = trucks
+        total_workers[start:stop] = workers
+        overflow += int((trucks > planned_trucks[0]).sum())
+        extended += int((days > 2).sum())
+
+    q = np.array(QUANTILES)
+    trucks_q, workers_q, _ = calculate_resources_array(np.percentile(waste, q, method='higher'))
+    return {
+        'waste': np.percentile(waste, q)[None, :],
+        'trucks': trucks_q[None, :],
+        'workers': workers_q[None, :],
+        'overflow': np.array([overflow / n_samples]),
+        'extended': np.array([extended / n_samples]),
+        'total_waste': waste,
+        'total_trucks': total_trucks,
+        'total_workers': total_workers,
+    }
+
+
+def simulate_resources(festival, area_df=None, n_samples=10000, seed=None,
+                       default_cv=DEFAULT_CV, fleet_trucks=None, fleet_workers=None,
+                       max_cells=DEFAULT_MAX_CELLS):
+    """
+    Simulate waste scenarios for every area of a festival.
+
+    Areas x samples are drawn and sized as NumPy arrays, in blocks of areas of
+    at most ``max_cells`` cells. When one area's samples exceed that, the area
+    is simulated alone in sample chunks. The random stream is consumed in the
+    same order either way, so results don't depend on ``max_cells``.
+
+    Args:
+        festival: Festival name
+        area_df: Area-festival data (shared dataset if None)
+        n_samples: Scenarios per area
+        seed: Random seed for reproducible results
+        default_cv: Coefficient of variation for static predictions
+        fleet_trucks: Optional citywide truck pool to test for overflow
+        fleet_workers: Optional citywide worker pool to test for overflow
+        max_cells: Upper bound on areas x samples per block
+
+    Returns:
+        dict: Per-area P50/P90/P99 needs and overflow probabilities plus city totals,
+        or None if the festival has no data
+    """
+    frame = get_hotspot_frame(festival, area_df)
+    if frame.empty:
+        return None
+
+    rng = np.random.default_rng(seed)
+    mean = frame['extra_waste_kg'].to_numpy(dtype=float)
+    cv = prediction_cv(frame, default_cv)
+    planned = frame['extra_trucks'].to_numpy()
+
+    n_areas = len(frame)
+    block = max(1, max_cells // n_samples)
+
+    blocks = []
+    total_waste = np.zeros(n_samples)
+    total_trucks = np.zeros(n_samples, dtype=np.int64)
+    total_workers = np.zeros(n_samples, dtype=np.int64)
+    for start in range(0, n_areas, block):
+        stop = start + block
+        if n_samples > max_cells:
+            result = _simulate_area(mean[start:stop], cv[start:stop], planned[start:stop], rng, n_samples, max_cells)
+        else:
+            result = _simulate_block(mean[start:stop], cv[start:stop], planned[start:stop], rng, n_samples)
+        total_waste += result.pop('total_waste')
+        total_trucks += result.pop('total_trucks')
+        total_workers += result.pop('total_workers')
+        blocks.append(result)
+
+    merged = {key: np.concatenate([b[key] for b in blocks]) for key in blocks[0]}
+
+    areas = []
+    for i, area in enumerate(frame['area'].tolist()):
+        waste_q = merged['waste'][i].round(2).tolist()
+        trucks_q = merged['trucks'][i].astype(int).tolist()
+        workers_q = merged['workers'][i].astype(int).tolist()
+        areas.append({
+            'area': area,
+            'pincode': int(frame['pincode'].iat[i]),
+            'expected_extra_waste_kg': float(mean[i]),
+            'cv': round(float(cv[i]), 3),
+            'extra_waste_kg': dict(zip(('p50', 'p90', 'p99'), waste_q)),
+            'extra_trucks': dict(zip(('p50', 'p90', 'p99'), trucks_q)),
+            'extra_workers': dict(zip(('p50', 'p90', 'p99'), workers_q)),
+            'planned_trucks': int(planned[i]),
+            'overflow_probability': round(float(merged['overflow'][i]), 4),
+            'extended_duration_probability': round(float(merged['extended'][i]), 4),
+            'p90_priority': str(get_priority_levels(merged['waste'][i][1])),
+        })
+
+    q = np.array(QUANTILES)
+    city = {
+        'extra_waste_kg': dict(zip(('p50', 'p90', 'p99'), np.percentile(total_waste, q).round(2).tolist())),
+        'extra_trucks': dict(zip(('p50', 'p90', 'p99'),
+                                 np.percentile(total_trucks, q, method='higher').astype(int).tolist())),
+        'extra_workers': dict(zip(('p50', 'p90', 'p99'),
+                                  np.percentile(total_workers, q, method='higher').astype(int).tolist())),
+        'planned_trucks': int(planned.sum()),
+    }
+    if fleet_trucks is not None:
+        city['truck_overflow_probability'] = round(float((total_trucks > fleet_trucks).mean()), 4)
+    if fleet_workers is not None:
+        city['worker_overflow_probability'] = round(float((total_workers > fleet_workers).mean()), 4)
+
+    return {
+        'festival': festival,
+        'samples': n_samples,
+        'seed': seed,
+        'areas': areas,
+        'city': city
+    }
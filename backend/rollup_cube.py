@@ -0,0 +1,286 @@
+"""Hierarchical festival waste rollups: pincode -> area -> zone -> city."""
+
+import re
+import numpy as np
+import pandas as pd
+from data_loader import DATASETS
+from hotspot_analyzer import calculate_resources_array
+
+# Municipal zone of each area; datasets with a Zone column use that instead
+AREA_ZONES = {
+    'Yelahanka': 'Yelahanka',
+    'Hebbal': 'Yelahanka',
+    'Indiranagar': 'East',
+    'MG Road': 'East',
+    'Frazer Town': 'East',
+    'Richmond Town': 'East',
+    'Whitefield': 'Mahadevapura',
+    'Marathahalli': 'Mahadevapura',
+    'KR Puram': 'Mahadevapura',
+    'Mahadevapura': 'Mahadevapura',
+    'Bellandur': 'Mahadevapura',
+    'HSR Layout': 'Bommanahalli',
+    'BTM Layout': 'Bommanahalli',
+    'Electronic City': 'Bommanahalli',
+    'Bannerghatta': 'Bommanahalli',
+    'Sarjapur': 'Bommanahalli',
+    'Koramangala': 'South',
+    'Jayanagar': 'South',
+    'JP Nagar': 'South',
+    'Basavanagudi': 'South',
+    'Banashankari': 'South',
+    'Malleshwaram': 'West',
+    'Rajajinagar': 'West',
+    'Vijayanagar': 'West',
+    'RR Nagar': 'RR Nagar',
+    'Kengeri': 'RR Nagar',
+    'Uttarahalli': 'RR Nagar',
+}
+DEFAULT_ZONE = 'Unzoned'
+
+# City-scale datasets split areas into wards named "<Area> Ward <n>"; a ward is in its area's zone
+WARD_SUFFIX = r' Ward \d+$'
+
+LEVELS = ('pincode', 'area', 'zone', 'city')
+
+# Additive measures held in every cell
+METRICS = (
+    'rows', 'population', 'baseline_waste_kg', 'extra_waste_kg', 'total_waste_kg',
+    'critical_areas', 'high_priority_areas', 'extra_trucks', 'extra_workers'
+)
+COUNT_METRICS = {'rows', 'population', 'critical_areas', 'high_priority_areas', 'extra_trucks', 'extra_workers'}
+
+# Columns identifying an area-festival row
+AREA_KEYS = ('Festival', 'Area', 'Pincode')
+
+
+def row_metrics(population, baseline, extra, total):
+    """
+    Per-row measures for arrays of area-festival rows.
+
+    Returns:
+        ndarray: Shape (rows, len(METRICS))
+    """
+    extra = np.asarray(extra, dtype=float)
+    trucks, workers, _ = calculate_resources_array(extra)
+    return np.column_stack([
+        np.ones(len(extra)),
+        np.asarray(population, dtype=float),
+        np.asarray(baseline, dtype=float),
+        extra,
+        np.asarray(total, dtype=float),
+        extra > 80000,
+        (extra > 50000) & (extra <= 80000),
+        trucks,
+        workers,
+    ]).astype(float)
+
+
+class RollupCube:
+    """
+    Precomputed waste, population and resource totals at every level and festival.
+
+    Cells are keyed by (festival, area, pincode), (festival, area), (festival, zone)
+    and (festival,). A pincode can span two areas, so pincode cells sit under their
+    area. Lookups and roll-ups are dict accesses; ``update_row`` applies a changed
+    row as a delta to its four ancestors instead of re-aggregating.
+    """
+
+    def __init__(self, area_df, zones=None):
+        zones = AREA_ZONES if zones is None else zones
+        if 'Zone' in area_df:
+            zone = area_df['Zone'].fillna(DEFAULT_ZONE).to_numpy()
+        else:
+            base_area = area_df['Area'].str.replace(WARD_SUFFIX, '', regex=True)
+            zone = area_df['Area'].map(zones).fillna(base_area.map(zones)).fillna(DEFAULT_ZONE).to_numpy()
+        self.zones = dict(zones)
+
+        leaves = pd.DataFrame(
+            row_metrics(
+                area_df['Population'], area_df['Baseline_Daily_Waste_kg'],
+                area_df['Predicted_Festival_Extra_Waste_kg'], area_df['Predicted_Total_Daily_Waste_kg']
+            ),
+            columns=METRICS
+        )
+        leaves['festival'] = area_df['Festival'].to_numpy()
+        leaves['area'] = area_df['Area'].to_numpy()
+        leaves['pincode'] = area_df['Pincode'].to_numpy(dtype=np.int64)
+        leaves['zone'] = zone
+
+        group_keys = {
+            'pincode': ['festival', 'area', 'pincode'],
+            'area': ['festival', 'area'],
+            'zone': ['festival', 'zone'],
+            'city': ['festival'],
+        }
+        self.cells = {}
+        for level, keys in group_keys.items():
+            grouped = leaves.groupby(keys, sort=False)[list(METRICS)].sum()
+            index = grouped.index.tolist()
+            if level == 'city':
+                index = [(festival,) for festival in index]
+            self.cells[level] = dict(zip(index, grouped.to_numpy()))
+
+        # Parent links for roll-up and child lists for drill-down
+        self.parent = {level: {} for level in LEVELS}
+        self.children = {level: {} for level in LEVELS}
+        area_zone = dict(zip(zip(leaves['festival'], leaves['area']), leaves['zone']))
+        for key in self.cells['pincode']:
+            self._link('pincode', key, (key[0], key[1]))
+        for key in self.cells['area']:
+            self._link('area', key, (key[0], area_zone[key]))
+        for key in self.cells['zone']:
+            self._link('zone', key, (key[0],))
+
+    def _link(self, level, key, parent_key):
+        parent_level = LEVELS[LEVELS.index(level) + 1]
+        self.parent[level][key] = parent_key
+        self.children[parent_level].setdefault(parent_key, []).append(key)
+
+    @staticmethod
+    def key(festival, zone=None, area=None, pincode=None):
+        """Return (level, key) for the most specific of zone/area/pincode given."""
+        if pincode is not None:
+            return 'pincode', (festival, area, int(pincode))
+        if area is not None:
+            return 'area', (festival, area)
+        if zone is not None:
+            return 'zone', (festival, zone)
+        return 'city', (festival,)
+
+    def cell(self, level, key):
+        """Measures of one cell as a dict, or None if it doesn't exist."""
+        values = self.cells[level].get(key)
+        if values is None:
+            return None
+
+        result = {'level': level, 'name': key[-1]}
+        for metric, value in zip(METRICS, values.tolist()):
+            result[metric] = int(round(value)) if metric in COUNT_METRICS else round(value, 2)
+        baseline = values[METRICS.index('baseline_waste_kg')]
+        extra = values[METRICS.index('extra_waste_kg')]
+        result['waste_increase_percent'] = round(float(extra / baseline * 100), 1) if baseline else 0.0
+        return result
+
+    def roll_up(self, level, key):
+        """(level, key) of the parent cell, or None at city level."""
+        if level == 'city':
+            return None
+        return LEVELS[LEVELS.index(level) + 1], self.parent[level][key]
+
+    def drill_down(self, level, key):
+        """Child cells of a cell, largest extra waste first."""
+        if level == 'pincode':
+            return []
+        child_level = LEVELS[LEVELS.index(level) - 1]
+        cells = [self.cell(child_level, child) for child in self.children[level].get(key, [])]
+        return sorted(cells, key=lambda c: -c['extra_waste_kg'])
+
+    def query(self, festival, zone=None, area=None, pincode=None):
+        """
+        A cell with its parent and children.
+
+        Returns:
+            dict: Cell, parent and children, or None if the cell doesn't exist
+        """
+        level, key = self.key(festival, zone, area, pincode)
+        cell = self.cell(level, key)
+        if cell is None:
+            return None
+
+        parent = self.roll_up(level, key)
+        return {
+            'festival': festival,
+            'level': level,
+            'cell': cell,
+            'parent': self.cell(*parent) if parent else None,
+            'children': self.drill_down(level, key),
+        }
+
+    def festival_summary(self, festival):
+        """City-level summary in the shape of hotspot_analyzer.get_festival_summary."""
+        city = self.cells['city'].get((festival,))
+        if city is None:
+            return None
+
+        values = dict(zip(METRICS, city.tolist()))
+        return {
+            'festival': festival,
+            'total_areas': int(values['rows']),
+            'total_extra_waste_kg': round(values['extra_waste_kg'], 2),
+            'total_baseline_kg': round(values['baseline_waste_kg'], 2),
+            'average_increase_percent': round((values['extra_waste_kg'] / values['baseline_waste_kg']) * 100, 1),
+            'critical_areas': int(values['critical_areas']),
+            'high_priority_areas': int(values['high_priority_areas']),
+            'total_extra_trucks_needed': int(values['extra_trucks']),
+            'total_extra_workers_needed': int(values['extra_workers'])
+        }
+
+    def update_row(self, festival, area, pincode, population, baseline_kg, extra_kg, total_kg=None, zone=None):
+        """
+        Apply a new or changed area-festival row.
+
+        The difference from the old row is added to the pincode cell and its area,
+        zone and city ancestors, so the cost doesn't depend on the city size.
+        """
+        key = (festival, area, int(pincode))
+        total_kg = baseline_kg + extra_kg if total_kg is None else total_kg
+        new = row_metrics([population], [baseline_kg], [extra_kg], [total_kg])[0]
+        old = self.cells['pincode'].get(key)
+
+        if old is None:
+            zone = zone or self.zones.get(area) or self.zones.get(re.sub(WARD_SUFFIX, '', area), DEFAULT_ZONE)
+            area_key = (festival, area)
+            zone_key = self.parent['area'].get(area_key, (festival, zone))
+            for level, cell_key, parent_key in (
+                ('pincode', key, area_key),
+                ('area', area_key, zone_key),
+                ('zone', zone_key, (festival,)),
+            ):
+                if cell_key not in self.cells[level]:
+                    self.cells[level][cell_key] = np.zeros(len(METRICS))
+                    self._link(level, cell_key, parent_key)
+            self.cells['city'].setdefault((festival,), np.zeros(len(METRICS)))
+            delta = new
+        else:
+            delta = new - old
+
+        level, cell_key = 'pincode', key
+        while True:
+            self.cells[level][cell_key] = self.cells[level][cell_key] + delta
+            parent = self.roll_up(level, cell_key)
+            if parent is None:
+                break
+            level, cell_key = parent
+
+
+def _apply_area_changes(cube, version):
+    """Apply the area rows changed since ``version`` to a cached cube, or None to rebuild it."""
+    changes = DATASETS.row_changes('areas', version, AREA_KEYS)
+    if changes is None:
+        return None
+    old, new = changes
+    if 'Zone' in new and not old['Zone'].equals(new['Zone']):
+        return None
+    # update_row replaces the whole pincode cell, so each must hold exactly one row
+    rows = METRICS.index('rows')
+    keys = list(zip(new['Festival'], new['Area'], new['Pincode'].astype(int)))
+    if any(cube.cells['pincode'][key][rows] != 1 for key in keys):
+        return None
+
+    for key, population, baseline, extra, total in zip(
+        keys, new['Population'], new['Baseline_Daily_Waste_kg'],
+        new['Predicted_Festival_Extra_Waste_kg'], new['Predicted_Total_Daily_Waste_kg']
+    ):
+        cube.update_row(*key, population, baseline, extra, total)
+    return cube
+
+
+def get_rollup_cube():
+    """
+    Rollup cube over the shared area dataset, built once per dataset version.
+
+    When a reload changes only a few area rows (e.g. new forecasts), they are
+    applied to the cached cube with ``update_row`` instead of rebuilding it.
+    """
+    return DATASETS.cached('rollup_cube', lambda: RollupCube(DATASETS.areas), update=_apply_area_changes)
@@ -0,0 +1,253 @@
+"""Collection route planning from depots to festival hotspots."""
+
+import time
+import numpy as np
+from data_loader import DATASETS
+from geo_index import haversine_km, get_hotspot_layer, build_hotspot_layer
+from hotspot_analyzer import TRUCK_CAPACITY_KG
+
+# Municipal depots trucks start and end their routes at (zone offices)
+DEPOTS = [
+    {'name': 'Yelahanka Zone', 'lat': 13.1007, 'lon': 77.5963},
+    {'name': 'East Zone', 'lat': 12.9857, 'lon': 77.6046},
+    {'name': 'Mahadevapura Zone', 'lat': 12.9814, 'lon': 77.7170},
+    {'name': 'Bommanahalli Zone', 'lat': 12.9081, 'lon': 77.6476},
+    {'name': 'South Zone', 'lat': 12.9308, 'lon': 77.5838},
+    {'name': 'RR Nagar Zone', 'lat': 12.9261, 'lon': 77.5093},
+    {'name': 'West Zone', 'lat': 13.0035, 'lon': 77.5647},
+]
+
+# Road distance is estimated as great-circle distance times this circuity factor
+ROAD_FACTOR = 1.3
+
+ROUTED_PRIORITIES = ('CRITICAL', 'HIGH')
+
+# Nearest neighbours per stop considered for savings merges
+SAVINGS_NEIGHBOURS = 25
+
+
+def distance_matrix(lat, lon):
+    """Pairwise road-distance estimates (km) between points, as one broadcast haversine."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    return ROAD_FACTOR * haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+
+def route_length(route, dist, depot_dist):
+    """Length of depot -> route stops -> depot."""
+    if not route:
+        return 0.0
+    inner = dist[route[:-1], route[1:]].sum() if len(route) > 1 else 0.0
+    return float(depot_dist[route[0]] + inner + depot_dist[route[-1]])
+
+
+def savings_routes(loads, dist, depot_dist, capacity, neighbours=SAVINGS_NEIGHBOURS):
+    """
+    Build capacitated routes with the Clarke-Wright savings heuristic.
+
+    Only merges between each stop and its nearest ``neighbours`` stops are
+    considered, so the candidate list grows linearly with the number of stops.
+
+    Args:
+        loads: Load (kg) to collect at each stop, each at most ``capacity``
+        dist: Stop-to-stop distance matrix
+        depot_dist: Depot-to-stop distances
+        capacity: Truck capacity (kg)
+
+    Returns:
+        list: Routes as lists of stop indices
+    """
+    n = len(loads)
+    if n == 0:
+        return []
+
+    # Candidate pairs (i < j) from each stop's nearest neighbours, best saving first
+    k = min(neighbours, n - 1)
+    if k > 0:
+        near = np.argpartition(dist + np.diag(np.full(n, np.inf)), k - 1, axis=1)[:, :k]
+        i = np.repeat(np.arange(n), k)
+        j = near.ravel()
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        pairs = np.unique(np.stack([i, j], axis=1), axis=0)
+        i, j = pairs[:, 0], pairs[:, 1]
+        savings = depot_dist[i] + depot_dist[j] - dist[i, j]
+        order = np.argsort(-savings, kind='stable')
+        candidates = [(a, b) for a, b, s in zip(i[order].tolist(), j[order].tolist(), savings[order].tolist()) if s > 0]
+    else:
+        candidates = []
+
+    routes = {r: [r] for r in range(n)}
+    route_of = list(range(n))
+    route_load = {r: float(loads[r]) for r in range(n)}
+
+    for a, b in candidates:
+        ra, rb = route_of[a], route_of[b]
+        if ra == rb or route_load[ra] + route_load[rb] > capacity:
+            continue
+        first, second = routes[ra], routes[rb]
+        # Merge only through route ends: ... a] + [b ...
+        if first[-1] != a:
+            if first[0] != a:
+                continue
+            first.reverse()
+        if second[0] != b:
+            if second[-1] != b:
+                continue
+            second.reverse()
+
+        first.extend(second)
+        route_load[ra] += route_load.pop(rb)
+        for stop in routes.pop(rb):
+            route_of[stop] = ra
+
+    return list(routes.values())
+
+
+def two_opt(route, dist, depot_dist):
+    """Improve a route in place by reversing segments while it gets shorter."""
+    if len(route) < 3:
+        return route
+
+    improved = True
+    while improved:
+        improved = False
+        best = route_length(route, dist, depot_dist)
+        for i in range(len(route) - 1):
+            for j in range(i + 1, len(route)):
+                candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                length = route_length(candidate, dist, depot_dist)
+                if length < best - 1e-9:
+                    route[:] = candidate
+                    best = length
+                    improved = True
+    return route
+
+
+def plan_routes(stops, depots=DEPOTS, capacity=TRUCK_CAPACITY_KG):
+    """
+    Plan collection routes from depots to stops.
+
+    Stops are assigned to their nearest depot. Demand beyond whole truck loads
+    is collected with direct depot round trips; the remainders are combined into
+    multi-stop routes with the savings heuristic and improved with 2-opt.
+
+    Args:
+        stops: DataFrame with area, pincode, priority, extra_waste_kg, latitude, longitude
+        depots: List of depot dicts with name, lat, lon
+        capacity: Truck capacity (kg)
+
+    Returns:
+        dict: Routes and round trips per depot plus totals
+    """
+    start = time.perf_counter()
+    lat = stops['latitude'].to_numpy(dtype=float)
+    lon = stops['longitude'].to_numpy(dtype=float)
+    demand = stops['extra_waste_kg'].to_numpy(dtype=float)
+
+    depot_lat = np.array([d['lat'] for d in depots])
+    depot_lon = np.array([d['lon'] for d in depots])
+    to_depots = ROAD_FACTOR * haversine_km(lat[:, None], lon[:, None], depot_lat[None, :], depot_lon[None, :])
+    nearest_depot = to_depots.argmin(axis=1) if len(stops) else np.empty(0, dtype=np.int64)
+
+    full_loads = np.floor(demand / capacity).astype(np.int64)
+    remainder = demand - full_loads * capacity
+
+    areas = stops['area'].tolist()
+    pincodes = stops['pincode'].tolist()
+    priorities = stops['priority'].tolist()
+
+    plans = []
+    for d, depot in enumerate(depots):
+        members = np.nonzero(nearest_depot == d)[0]
+        if len(members) == 0:
+            continue
+
+        depot_dist = to_depots[members, d]
+
+        round_trips = [
+            {
+                'area': areas[m],
+                'pincode': pincodes[m],
+                'priority': priorities[m],
+                'trips': int(full_loads[m]),
+                'distance_km': round(float(2 * depot_dist[i] * full_loads[m]), 2),
+            }
+            for i, m in enumerate(members.tolist()) if full_loads[m] > 0
+        ]
+
+        # Only stops with a partial load left are routed together
+        routed = np.nonzero(remainder[members] > 0)[0]
+        dist = distance_matrix(lat[members[routed]], lon[members[routed]])
+        routes = savings_routes(remainder[members[routed]], dist, depot_dist[routed], capacity)
+
+        depot_routes = []
+        for route in routes:
+            two_opt(route, dist, depot_dist[routed])
+            stop_ids = members[routed[route]].tolist()
+            depot_routes.append({
+                'stops': [
+                    {
+                        'area': areas[m],
+                        'pincode': pincodes[m],
+                        'priority': priorities[m],
+                        'load_kg': round(float(remainder[m]), 2),
+                        'coordinates': [float(lat[m]), float(lon[m])],
+                    }
+                    for m in stop_ids
+                ],
+                'load_kg': round(float(remainder[stop_ids].sum()), 2),
+                'distance_km': round(route_length(route, dist, depot_dist[routed]), 2),
+            })
+        depot_routes.sort(key=lambda r: -r['load_kg'])
+
+        plans.append({
+            'depot': depot,
+            'stops': len(members),
+            'round_trips': round_trips,
+            'routes': depot_routes,
+            'distance_km': round(
+                sum(t['distance_km'] for t in round_trips) + sum(r['distance_km'] for r in depot_routes), 2
+            ),
+        })
+
+    return {
+        'capacity_kg': capacity,
+        'road_factor': ROAD_FACTOR,
+        'depots': plans,
+        'totals': {
+            'stops': len(stops),
+            'waste_kg': round(float(demand.sum()), 2),
+            'round_trips': int(full_loads.sum()),
+            'routes': sum(len(p['routes']) for p in plans),
+            'truck_trips': int(full_loads.sum()) + sum(len(p['routes']) for p in plans),
+            'distance_km': round(sum(p['distance_km'] for p in plans), 2),
+        },
+        'seconds': round(time.perf_counter() - start, 4),
+    }
+
+
+def plan_festival_routes(festival, priorities=ROUTED_PRIORITIES, capacity=TRUCK_CAPACITY_KG, area_df=None):
+    """
+    Plan routes to a festival's hotspots of the given priorities.
+
+    Returns:
+        dict: Route plan, or None if the festival has no data
+    """
+    layer = get_hotspot_layer(festival) if area_df is None else build_hotspot_layer(festival, area_df)
+    if layer is None:
+        return None
+
+    stops = layer.frame[layer.frame['priority'].isin(priorities)]
+    plan = plan_routes(stops, capacity=capacity)
+    plan['festival'] = festival
+    plan['priorities'] = list(priorities)
+    return plan
+
+
+def get_festival_routes(festival, priorities=ROUTED_PRIORITIES, capacity=TRUCK_CAPACITY_KG):
+    """Route plan over the shared dataset, cached per festival and dataset version."""
+    if get_hotspot_layer(festival) is None:
+        return None
+    priorities = tuple(sorted(set(priorities)))
+    key = ('routes', festival, priorities, capacity)
+    return DATASETS.cached(key, lambda: plan_festival_routes(festival, priorities, capacity))
@@ -73,12 +73,18 @@ CREATE TABLE IF NOT EXISTS predictions (
     id SERIAL PRIMARY KEY,
     festival_id INTEGER REFERENCES festivals(id),
     area_id INTEGER REFERENCES areas(id),
+    pincode VARCHAR(10),
+    festival_year INTEGER,
     predicted_waste_kg DECIMAL(10, 2),
     confidence DECIMAL(3, 2),
     prediction_date DATE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Columns added after the first release, for databases created before them
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS pincode VARCHAR(10);
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS festival_year INTEGER;
+
 -- ============================================
 -- INSERT DEFAULT DATA
 -- ============================================
@@ -138,6 +144,9 @@ CREATE INDEX IF NOT EXISTS idx_festival_waste_area ON festival_waste(area_id);
 CREATE INDEX IF NOT EXISTS idx_festival_waste_date ON festival_waste(date);
 CREATE INDEX IF NOT EXISTS idx_shops_area ON shops(area_id);
 CREATE INDEX IF NOT EXISTS idx_predictions_festival ON predictions(festival_id);
+-- One forecast per area, pincode, festival and year; forecaster.py upserts on it
+CREATE UNIQUE INDEX IF NOT EXISTS idx_predictions_key
+    ON predictions(area_id, pincode, festival_id, festival_year);
 
 -- ============================================
 -- ROW LEVEL SECURITY (Optional - Enable for production)
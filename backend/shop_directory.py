@@ -0,0 +1,98 @@
+"""Precomputed shop directory with indexed filtering and pagination."""
+
+import numpy as np
+from data_loader import DATASETS
+
+SHOP_FIELDS = ['Shop_ID', 'Shop_Name', 'Area', 'Pincode']
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class ShopDirectory:
+    """
+    Unique shops from the sales data, sorted by name and indexed by area and pincode.
+
+    Built once per dataset version; queries only touch the rows of the page
+    being returned.
+    """
+
+    def __init__(self, sales_df):
+        shops = sales_df[SHOP_FIELDS].drop_duplicates('Shop_ID')
+        order = shops['Shop_Name'].str.lower().argsort(kind='stable')
+        shops = shops.iloc[order].reset_index(drop=True)
+
+        self.records = shops.to_dict('records')
+        self.names = shops['Shop_Name'].str.lower().to_numpy(dtype=str)
+        self.by_area = dict(shops.groupby('Area').indices)
+        self.by_pincode = {
+            int(pincode): positions
+            for pincode, positions in shops.groupby('Pincode').indices.items()
+        }
+
+    def __len__(self):
+        return len(self.records)
+
+    def _prefix_range(self, prefix):
+        """Return the [start, stop) slice of name-sorted rows starting with prefix."""
+        prefix = prefix.lower()
+        start = np.searchsorted(self.names, prefix, side='left')
+        stop = np.searchsorted(self.names, prefix + '\uffff', side='left')
+        return start, stop
+
+    def query(self, area=None, pincode=None, search=None, fields=None,
+              page=1, page_size=DEFAULT_PAGE_SIZE):
+        """
+        Filter, paginate and project the directory.
+
+        Args:
+            area: Exact area name
+            pincode: Exact pincode
+            search: Case-insensitive shop name prefix
+            fields: Subset of SHOP_FIELDS to return (all if None)
+            page: 1-based page number
+            page_size: Rows per page (capped at MAX_PAGE_SIZE)
+
+        Returns:
+            dict: Total match count, paging info and the shops on this page
+        """
+        positions = None
+        if area:
+            positions = self.by_area.get(area, np.empty(0, dtype=np.intp))
+        if pincode is not None:
+            pin_positions = self.by_pincode.get(int(pincode), np.empty(0, dtype=np.intp))
+            positions = pin_positions if positions is None else np.intersect1d(positions, pin_positions)
+
+        if search:
+            start, stop = self._prefix_range(search)
+            if positions is None:
+                positions = np.arange(start, stop)
+            else:
+                positions = positions[(positions >= start) & (positions < stop)]
+
+        total = len(self.records) if positions is None else len(positions)
+        page = max(1, page)
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        offset = (page - 1) * page_size
+
+        if positions is None:
+            rows = self.records[offset:offset + page_size]
+        else:
+            rows = [self.records[i] for i in positions[offset:offset + page_size]]
+
+        if fields:
+            rows = [{field: row[field] for field in fields} for row in rows]
+
+        return {
+            'count': total,
+            'page': page,
+            'page_size': page_size,
+            'pages': (total + page_size - 1) // page_size,
+            'shops': rows
+        }
+
+
+def get_shop_directory(sales_df=None):
+    """Get the shop directory, cached per dataset version for the shared sales data."""
+    if sales_df is not None:
+        return ShopDirectory(sales_df)
+    return DATASETS.cached('shop_directory', lambda: ShopDirectory(DATASETS.sales))
@@ -0,0 +1,198 @@
+"""Shops-like-mine search over product-mix vectors."""
+
+import re
+import numpy as np
+import pandas as pd
+from data_loader import DATASETS
+from waste_calculator import get_eco_alternatives, get_waste_levels
+
+VARIANT_SUFFIX = re.compile(r' Variant \d+$')
+
+# Rows scored per matrix-vector block, bounding temporary memory for large cities
+BLOCK_ROWS = 65536
+
+# Most similar shops considered before ranking them by greenness
+CANDIDATE_POOL = 50
+MIN_SIMILARITY = 0.5
+
+# Eco share gap within a product family that counts as a swap
+MIN_SWAP_GAIN = 0.25
+
+
+def base_product(item_name):
+    """Product name without its ' Variant N' suffix."""
+    return VARIANT_SUFFIX.sub('', item_name)
+
+
+def product_families():
+    """
+    Map base products to families named after their eco alternative.
+
+    A high-waste product and its eco alternative share a family, so shops that
+    sell the same things look alike whether or not they have switched.
+
+    Returns:
+        tuple: ({base product: family}, set of eco base products)
+    """
+    alternatives = {base_product(k): base_product(v) for k, v in get_eco_alternatives().items()}
+    eco_products = set(alternatives.values())
+    families = dict(alternatives)
+    families.update({eco: eco for eco in eco_products})
+    return families, eco_products
+
+
+class ShopSimilarityIndex:
+    """
+    Dense, L2-normalized product-mix vectors for every shop.
+
+    Each row holds a shop's share of units sold per product family; cosine
+    similarity is then a single matrix-vector product.
+    """
+
+    def __init__(self, sales_df):
+        families, eco_products = product_families()
+
+        items = sales_df['Item_Name']
+        base = items.map({name: base_product(name) for name in items.unique()})
+        family = base.map(families).fillna(base)
+        is_eco = base.isin(eco_products).to_numpy()
+
+        shop_codes, self.shop_ids = pd.factorize(sales_df['Shop_ID'])
+        family_codes, self.families = pd.factorize(family)
+        n_shops, n_families = len(self.shop_ids), len(self.families)
+
+        qty = sales_df['Quantity_Sold'].to_numpy(dtype=float)
+        cells = shop_codes * n_families + family_codes
+        size = n_shops * n_families
+        units = np.bincount(cells, weights=qty, minlength=size).reshape(n_shops, n_families)
+        eco_units = np.bincount(cells, weights=qty * is_eco, minlength=size).reshape(n_shops, n_families)
+
+        total_units = units.sum(axis=1)
+        norms = np.linalg.norm(units, axis=1)
+        self.vectors = (units / np.where(norms > 0, norms, 1)[:, None]).astype(np.float32)
+        self.mix = units / np.where(total_units > 0, total_units, 1)[:, None]
+        self.eco_share = np.divide(eco_units, units, out=np.zeros_like(units), where=units > 0)
+
+        # Quantity-weighted mean waste score: lower is greener
+        scored = np.bincount(shop_codes, weights=qty * sales_df['Item_Waste_Score'].to_numpy(dtype=float),
+                             minlength=n_shops)
+        self.waste_score = scored / np.where(total_units > 0, total_units, 1)
+        self.levels = get_waste_levels(self.waste_score).tolist()
+        self.waste_kg = np.bincount(shop_codes, weights=sales_df['Estimated_Waste_kg'].to_numpy(dtype=float),
+                                    minlength=n_shops)
+
+        first = pd.Series(np.arange(len(sales_df))).groupby(shop_codes).first().to_numpy()
+        self.names = sales_df['Shop_Name'].to_numpy()[first].tolist()
+        self.areas = sales_df['Area'].to_numpy()[first].tolist()
+        self.row = {shop_id: i for i, shop_id in enumerate(self.shop_ids.tolist())}
+
+        # Best-selling high-waste product per (shop, family), named in swap suggestions
+        high_waste = sales_df.loc[~is_eco, ['Quantity_Sold']].assign(
+            shop=shop_codes[~is_eco], family=family_codes[~is_eco], base=base[~is_eco].to_numpy()
+        )
+        top = high_waste.groupby(['shop', 'family', 'base'], sort=False)['Quantity_Sold'].sum()
+        top = top.sort_values(ascending=False).reset_index().drop_duplicates(['shop', 'family'])
+        self.top_product = dict(zip(zip(top['shop'].tolist(), top['family'].tolist()), top['base'].tolist()))
+
+    def __len__(self):
+        return len(self.shop_ids)
+
+    def similarities(self, i):
+        """Cosine similarity of shop row ``i`` to every shop, in row blocks."""
+        query = self.vectors[i]
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            stop = start + BLOCK_ROWS
+            np.dot(self.vectors[start:stop], query, out=scores[start:stop])
+        return scores
+
+    def top_k(self, i, k):
+        """Indices of the k most similar other shops, most similar first."""
+        scores = self.similarities(i)
+        scores[i] = -np.inf
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return top, scores[top]
+
+    def swaps(self, i, j):
+        """Families where shop j sells a clearly larger eco share than shop i does."""
+        gain = self.eco_share[j] - self.eco_share[i]
+        candidates = np.nonzero((gain >= MIN_SWAP_GAIN) & (self.mix[i] > 0) & (self.eco_share[i] < 1))[0]
+        candidates = candidates[np.argsort(-(gain[candidates] * self.mix[i][candidates]))]
+        return [
+            {
+                'from': self.top_product.get((i, f), self.families[f]),
+                'to': self.families[f],
+                'your_eco_share': round(float(self.eco_share[i, f]), 2),
+                'their_eco_share': round(float(self.eco_share[j, f]), 2),
+            }
+            for f in candidates.tolist()
+        ]
+
+    def greener_similar(self, shop_id, k=5, pool=CANDIDATE_POOL, min_similarity=MIN_SIMILARITY):
+        """
+        Find similar shops with a lower waste score and the eco swaps they made.
+
+        The ``pool`` most similar shops above ``min_similarity`` are ranked by
+        waste score, greenest first.
+
+        Returns:
+            dict: The shop's own profile and up to k greener similar shops,
+            or None if the shop is unknown
+        """
+        i = self.row.get(shop_id)
+        if i is None:
+            return None
+
+        candidates, scores = self.top_k(i, pool)
+        keep = (scores >= min_similarity) & (self.waste_score[candidates] < self.waste_score[i])
+        candidates, scores = candidates[keep], scores[keep]
+        order = np.argsort(self.waste_score[candidates], kind='stable')[:k]
+
+        return {
+            'shop': self._profile(i),
+            'similar_shops': [
+                dict(self._profile(j), similarity=round(float(s), 3), eco_swaps=self.swaps(i, j))
+                for j, s in zip(candidates[order].tolist(), scores[order].tolist())
+            ]
+        }
+
+    def _profile(self, i):
+        return {
+            'shop_id': self.shop_ids[i],
+            'shop_name': self.names[i],
+            'area': self.areas[i],
+            'waste_score': round(float(self.waste_score[i]), 3),
+            'waste_level': self.levels[i],
+            'estimated_waste_kg': round(float(self.waste_kg[i]), 2),
+        }
+
+
+def get_similarity_index(festival=None):
+    """Similarity index over all sales or one festival's, cached per dataset version."""
+    def build():
+        sales = DATASETS.sales
+        if festival:
+            sales = sales[sales['Festival'] == festival]
+        return ShopSimilarityIndex(sales)
+
+    return DATASETS.cached(('shop_similarity', festival), build)
+
+
+def find_similar_shops(shop_id, festival=None, k=5):
+    """
+    Greener shops with a similar product mix, with the eco swaps they made.
+
+    Returns:
+        dict: Similar shops, or None if the shop or festival has no sales
+    """
+    if festival and festival not in DATASETS.cached(
+            'sales_festivals', lambda: set(DATASETS.sales['Festival'].unique())):
+        return None
+    result = get_similarity_index(festival).greener_similar(shop_id, k)
+    if result is not None:
+        result['festival'] = festival
+    return result
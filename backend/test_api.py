@@ -1,4 +1,5 @@
 """Test script to verify all API endpoints are working."""
+import sys
 import requests
 import json
 
@@ -30,7 +31,8 @@ print("Testing Festival Waste Prediction API")
 print("=" * 50)
 
 # Test health
-test_endpoint("Health Check", "/api/health", ["status", "sales_records"])
+health = test_endpoint("Health Check", "/api/health", ["status", "sales_records"])
+loads_before = (health or {}).get('dataset_loads')
 
 # Test festivals
 data = test_endpoint("List Festivals", "/api/festivals", ["festivals"])
@@ -76,6 +78,19 @@ if data:
     else:
         print(f"   AI suggestions loaded")
 
+# No request path may re-read a dataset from disk
+reloaded = False
+health = test_endpoint("Dataset Reloads", "/api/health", ["dataset_loads"])
+if health and loads_before is not None:
+    if health['dataset_loads'] != loads_before:
+        print(f"❌ Dataset reloaded during requests: {loads_before} -> {health['dataset_loads']}")
+        reloaded = True
+    else:
+        print(f"   Dataset loads unchanged: {health['dataset_loads']}")
+
 print("\n" + "=" * 50)
 print("API Testing Complete!")
 print("=" * 50)
+
+if reloaded:
+    sys.exit(1)
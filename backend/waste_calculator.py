@@ -1,7 +1,10 @@
 """Waste calculation module for shops and areas."""
 
+import numpy as np
 import pandas as pd
-from data_loader import load_sales_data, load_products
+from data_loader import DATASETS
+from serialization import records
+from profiler import stage
 
 
 def get_waste_level(score):
@@ -14,6 +17,24 @@ def get_waste_level(score):
         return "HIGH"
 
 
+def get_waste_levels(scores):
+    """Vectorized get_waste_level over an array of scores."""
+    scores = np.asarray(scores)
+    return np.select([scores < 0.4, scores < 0.7], ['LOW', 'MEDIUM'], default='HIGH')
+
+
+def _aggregate_products(shop_data):
+    """Aggregate a shop's sales rows per product, sorted by estimated waste."""
+    with stage('groupby'):
+        product_breakdown = shop_data.groupby(['Item_Name', 'Category']).agg({
+            'Quantity_Sold': 'sum',
+            'Item_Waste_Score': 'first',
+            'Estimated_Waste_kg': 'sum'
+        }).reset_index()
+        
+        return product_breakdown.sort_values('Estimated_Waste_kg', ascending=False)
+
+
 def calculate_shop_waste(shop_id, festival=None, sales_df=None):
     """
     Calculate waste metrics for a specific shop.
@@ -22,17 +43,15 @@ def calculate_shop_waste(shop_id, festival=None, sales_df=None):
         dict: Shop waste analysis including score, level, and product breakdown
     """
     if sales_df is None:
-        sales_df = load_sales_data()
+        sales_df = DATASETS.sales
     
-    # Filter for shop
-    shop_data = sales_df[sales_df['Shop_ID'] == shop_id]
-    
-    if shop_data.empty:
-        return None
-    
-    # Filter by festival if specified
-    if festival:
-        shop_data = shop_data[shop_data['Festival'] == festival]
+    with stage('filter'):
+        # Filter for shop
+        shop_data = sales_df[sales_df['Shop_ID'] == shop_id]
+        
+        # Filter by festival if specified
+        if festival and not shop_data.empty:
+            shop_data = shop_data[shop_data['Festival'] == festival]
     
     if shop_data.empty:
         return None
@@ -46,13 +65,7 @@ def calculate_shop_waste(shop_id, festival=None, sales_df=None):
     total_quantity = shop_data['Quantity_Sold'].sum()
     
     # Get product breakdown sorted by waste
-    product_breakdown = shop_data.groupby(['Item_Name', 'Category']).agg({
-        'Quantity_Sold': 'sum',
-        'Item_Waste_Score': 'first',
-        'Estimated_Waste_kg': 'sum'
-    }).reset_index()
-    
-    product_breakdown = product_breakdown.sort_values('Estimated_Waste_kg', ascending=False)
+    product_breakdown = _aggregate_products(shop_data)
     
     # Get high waste products (score > 0.7)
     high_waste_products = product_breakdown[product_breakdown['Item_Waste_Score'] > 0.7]
@@ -63,45 +76,72 @@ def calculate_shop_waste(shop_id, festival=None, sales_df=None):
         'area': shop_info['Area'],
         'pincode': int(shop_info['Pincode']),
         'festival': festival or 'All Festivals',
-        'waste_score': round(avg_waste_score, 2),
+        'waste_score': round(float(avg_waste_score), 2),
         'waste_level': get_waste_level(avg_waste_score),
-        'total_waste_kg': round(total_waste_kg, 2),
+        'total_waste_kg': round(float(total_waste_kg), 2),
         'total_items_sold': int(total_quantity),
-        'product_breakdown': product_breakdown.to_dict('records'),
-        'high_waste_products': high_waste_products.to_dict('records')
+        'product_breakdown': records(product_breakdown),
+        'high_waste_products': records(high_waste_products)
     }
 
 
-def get_shop_comparison(area=None, festival=None, sales_df=None):
-    """Get waste comparison across shops in an area."""
-    if sales_df is None:
-        sales_df = load_sales_data()
-    
-    # Filter by area if specified
-    if area:
-        sales_df = sales_df[sales_df['Area'] == area]
+def get_product_breakdown(shop_id, festival=None, sales_df=None):
+    """
+    Get per-product waste totals for a shop as a DataFrame.
     
-    # Filter by festival if specified
-    if festival:
-        sales_df = sales_df[sales_df['Festival'] == festival]
+    Returns:
+        DataFrame: Products sorted by estimated waste, or None if the shop has no sales
+    """
+    if sales_df is None:
+        sales_df = DATASETS.sales
     
-    # Aggregate by shop
-    shop_stats = sales_df.groupby(['Shop_ID', 'Shop_Name', 'Area']).agg({
-        'Estimated_Waste_kg': 'sum',
-        'Item_Waste_Score': 'mean',
-        'Quantity_Sold': 'sum'
-    }).reset_index()
+    with stage('filter'):
+        shop_data = sales_df[sales_df['Shop_ID'] == shop_id]
+        if festival:
+            shop_data = shop_data[shop_data['Festival'] == festival]
     
-    shop_stats['waste_level'] = shop_stats['Item_Waste_Score'].apply(get_waste_level)
-    shop_stats = shop_stats.sort_values('Estimated_Waste_kg', ascending=False)
+    if shop_data.empty:
+        return None
     
-    return shop_stats.head(20).to_dict('records')
+    return _aggregate_products(shop_data)
+
+
+def get_shop_comparison_frame(area=None, festival=None, sales_df=None):
+    """Get waste totals for every shop as a DataFrame, sorted by estimated waste."""
+    if sales_df is None:
+        sales_df = DATASETS.sales
+    
+    with stage('filter'):
+        # Filter by area if specified
+        if area:
+            sales_df = sales_df[sales_df['Area'] == area]
+        
+        # Filter by festival if specified
+        if festival:
+            sales_df = sales_df[sales_df['Festival'] == festival]
+    
+    with stage('groupby'):
+        # Aggregate by shop
+        shop_stats = sales_df.groupby(['Shop_ID', 'Shop_Name', 'Area']).agg({
+            'Estimated_Waste_kg': 'sum',
+            'Item_Waste_Score': 'mean',
+            'Quantity_Sold': 'sum'
+        }).reset_index()
+        
+        shop_stats['waste_level'] = get_waste_levels(shop_stats['Item_Waste_Score'])
+        return shop_stats.sort_values('Estimated_Waste_kg', ascending=False)
+
+
+def get_shop_comparison(area=None, festival=None, sales_df=None):
+    """Get waste comparison across shops in an area."""
+    shop_stats = get_shop_comparison_frame(area, festival, sales_df)
+    return records(shop_stats.head(20))
 
 
 def get_eco_alternatives(products_df=None):
     """Get mapping of high-waste products to eco-friendly alternatives."""
     if products_df is None:
-        products_df = load_products()
+        products_df = DATASETS.products
     
     # Define eco-alternatives mapping
     alternatives = {
@@ -3,17 +3,63 @@ import { useState, useEffect } from 'react'
 // API Base URL - uses env variable in production
 const API_BASE_URL = import.meta.env.VITE_API_URL || ''
 
+const hotspotKey = (h) => `${h.area}|${h.pincode}`
+
+// Merge pushed hotspot changes into the critical hotspot list
+const applyCriticalChanges = (critical, { updated, added, removed }) => {
+    const byKey = new Map(critical.map(h => [hotspotKey(h), h]))
+    for (const h of [...updated, ...added]) {
+        byKey.set(hotspotKey(h), { ...byKey.get(hotspotKey(h)), ...h })
+    }
+    for (const h of removed) {
+        byKey.delete(hotspotKey(h))
+    }
+    return [...byKey.values()]
+        .filter(h => h.priority === 'CRITICAL')
+        .sort((a, b) => b.extra_waste_kg - a.extra_waste_kg)
+}
+
 function Dashboard({ festival }) {
     const [stats, setStats] = useState(null)
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState(null)
     const [actionMessage, setActionMessage] = useState(null)
     const [showHowItWorks, setShowHowItWorks] = useState(false)
+    const [adoptionRate, setAdoptionRate] = useState(0)
+    const [adoption, setAdoption] = useState(null)
 
     useEffect(() => {
         fetchDashboardStats()
     }, [festival])
 
+    // Summary and hotspot changes pushed by the server whenever the data is updated
+    useEffect(() => {
+        const source = new EventSource(`${API_BASE_URL}/api/live/${festival}`)
+        source.addEventListener('snapshot', (e) => {
+            const snapshot = JSON.parse(e.data)
+            setStats(prev => prev && {
+                ...prev,
+                summary: snapshot.summary,
+                critical_hotspots: applyCriticalChanges([], { updated: [], added: snapshot.hotspots, removed: [] })
+            })
+        })
+        source.addEventListener('delta', (e) => {
+            const delta = JSON.parse(e.data)
+            setStats(prev => prev && {
+                ...prev,
+                summary: { ...prev.summary, ...delta.summary },
+                critical_hotspots: applyCriticalChanges(prev.critical_hotspots || [], delta.hotspots)
+            })
+        })
+        return () => source.close()
+    }, [festival])
+
+    // Debounce slider moves so dragging doesn't fire a request per step
+    useEffect(() => {
+        const timer = setTimeout(() => fetchAdoption(adoptionRate), 150)
+        return () => clearTimeout(timer)
+    }, [festival, adoptionRate])
+
     const fetchDashboardStats = async () => {
         setLoading(true)
         setError(null)
@@ -50,6 +96,20 @@ function Dashboard({ festival }) {
         setLoading(false)
     }
 
+    const fetchAdoption = async (rate) => {
+        try {
+            const response = await fetch(`${API_BASE_URL}/api/hotspots/${festival}/adoption?shops=0`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ rate: rate / 100 })
+            })
+            if (!response.ok) return
+            setAdoption(await response.json())
+        } catch (err) {
+            setAdoption(null)
+        }
+    }
+
     const handleGenerateReport = () => {
         window.open(`${API_BASE_URL}/api/export/action-plan/${festival}`, '_blank')
         setActionMessage('Municipality report is being downloaded...')
@@ -287,6 +347,58 @@ function Dashboard({ festival }) {
                 </div>
             </div>
 
+            {/* Eco-Alternative Adoption */}
+            <div className="glass-card">
+                <div className="glass-card-header">
+                    <h3 className="glass-card-title">Eco-Alternative Adoption</h3>
+                    <span className="text-muted">{adoptionRate}% of shops switch</span>
+                </div>
+
+                <input
+                    type="range"
+                    min="0"
+                    max="100"
+                    step="5"
+                    value={adoptionRate}
+                    onChange={(e) => setAdoptionRate(Number(e.target.value))}
+                    style={{ width: '100%' }}
+                />
+
+                {adoption && (
+                    <table className="data-table">
+                        <tbody>
+                            <tr>
+                                <td className="cell-primary">Retail waste saved</td>
+                                <td className="text-success">
+                                    {(adoption.retail.saved_kg / 1000).toFixed(1)}T ({adoption.retail.saved_percent}%)
+                                </td>
+                            </tr>
+                            <tr>
+                                <td className="cell-primary">Projected extra waste</td>
+                                <td>
+                                    {(adoption.city.projected_extra_waste_kg / 1000).toFixed(1)}T
+                                    <span className="text-muted"> of {(adoption.city.extra_waste_kg / 1000).toFixed(1)}T</span>
+                                </td>
+                            </tr>
+                            <tr>
+                                <td className="cell-primary">Critical hotspots</td>
+                                <td>
+                                    {adoption.city.projected_priorities.CRITICAL || 0}
+                                    <span className="text-muted"> of {adoption.city.priorities.CRITICAL || 0}</span>
+                                </td>
+                            </tr>
+                            <tr>
+                                <td className="cell-primary">Extra trucks / workers</td>
+                                <td>
+                                    {adoption.city.projected_extra_trucks} / {adoption.city.projected_extra_workers}
+                                    <span className="text-muted"> of {adoption.city.extra_trucks} / {adoption.city.extra_workers}</span>
+                                </td>
+                            </tr>
+                        </tbody>
+                    </table>
+                )}
+            </div>
+
             {/* Quick Actions */}
             <div className="glass-card action-panel">
                 <div className="glass-card-header">
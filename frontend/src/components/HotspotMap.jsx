@@ -45,11 +45,31 @@ const AREA_COORDINATES = {
 
 const BANGALORE_CENTER = [12.9716, 77.5946]
 
+// Convert a GeoJSON feature from /api/hotspots/<festival>/geojson to a map hotspot
+const featureToHotspot = (feature) => {
+    const [lon, lat] = feature.geometry.coordinates
+    const { extra_trucks, extra_workers, ...properties } = feature.properties
+    return { ...properties, coordinates: [lat, lon], recommended_resources: { extra_trucks, extra_workers } }
+}
+
+// Apply pushed hotspot updates to the hotspots already loaded
+const applyHotspotUpdates = (list, updated) => {
+    const changes = new Map(updated.map(h => [`${h.area}|${h.pincode}`, h]))
+    return list.map(h => {
+        const change = changes.get(`${h.area}|${h.pincode}`)
+        if (!change) return h
+        const { extra_trucks, extra_workers, ...fields } = change
+        return { ...h, ...fields, recommended_resources: { ...h.recommended_resources, extra_trucks, extra_workers } }
+    })
+}
+
 // Separate Map Component using CircleMarkers (fixed pixel size)
-function LeafletMap({ hotspots, selectedArea, onAreaSelect, maxWaste }) {
+function LeafletMap({ hotspots, selectedArea, onAreaSelect, maxWaste, onViewportChange }) {
     const mapRef = useRef(null)
     const mapInstanceRef = useRef(null)
+    const leafletRef = useRef(null)
     const markersRef = useRef([])
+    const [mapLoaded, setMapLoaded] = useState(false)
 
     const getPriorityColor = (priority) => {
         switch (priority) {
@@ -78,50 +98,19 @@ function LeafletMap({ hotspots, selectedArea, onAreaSelect, maxWaste }) {
 
                 const map = L.default.map(mapRef.current).setView(BANGALORE_CENTER, 11)
                 mapInstanceRef.current = map
+                leafletRef.current = L.default
 
                 L.default.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
                     attribution: '&copy; OpenStreetMap contributors'
                 }).addTo(map)
 
-                // Add circle markers for each hotspot
-                hotspots.forEach((hotspot, index) => {
-                    let coords = AREA_COORDINATES[hotspot.area]
-
-                    // Generate unique position for unknown areas
-                    if (!coords) {
-                        const angle = (index / hotspots.length) * 2 * Math.PI
-                        const distance = 0.04 + (index % 5) * 0.015
-                        coords = [
-                            BANGALORE_CENTER[0] + Math.cos(angle) * distance,
-                            BANGALORE_CENTER[1] + Math.sin(angle) * distance
-                        ]
-                    }
-
-                    // CircleMarker uses PIXEL radius (8-20px), not meters
-                    const pixelRadius = 8 + (hotspot.extra_waste_kg / maxWaste) * 12
-                    const color = getPriorityColor(hotspot.priority)
-
-                    const marker = L.default.circleMarker(coords, {
-                        color: color,
-                        fillColor: color,
-                        fillOpacity: 0.7,
-                        radius: pixelRadius,
-                        weight: 2
-                    }).addTo(map)
-
-                    marker.bindPopup(`
-                        <div style="font-family: Inter, sans-serif;">
-                            <h4 style="margin: 0 0 8px 0; font-size: 14px;">${hotspot.area}</h4>
-                            <p style="margin: 4px 0; font-size: 12px;"><b>Priority:</b> ${hotspot.priority}</p>
-                            <p style="margin: 4px 0; font-size: 12px;"><b>Extra Waste:</b> ${(hotspot.extra_waste_kg / 1000).toFixed(1)}T</p>
-                            <p style="margin: 4px 0; font-size: 12px;"><b>Resources:</b> ${hotspot.recommended_resources?.extra_trucks} trucks</p>
-                        </div>
-                    `)
-
-                    marker.on('click', () => onAreaSelect(hotspot))
-                    markersRef.current.push(marker)
-                })
+                // Ward-level layers are fetched per viewport as the map moves
+                if (onViewportChange) {
+                    map.on('moveend', () => onViewportChange(map.getBounds()))
+                    onViewportChange(map.getBounds())
+                }
 
+                setMapLoaded(true)
             } catch (error) {
                 console.error('Failed to initialize map:', error)
             }
@@ -138,6 +127,54 @@ function LeafletMap({ hotspots, selectedArea, onAreaSelect, maxWaste }) {
         }
     }, [])
 
+    // (Re)draw circle markers whenever the hotspots shown change
+    useEffect(() => {
+        const map = mapInstanceRef.current
+        const L = leafletRef.current
+        if (!mapLoaded || !map || !L) return
+
+        markersRef.current.forEach(marker => marker.remove())
+        markersRef.current = []
+
+        hotspots.forEach((hotspot, index) => {
+            let coords = hotspot.coordinates || AREA_COORDINATES[hotspot.area]
+
+            // Generate unique position for unknown areas
+            if (!coords) {
+                const angle = (index / hotspots.length) * 2 * Math.PI
+                const distance = 0.04 + (index % 5) * 0.015
+                coords = [
+                    BANGALORE_CENTER[0] + Math.cos(angle) * distance,
+                    BANGALORE_CENTER[1] + Math.sin(angle) * distance
+                ]
+            }
+
+            // CircleMarker uses PIXEL radius (8-20px), not meters
+            const pixelRadius = 8 + (hotspot.extra_waste_kg / maxWaste) * 12
+            const color = getPriorityColor(hotspot.priority)
+
+            const marker = L.circleMarker(coords, {
+                color: color,
+                fillColor: color,
+                fillOpacity: 0.7,
+                radius: pixelRadius,
+                weight: 2
+            }).addTo(map)
+
+            marker.bindPopup(`
+                <div style="font-family: Inter, sans-serif;">
+                    <h4 style="margin: 0 0 8px 0; font-size: 14px;">${hotspot.area}</h4>
+                    <p style="margin: 4px 0; font-size: 12px;"><b>Priority:</b> ${hotspot.priority}</p>
+                    <p style="margin: 4px 0; font-size: 12px;"><b>Extra Waste:</b> ${(hotspot.extra_waste_kg / 1000).toFixed(1)}T</p>
+                    <p style="margin: 4px 0; font-size: 12px;"><b>Resources:</b> ${hotspot.recommended_resources?.extra_trucks} trucks</p>
+                </div>
+            `)
+
+            marker.on('click', () => onAreaSelect(hotspot))
+            markersRef.current.push(marker)
+        })
+    }, [mapLoaded, hotspots, maxWaste])
+
     useEffect(() => {
         markersRef.current.forEach((marker, idx) => {
             if (hotspots[idx]) {
@@ -148,7 +185,7 @@ function LeafletMap({ hotspots, selectedArea, onAreaSelect, maxWaste }) {
                 })
             }
         })
-    }, [selectedArea, hotspots])
+    }, [selectedArea, hotspots, mapLoaded])
 
     return (
         <div
@@ -171,11 +208,37 @@ function HotspotMap({ festival }) {
     const [loadingInsights, setLoadingInsights] = useState(false)
     const [selectedArea, setSelectedArea] = useState(null)
     const [mapReady, setMapReady] = useState(false)
+    const [mapHotspots, setMapHotspots] = useState([])
+    const [viewportMode, setViewportMode] = useState(false)
+    const viewportRequestRef = useRef(null)
 
     useEffect(() => {
         fetchHotspots()
     }, [festival])
 
+    // Pushed changes patch the loaded hotspots; added or removed areas reload the map
+    useEffect(() => {
+        const source = new EventSource(`${API_BASE_URL}/api/live/${festival}`)
+        let connected = false
+        source.addEventListener('snapshot', () => {
+            // The first snapshot matches the data just fetched; later ones mean updates were missed
+            if (connected) fetchHotspots()
+            connected = true
+        })
+        source.addEventListener('delta', (e) => {
+            const delta = JSON.parse(e.data)
+            const { updated, added, removed } = delta.hotspots
+            if (added.length || removed.length) {
+                fetchHotspots()
+                return
+            }
+            setSummary(prev => prev && { ...prev, ...delta.summary })
+            setHotspots(prev => applyHotspotUpdates(prev, updated))
+            setMapHotspots(prev => applyHotspotUpdates(prev, updated))
+        })
+        return () => source.close()
+    }, [festival])
+
     useEffect(() => {
         if (!loading && hotspots.length > 0) {
             const timer = setTimeout(() => setMapReady(true), 100)
@@ -187,25 +250,57 @@ function HotspotMap({ festival }) {
         setLoading(true)
         setMapReady(false)
         try {
-            const [hotspotsRes, summaryRes] = await Promise.all([
-                fetch(`${API_BASE_URL}/api/hotspots/${festival}`),
-                fetch(`${API_BASE_URL}/api/hotspots/${festival}/summary`)
-            ])
-            const hotspotsData = await hotspotsRes.json()
-            const summaryData = await summaryRes.json()
+            // One round trip, answered from a single dataset version
+            const response = await fetch(`${API_BASE_URL}/api/batch`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    requests: [
+                        { id: 'hotspots', path: `/api/hotspots/${festival}` },
+                        { id: 'summary', path: `/api/hotspots/${festival}/summary` },
+                        { id: 'geojson', path: `/api/hotspots/${festival}/geojson` }
+                    ]
+                })
+            })
+            const batch = await response.json()
+            const [hotspotsRes, summaryRes, geoRes] = batch.responses
+            const hotspotsData = hotspotsRes.body
             setHotspots(hotspotsData.hotspots || [])
-            setSummary(summaryData)
+            setSummary(summaryRes.body)
+
+            // Without map coordinates, fall back to placing the ranked hotspots by name
+            const geoData = geoRes.status === 200 ? geoRes.body : null
+            setMapHotspots(geoData ? geoData.features.map(featureToHotspot) : hotspotsData.hotspots || [])
+            setViewportMode(Boolean(geoData?.truncated))
         } catch (error) {
             setHotspots([
                 { area: 'Kengeri', pincode: 560063, population: 230902, extra_waste_kg: 112014, waste_increase_percent: 78.3, priority: 'CRITICAL', recommended_resources: { extra_trucks: 5, extra_workers: 20 } },
                 { area: 'Whitefield', pincode: 560023, population: 673839, extra_waste_kg: 101142, waste_increase_percent: 67.8, priority: 'CRITICAL', recommended_resources: { extra_trucks: 5, extra_workers: 20 } },
                 { area: 'JP Nagar', pincode: 560042, population: 578576, extra_waste_kg: 99367, waste_increase_percent: 69.0, priority: 'HIGH', recommended_resources: { extra_trucks: 4, extra_workers: 18 } }
             ])
+            setMapHotspots([])
+            setViewportMode(false)
             setSummary({ festival, total_areas: 40, total_extra_waste_kg: 1850000, average_increase_percent: 45.2, critical_areas: 8, high_priority_areas: 12 })
         }
         setLoading(false)
     }
 
+    // Ward-level cities are too large to draw at once, so only the visible hotspots are fetched
+    const fetchViewport = async (bounds) => {
+        const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()]
+            .map(v => v.toFixed(5)).join(',')
+        viewportRequestRef.current?.abort()
+        const controller = new AbortController()
+        viewportRequestRef.current = controller
+        try {
+            const response = await fetch(`${API_BASE_URL}/api/hotspots/${festival}/geojson?bbox=${bbox}`, { signal: controller.signal })
+            const data = await response.json()
+            setMapHotspots(data.features.map(featureToHotspot))
+        } catch (error) {
+            if (error.name !== 'AbortError') console.error('Failed to load viewport hotspots:', error)
+        }
+    }
+
     const getAIInsights = async () => {
         setLoadingInsights(true)
         try {
@@ -322,10 +417,11 @@ function HotspotMap({ festival }) {
                 <div className="leaflet-map-container">
                     {mapReady && (
                         <LeafletMap
-                            hotspots={hotspots}
+                            hotspots={mapHotspots.length > 0 ? mapHotspots : hotspots}
                             selectedArea={selectedArea}
                             onAreaSelect={handleAreaSelect}
                             maxWaste={maxWaste}
+                            onViewportChange={viewportMode ? fetchViewport : null}
                         />
                     )}
                     {!mapReady && (
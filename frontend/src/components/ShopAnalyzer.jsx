@@ -2,32 +2,54 @@ import { useState, useEffect } from 'react'
 
 // API Base URL - uses env variable in production
 const API_BASE_URL = import.meta.env.VITE_API_URL || ''
+const SHOPS_PAGE_SIZE = 50
 
 function ShopAnalyzer({ festival }) {
     const [shops, setShops] = useState([])
+    const [shopCount, setShopCount] = useState(0)
+    const [shopPage, setShopPage] = useState(1)
+    const [shopPages, setShopPages] = useState(1)
     const [selectedShop, setSelectedShop] = useState(null)
     const [shopData, setShopData] = useState(null)
     const [suggestions, setSuggestions] = useState(null)
     const [marketing, setMarketing] = useState(null)
+    const [similarShops, setSimilarShops] = useState(null)
     const [loading, setLoading] = useState(false)
     const [loadingSuggestions, setLoadingSuggestions] = useState(false)
     const [searchTerm, setSearchTerm] = useState('')
 
+    // Reset to the first page whenever the search changes
     useEffect(() => {
-        fetchShops()
-    }, [])
+        setShopPage(1)
+    }, [searchTerm])
 
-    const fetchShops = async () => {
+    // Debounce search so typing doesn't fire a request per keystroke
+    useEffect(() => {
+        const timer = setTimeout(() => fetchShops(searchTerm, shopPage), 250)
+        return () => clearTimeout(timer)
+    }, [searchTerm, shopPage])
+
+    const fetchShops = async (search, page) => {
         try {
-            const response = await fetch(`${API_BASE_URL}/api/shops`)
+            const params = new URLSearchParams({
+                search: search.trim(),
+                page,
+                page_size: SHOPS_PAGE_SIZE,
+                fields: 'Shop_ID,Shop_Name,Area'
+            })
+            const response = await fetch(`${API_BASE_URL}/api/shops?${params}`)
             const data = await response.json()
             setShops(data.shops || [])
+            setShopCount(data.count || 0)
+            setShopPages(data.pages || 1)
         } catch (error) {
             setShops([
                 { Shop_ID: 'S0208', Shop_Name: 'Ganesh Supermarket', Area: 'Electronic City' },
                 { Shop_ID: 'S0169', Shop_Name: 'Ganesh Gifts', Area: 'MG Road' },
                 { Shop_ID: 'S0507', Shop_Name: 'City Gifts', Area: 'Marathahalli' }
             ])
+            setShopCount(3)
+            setShopPages(1)
         }
     }
 
@@ -36,6 +58,8 @@ function ShopAnalyzer({ festival }) {
         setSelectedShop(shopId)
         setSuggestions(null)
         setMarketing(null)
+        setSimilarShops(null)
+        getSimilarShops(shopId)
 
         try {
             const response = await fetch(`${API_BASE_URL}/api/shops/${shopId}?festival=${festival}`)
@@ -60,6 +84,17 @@ function ShopAnalyzer({ festival }) {
         setLoading(false)
     }
 
+    const getSimilarShops = async (shopId) => {
+        try {
+            const response = await fetch(`${API_BASE_URL}/api/shops/${shopId}/similar?festival=${festival}`)
+            if (!response.ok) return
+            const data = await response.json()
+            setSimilarShops(data.similar_shops || [])
+        } catch (error) {
+            setSimilarShops([])
+        }
+    }
+
     const getEcoSuggestions = async () => {
         if (!selectedShop) return
         setLoadingSuggestions(true)
@@ -113,12 +148,6 @@ function ShopAnalyzer({ festival }) {
         }
     }
 
-    const filteredShops = shops.filter(shop =>
-        shop.Shop_Name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        shop.Area?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        shop.Shop_ID?.toLowerCase().includes(searchTerm.toLowerCase())
-    )
-
     const getWasteLevelClass = (level) => {
         switch (level?.toUpperCase()) {
             case 'HIGH': return 'danger'
@@ -145,7 +174,7 @@ function ShopAnalyzer({ festival }) {
                 <aside className="shop-sidebar glass-card">
                     <div className="sidebar-header">
                         <h3>Select Shop</h3>
-                        <span className="shop-count">{filteredShops.length} shops</span>
+                        <span className="shop-count">{shopCount} shops</span>
                     </div>
 
                     <div className="search-box">
@@ -155,14 +184,14 @@ function ShopAnalyzer({ festival }) {
                         <input
                             type="text"
                             className="search-input"
-                            placeholder="Search by name or area..."
+                            placeholder="Search by shop name..."
                             value={searchTerm}
                             onChange={(e) => setSearchTerm(e.target.value)}
                         />
                     </div>
 
                     <div className="shop-list">
-                        {filteredShops.slice(0, 50).map((shop) => (
+                        {shops.map((shop) => (
                             <div
                                 key={shop.Shop_ID}
                                 onClick={() => analyzeShop(shop.Shop_ID)}
@@ -173,6 +202,26 @@ function ShopAnalyzer({ festival }) {
                             </div>
                         ))}
                     </div>
+
+                    {shopPages > 1 && (
+                        <div className="shop-pagination">
+                            <button
+                                className="btn btn-secondary"
+                                disabled={shopPage <= 1}
+                                onClick={() => setShopPage(shopPage - 1)}
+                            >
+                                Prev
+                            </button>
+                            <span className="shop-count">{shopPage} / {shopPages}</span>
+                            <button
+                                className="btn btn-secondary"
+                                disabled={shopPage >= shopPages}
+                                onClick={() => setShopPage(shopPage + 1)}
+                            >
+                                Next
+                            </button>
+                        </div>
+                    )}
                 </aside>
 
                 {/* Analysis Panel */}
@@ -258,6 +307,46 @@ function ShopAnalyzer({ festival }) {
                                 </table>
                             </div>
 
+                            {/* Similar greener shops */}
+                            {similarShops && similarShops.length > 0 && (
+                                <div className="glass-card">
+                                    <div className="glass-card-header">
+                                        <h3 className="glass-card-title">Shops Like Yours, Greener</h3>
+                                    </div>
+
+                                    <table className="data-table">
+                                        <thead>
+                                            <tr>
+                                                <th>Shop</th>
+                                                <th>Area</th>
+                                                <th>Similarity</th>
+                                                <th>Waste Score</th>
+                                                <th>Swaps They Made</th>
+                                            </tr>
+                                        </thead>
+                                        <tbody>
+                                            {similarShops.map((shop) => (
+                                                <tr key={shop.shop_id}>
+                                                    <td className="cell-primary">{shop.shop_name}</td>
+                                                    <td>{shop.area}</td>
+                                                    <td>{(shop.similarity * 100).toFixed(0)}%</td>
+                                                    <td>
+                                                        <span className={`waste-badge ${shop.waste_level === 'HIGH' ? 'high' : 'medium'}`}>
+                                                            {(shop.waste_score * 100).toFixed(0)}%
+                                                        </span>
+                                                    </td>
+                                                    <td>
+                                                        {shop.eco_swaps.length
+                                                            ? shop.eco_swaps.slice(0, 2).map(swap => `${swap.from} → ${swap.to}`).join(', ')
+                                                            : '—'}
+                                                    </td>
+                                                </tr>
+                                            ))}
+                                        </tbody>
+                                    </table>
+                                </div>
+                            )}
+
                             {/* AI Suggestions */}
                             {loadingSuggestions ? (
                                 <div className="glass-card">